@@ -3,58 +3,49 @@
 Apply Tabule File Renames from Log
 This script reads tabule_rename_log.txt and renames files accordingly.
 Use this on other machines where files still have old names.
+
+Usage:
+    python3 apply_tabule_renames.py [--dry-run] [--yes] [--jobs N]
+    python3 apply_tabule_renames.py --rollback
+
+The whole log is planned first against one directory snapshot: missing
+sources, existing targets and duplicate targets are skipped up front, and
+chains (A -> B, B -> C) or cycles (A -> B, B -> A) are handled by moving
+every source to a temporary name next to its target before moving the
+temporary names to the targets. Both phases run in a thread pool.
+
+The plan is written to a journal (tabule_rename_journal.json) before any
+file is touched. If a rename fails, everything done so far is rolled back;
+--rollback undoes the last run recorded in the journal.
+
+Timing and profiling: --stats[=FILE], --profile[=FILE], --trace-memory (see
+instrumentation.py).
 """
 
+import json
 import os
 import shutil
-import unicodedata
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from instrumentation import count, instrumented, phase
+from path_resolver import PathResolver
+
 # Configuration
 CONTENT_DIR = Path("content")
 LOG_FILE = "tabule_rename_log.txt"
+JOURNAL_FILE = "tabule_rename_journal.json"
+DEFAULT_JOBS = 8
 
-def normalize_path_for_matching(path_str):
-    """Normalize path for fuzzy matching - handle NBSP and special chars"""
-    # Replace NBSP (U+00A0) with regular space
-    normalized = path_str.replace('\u00a0', ' ')
-    # Normalize unicode
-    normalized = unicodedata.normalize('NFC', normalized)
-    return normalized
+# Shared directory snapshot for all lookups of a run
+_resolver = PathResolver(CONTENT_DIR)
 
 def find_actual_file(config_path):
     """Find actual file, trying variations for special characters"""
-    # Try exact path first
-    file_path = CONTENT_DIR / config_path
-    if file_path.exists():
-        return file_path
-
-    # Try with normalized path (NBSP -> space, etc.)
-    normalized_path = normalize_path_for_matching(config_path)
-    file_path = CONTENT_DIR / normalized_path
-    if file_path.exists():
-        return file_path
-
-    # Try to find file in directory with similar name
-    try:
-        parent_dir = (CONTENT_DIR / config_path).parent
-        if parent_dir.exists():
-            filename = os.path.basename(config_path)
-            normalized_filename = normalize_path_for_matching(filename)
-
-            # List all files in directory
-            for actual_file in parent_dir.iterdir():
-                if actual_file.is_file():
-                    actual_name = actual_file.name
-                    normalized_actual = normalize_path_for_matching(actual_name)
-
-                    # Check if names match after normalization
-                    if normalized_filename == normalized_actual or filename == actual_name:
-                        return actual_file
-    except:
-        pass
-
-    return None
+    # Exact, NBSP/NFC-normalized and case-insensitive matches are answered
+    # from one listing per directory (see path_resolver.py)
+    return _resolver.resolve(config_path)
 
 def parse_log_file(log_file):
     """Parse the log file and return list of (new_path, old_path) tuples"""
@@ -84,50 +75,201 @@ def parse_log_file(log_file):
 
     return renames
 
-def apply_renames(renames, dry_run=False):
-    """Apply the renames from the log file"""
-    total = len(renames)
-    success_count = 0
-    skip_count = 0
-    error_count = 0
+def plan_renames(renames, jobs=DEFAULT_JOBS):
+    """
+    Resolve all log entries against the directory snapshot.
+
+    Args:
+        renames: List of (new_path, old_path) tuples from the log
+        jobs: Concurrent directory listings when taking the snapshot
+
+    Returns:
+        Tuple (steps, skipped):
+            steps: list of dicts with 'old', 'new' (log paths), 'source',
+                'tmp' and 'target' (real paths as strings)
+            skipped: list of (old_path, new_path, reason)
+    """
+    resolved = []
+    skipped = []
+    sources = set()
+    targets = set()
+    # One round of concurrent listings per directory level (network mounts)
+    _resolver.prefetch([path for rename in renames for path in rename], jobs)
 
     for new_path, old_path in renames:
-        # Try to find the actual old file (with fuzzy matching)
-        actual_old_file = find_actual_file(old_path)
-
-        if not actual_old_file:
-            print(f"✗ File not found: {old_path}")
-            skip_count += 1
-            continue
-
-        new_file = CONTENT_DIR / new_path
-
-        # Check if new file already exists
-        if new_file.exists():
-            print(f"⊘ Already exists: {new_path}")
-            skip_count += 1
+        source = find_actual_file(old_path)
+        target = CONTENT_DIR / new_path
+
+        if source is None:
+            reason = "already renamed" if find_actual_file(new_path) else "not found"
+            skipped.append((old_path, new_path, reason))
+        elif source == target:
+            skipped.append((old_path, new_path, "already renamed"))
+        elif str(source) in sources:
+            skipped.append((old_path, new_path, "duplicate source"))
+        elif str(target) in targets:
+            skipped.append((old_path, new_path, "duplicate target"))
+        else:
+            sources.add(str(source))
+            targets.add(str(target))
+            resolved.append((old_path, new_path, source, target))
+
+    # A target may only exist if it is vacated by another step of the plan
+    # (chain or cycle); the fuzzy lookup also catches NFD/case variants
+    steps = []
+    for index, (old_path, new_path, source, target) in enumerate(resolved):
+        existing = find_actual_file(new_path)
+        if existing is not None and str(existing) not in sources:
+            skipped.append((old_path, new_path, "already exists"))
             continue
-
+        steps.append({
+            'old': old_path,
+            'new': new_path,
+            'source': str(source),
+            'tmp': str(target.with_name(f".{target.name}.renaming-{index}")),
+            'target': str(target)
+        })
+
+    return steps, skipped
+
+def count_chained(steps):
+    """Number of steps whose target is the source of another step"""
+    sources = {step['source'] for step in steps}
+    return sum(step['target'] in sources for step in steps)
+
+def write_journal(journal_file, journal):
+    """Write the journal atomically so a crash never leaves half of it"""
+    tmp = f"{journal_file}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(journal, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, journal_file)
+
+def _run_phase(moves, jobs):
+    """Move (src, dst) pairs in a thread pool; returns a list of errors"""
+    def move(pair):
+        src, dst = pair
         try:
-            if dry_run:
-                print(f"[DRY RUN] Would rename: {old_path} -> {new_path}")
-                success_count += 1
-            else:
-                # Create parent directory if needed
-                new_file.parent.mkdir(parents=True, exist_ok=True)
-
-                # Rename the file
-                shutil.move(str(actual_old_file), str(new_file))
-                print(f"✓ Renamed: {old_path} -> {new_path}")
-                success_count += 1
-        except Exception as e:
-            print(f"✗ Error renaming {old_path}: {e}")
-            error_count += 1
+            if os.path.lexists(dst):
+                raise FileExistsError(f"{dst} already exists")
+            shutil.move(src, dst)
+            return None
+        except OSError as e:
+            return f"{src} -> {dst}: {e}"
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return [error for error in pool.map(move, moves) if error]
+
+def rollback(journal):
+    """
+    Undo a (partially) applied journal using the state on disk.
+
+    Returns:
+        List of errors (empty if everything was restored)
+    """
+    errors = []
+    steps = journal['steps']
+
+    # Phase 2 moved tmp -> target; every source was vacated before that,
+    # so a target without its tmp file is one of ours
+    if journal['phase'] in ('targets', 'applied'):
+        for step in steps:
+            if os.path.lexists(step['target']) and not os.path.lexists(step['tmp']):
+                try:
+                    os.rename(step['target'], step['tmp'])
+                except OSError as e:
+                    errors.append(f"{step['target']}: {e}")
+
+    for step in steps:
+        if os.path.lexists(step['tmp']):
+            try:
+                Path(step['source']).parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(step['tmp'], step['source'])
+            except OSError as e:
+                errors.append(f"{step['tmp']}: {e}")
+
+    # Remove directories created for the targets (deepest first) if empty
+    for directory in sorted(journal.get('createdDirs', []), key=len, reverse=True):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass
+
+    return errors
+
+def execute_plan(steps, jobs=DEFAULT_JOBS, journal_file=JOURNAL_FILE):
+    """
+    Apply a plan atomically: all renames succeed or all are rolled back.
+
+    Returns:
+        List of errors (empty on success)
+    """
+    created_dirs = []
+    for directory in sorted({str(Path(step['target']).parent) for step in steps}):
+        missing = []
+        path = Path(directory)
+        while not path.exists() and str(path) not in created_dirs:
+            missing.append(str(path))
+            path = path.parent
+        created_dirs.extend(reversed(missing))
+
+    journal = {'phase': 'planned', 'createdDirs': created_dirs, 'steps': steps}
+    write_journal(journal_file, journal)
+
+    for directory in created_dirs:
+        os.makedirs(directory, exist_ok=True)
+
+    # Phase 1: vacate all sources; phase 2: occupy all targets
+    for phase, moves in (('sources', [(s['source'], s['tmp']) for s in steps]),
+                         ('targets', [(s['tmp'], s['target']) for s in steps])):
+        journal['phase'] = phase
+        write_journal(journal_file, journal)
+        errors = _run_phase(moves, jobs)
+        if errors:
+            rollback_errors = rollback(journal)
+            journal['phase'] = 'rolled-back' if not rollback_errors else 'failed'
+            write_journal(journal_file, journal)
+            return errors + [f"rollback: {error}" for error in rollback_errors]
+
+    journal['phase'] = 'applied'
+    write_journal(journal_file, journal)
+    _resolver.invalidate()
+    return []
+
+def rollback_journal(journal_file=JOURNAL_FILE):
+    """Undo the run recorded in the journal file"""
+    if not os.path.exists(journal_file):
+        print(f"Error: Journal file '{journal_file}' not found!")
+        sys.exit(1)
+    with open(journal_file, 'r', encoding='utf-8') as f:
+        journal = json.load(f)
+    if journal['phase'] == 'rolled-back':
+        print("Journal was already rolled back.")
+        return
 
-    return success_count, skip_count, error_count, total
+    print(f"Rolling back {len(journal['steps'])} renames (phase: {journal['phase']})")
+    errors = rollback(journal)
+    for error in errors:
+        print(f"✗ {error}")
+    journal['phase'] = 'rolled-back' if not errors else 'failed'
+    write_journal(journal_file, journal)
+    if errors:
+        sys.exit(1)
+    print("✓ Rolled back")
+
+def _option_value(name):
+    """Return the value following a command-line option, or None."""
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return None
 
 def main():
-    import sys
+    if '--rollback' in sys.argv:
+        rollback_journal()
+        return
 
     print("=== Tabule File Rename Applicator ===")
     print(f"Reading log file: {LOG_FILE}")
@@ -135,46 +277,82 @@ def main():
 
     # Check if dry run
     dry_run = '--dry-run' in sys.argv or '-n' in sys.argv
+    assume_yes = '--yes' in sys.argv or '-y' in sys.argv
+    jobs = int(_option_value('--jobs') or DEFAULT_JOBS)
 
     if dry_run:
         print("*** DRY RUN MODE - No files will be modified ***")
         print()
 
     # Parse log file
-    renames = parse_log_file(LOG_FILE)
+    with phase('parse'):
+        renames = parse_log_file(LOG_FILE)
+    if os.path.exists(LOG_FILE):
+        count('bytes_read', os.path.getsize(LOG_FILE))
 
     if not renames:
         print("No renames found in log file.")
         return
 
     print(f"Found {len(renames)} rename operations in log file")
+
+    # Planning resolves every source against the directory snapshot
+    with phase('scan'):
+        steps, skipped = plan_renames(renames, jobs)
+    count('files', len(renames))
+    print(f"Planned {len(steps)} renames ({count_chained(steps)} chained), "
+          f"{len(skipped)} skipped")
     print()
 
-    # Ask for confirmation if not dry run
-    if not dry_run:
-        response = input("Proceed with renaming? (yes/no): ").strip().lower()
-        if response not in ['yes', 'y']:
-            print("Aborted.")
-            return
-        print()
+    for old_path, new_path, reason in skipped:
+        symbol = "✗" if reason == "not found" else "⊘"
+        print(f"{symbol} Skipped ({reason}): {old_path} -> {new_path}")
 
-    # Apply renames
-    success, skipped, errors, total = apply_renames(renames, dry_run)
+    if dry_run:
+        for step in steps:
+            print(f"[DRY RUN] Would rename: {step['old']} -> {step['new']}")
+    elif steps:
+        # Only ask when a person is watching; kiosk scripts run without a TTY
+        if not assume_yes and sys.stdin.isatty():
+            response = input("Proceed with renaming? (yes/no): ").strip().lower()
+            if response not in ['yes', 'y']:
+                print("Aborted.")
+                return
+            print()
+
+    with phase('write'):
+        errors = [] if dry_run or not steps else execute_plan(steps, jobs)
+    if not dry_run and not errors:
+        count('files_renamed', len(steps))
+    for error in errors:
+        print(f"✗ Error: {error}")
+    if not dry_run and not errors:
+        for step in steps:
+            print(f"✓ Renamed: {step['old']} -> {step['new']}")
 
     # Summary
     print()
     print("=== Summary ===")
-    print(f"Total operations: {total}")
-    print(f"✓ Successfully renamed: {success}")
-    print(f"⊘ Skipped (not found or already exists): {skipped}")
-    print(f"✗ Errors: {errors}")
+    print(f"Total operations: {len(renames)}")
+    if any(error.startswith("rollback: ") for error in errors):
+        print("✗ Renaming failed and the rollback is incomplete; "
+              f"see {JOURNAL_FILE}, fix the errors above and run --rollback")
+    elif errors:
+        print("✗ Renaming failed, all changes were rolled back")
+    else:
+        print(f"✓ {'Would rename' if dry_run else 'Successfully renamed'}: {len(steps)}")
+    print(f"⊘ Skipped (not found or already exists): {len(skipped)}")
+    print(f"✗ Errors: {len(errors)}")
 
     if dry_run:
         print()
         print("This was a DRY RUN. Run without --dry-run to actually rename files.")
+    elif errors:
+        sys.exit(1)
     else:
         print()
-        print("Done!")
+        print("Done! Undo with: python3 apply_tabule_renames.py --rollback")
 
 if __name__ == "__main__":
-    main()
+    with instrumented('apply_tabule_renames'):
+        main()
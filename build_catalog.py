@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Compile the content config tree into a single catalog file
+
+server.js used to re-read and re-parse every JSON file under content/configs
+on each /api/items and /api/categories request. This script does that work
+once, at content-generation time, and writes content/catalog.json with:
+
+    - the merged category hierarchy (titles, icons, item counts, ...)
+    - all items annotated with categoryPath / categoryId
+    - items with "display": false already filtered out
+    - per-category aggregates: itemCount (with subcategories), directCount
+      (items of the category itself), types (item count per type, with
+      subcategories), cover (path of the first image) and pageCount
+
+Next to it, content/search-index.json holds the prebuilt full-text search
+index over the catalog items (see search_index.py).
+
+The items of each category are also written as fixed-size pages, in the
+order of the configs, so the kiosk fetches page N of a large category
+(chronicles, newsletters) instead of every item at once:
+
+    content/catalog-pages/<buildId>/<category path>/page-<N>.json
+        {"buildId", "category", "page", "pageCount", "pageSize", "total", "items"}
+
+Pages are numbered from 1. Each build writes its own folder (named by the
+build id, like the search index pairing); the folder of the previous
+build is kept for clients still paging through it, older ones are removed.
+
+The server loads the catalog once at startup, serves from memory and reloads
+it when the file changes. Without a catalog it falls back to scanning.
+
+Usage:
+    python3 build_catalog.py [--output content/catalog.json] [--no-search-index]
+                             [--pages-dir content/catalog-pages] [--page-size N]
+
+Run it after every change to content/configs (e.g. after
+generate_items_json.py or normalize_unicode_paths.py).
+"""
+
+import argparse
+import json
+import os
+import sys
+import shutil
+import time
+from pathlib import Path
+
+from config_repository import get_repository
+from content_config import CONFIGS_DIR, CONTENT_DIR
+from search_index import DEFAULT_INDEX, build_search_index, write_search_index
+
+DEFAULT_CATALOG = CONTENT_DIR / "catalog.json"
+DEFAULT_PAGES_DIR = CONTENT_DIR / "catalog-pages"
+CATALOG_VERSION = 1
+
+# Items per page shard (matches ITEMS_PAGE_SIZE in config.js, used by the
+# server when it has no catalog)
+PAGE_SIZE = 60
+
+
+def _read_json(path):
+    # Shared repository: configs already parsed by other tools in this
+    # process are not parsed again
+    return get_repository().load(path)
+
+
+def _sorted_entries(dir_path):
+    """List a directory in the order Node's fs.readdir returns (strcmp on UTF-8)."""
+    with os.scandir(dir_path) as it:
+        entries = list(it)
+    entries.sort(key=lambda entry: entry.name.encode('utf-8', 'surrogateescape'))
+    return entries
+
+
+def scan_configs_directory(dir_path, category_path=()):
+    """
+    Recursively scan a configs folder and build the category hierarchy.
+
+    Mirrors scanConfigsDirectory() in server.js: every *.json file except
+    metadata.json is merged into the folder's items, subfolders become
+    subcategories described by their metadata.json.
+
+    Args:
+        dir_path: Folder to scan
+        category_path: Category ids leading to this folder
+
+    Returns:
+        Dictionary with 'categories' and 'items'
+    """
+    result = {'categories': [], 'items': []}
+    category_path = list(category_path)
+
+    try:
+        entries = _sorted_entries(dir_path)
+    except OSError as e:
+        print(f"Error scanning directory {dir_path}: {e}")
+        return result
+
+    # Read and merge all items*.json files in current directory
+    for entry in entries:
+        if not (entry.is_file(follow_symlinks=False) and entry.name.endswith('.json')
+                and entry.name != 'metadata.json'):
+            continue
+        try:
+            data = _read_json(entry.path)
+        except (OSError, ValueError) as e:
+            print(f"Error reading {entry.name}: {e}")
+            continue
+
+        items = data.get('items') if isinstance(data, dict) else None
+        if isinstance(items, list):
+            for item in items:
+                # Filter out items with display: false
+                if item.get('display') is False:
+                    continue
+                annotated = dict(item)
+                annotated['categoryPath'] = list(category_path)
+                annotated['categoryId'] = '/'.join(category_path)
+                result['items'].append(annotated)
+
+    # Process subdirectories (subcategories)
+    for entry in entries:
+        if not entry.is_dir(follow_symlinks=False):
+            continue
+        sub_path = category_path + [entry.name]
+        sub_result = scan_configs_directory(entry.path, sub_path)
+
+        try:
+            metadata = _read_json(os.path.join(entry.path, 'metadata.json'))
+        except (OSError, ValueError):
+            # Use folder name as fallback
+            metadata = {'title': entry.name, 'icon': '📁'}
+
+        result['categories'].append({
+            'id': entry.name,
+            'path': sub_path,
+            'pathString': '/'.join(sub_path),
+            'title': metadata.get('title') or entry.name,
+            'icon': metadata.get('icon') or '📁',
+            'icon_path': metadata.get('icon_path') or None,
+            'filter': metadata['filter'] if 'filter' in metadata else True,
+            'description': metadata.get('description') or '',
+            'parentPath': category_path,
+            'subcategories': sub_result['categories'],
+            'itemCount': len(sub_result['items'])
+        })
+
+        # Merge items from subdirectories
+        result['items'].extend(sub_result['items'])
+
+    return result
+
+
+def _page_count(total, page_size):
+    return -(-total // page_size)
+
+
+def group_by_category(items):
+    """Map each categoryId to its items (in catalog order)."""
+    groups = {}
+    for item in items:
+        groups.setdefault(item['categoryId'], []).append(item)
+    return groups
+
+
+def add_aggregates(categories, groups, page_size=PAGE_SIZE):
+    """
+    Add directCount, types, cover and pageCount to a category tree.
+
+    Args:
+        categories: Category list (as built by scan_configs_directory)
+        groups: Dict from group_by_category()
+        page_size: Items per page
+
+    Returns:
+        Dict of item count per type over all given categories (for the parent)
+    """
+    total_types = {}
+    for category in categories:
+        direct = groups.get(category['pathString'], [])
+        types = {}
+        for item in direct:
+            item_type = item.get('type') or 'unknown'
+            types[item_type] = types.get(item_type, 0) + 1
+        for item_type, number in add_aggregates(category['subcategories'], groups,
+                                                page_size).items():
+            types[item_type] = types.get(item_type, 0) + number
+
+        # First image of the category itself, else of the first subcategory having one
+        cover = next((item['path'] for item in direct
+                      if item.get('type') == 'image' and item.get('path')), None)
+        if cover is None:
+            cover = next((sub['cover'] for sub in category['subcategories'] if sub['cover']), None)
+
+        category['directCount'] = len(direct)
+        category['types'] = dict(sorted(types.items(), key=lambda kv: (-kv[1], kv[0])))
+        category['cover'] = cover
+        category['pageCount'] = _page_count(len(direct), page_size)
+
+        for item_type, number in types.items():
+            total_types[item_type] = total_types.get(item_type, 0) + number
+    return total_types
+
+
+def build_catalog(configs_dir=CONFIGS_DIR, page_size=PAGE_SIZE, pages_base=None):
+    """
+    Build the catalog dictionary for a configs tree.
+
+    Args:
+        configs_dir: Configs tree
+        page_size: Items per page shard
+        pages_base: Folder holding the page shards, relative to content/
+            ('{buildId}' is replaced); None if no pages are written
+    """
+    result = scan_configs_directory(configs_dir)
+    add_aggregates(result['categories'], group_by_category(result['items']), page_size)
+    build_id = f"{time.time_ns():x}"
+    catalog = {
+        'version': CATALOG_VERSION,
+        # Pairs the catalog with the search index and page shards built from it
+        'buildId': build_id,
+        'categories': result['categories'],
+        'items': result['items']
+    }
+    if pages_base is not None:
+        catalog['pages'] = {'base': pages_base.format(buildId=build_id), 'size': page_size}
+    return catalog
+
+
+def page_file(build_dir, category_id, page):
+    """Path of a page shard: <build_dir>/<category path>/page-<page>.json."""
+    return Path(build_dir, *category_id.split('/') if category_id else (), f"page-{page}.json")
+
+
+def write_pages(catalog, pages_dir=DEFAULT_PAGES_DIR):
+    """
+    Write the page shards of a catalog into pages_dir/<buildId>.
+
+    Returns:
+        Number of page files written
+    """
+    page_size = catalog['pages']['size']
+    build_dir = Path(pages_dir) / catalog['buildId']
+    tmp_dir = Path(pages_dir) / f".{catalog['buildId']}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    written = 0
+    for category_id, items in group_by_category(catalog['items']).items():
+        page_count = _page_count(len(items), page_size)
+        for page in range(1, page_count + 1):
+            shard = {
+                'buildId': catalog['buildId'],
+                'category': category_id,
+                'page': page,
+                'pageCount': page_count,
+                'pageSize': page_size,
+                'total': len(items),
+                'items': items[(page - 1) * page_size:page * page_size]
+            }
+            path = page_file(tmp_dir, category_id, page)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(shard, f, ensure_ascii=False, separators=(',', ':'))
+            written += 1
+
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp_dir, build_dir)
+    return written
+
+
+def prune_pages(pages_dir, keep):
+    """Delete page folders of builds other than those in keep."""
+    try:
+        entries = list(os.scandir(pages_dir))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False) and entry.name not in keep:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def _pages_base(pages_dir):
+    """Shard folder relative to content/ (as served under /content)."""
+    rel = os.path.relpath(pages_dir, CONTENT_DIR)
+    return Path(rel).as_posix() + '/{buildId}'
+
+
+def write_catalog(catalog, output_file=DEFAULT_CATALOG):
+    """Write the catalog atomically so the server never reads half a file."""
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output_file.with_name(f".{output_file.name}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, output_file)
+
+
+def rebuild(output=DEFAULT_CATALOG, search_index=DEFAULT_INDEX, pages_dir=DEFAULT_PAGES_DIR,
+            page_size=PAGE_SIZE, with_search_index=True):
+    """
+    Build and write the catalog, its search index and its page shards.
+
+    Returns:
+        Tuple (catalog, number of pages, search index or None)
+    """
+    try:
+        with open(output, encoding='utf-8') as f:
+            previous = json.load(f).get('buildId')
+    except (OSError, ValueError, AttributeError):
+        previous = None
+
+    catalog = build_catalog(page_size=page_size, pages_base=_pages_base(pages_dir))
+
+    # Write the index and pages first: the server and the front end only use
+    # them once the catalog with the same build id appears
+    index = None
+    if with_search_index:
+        index = build_search_index(catalog['items'], catalog['buildId'])
+        write_search_index(index, search_index)
+    pages = write_pages(catalog, pages_dir)
+
+    write_catalog(catalog, output)
+    prune_pages(pages_dir, {catalog['buildId'], previous})
+    return catalog, pages, index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile content/configs into one catalog file")
+    parser.add_argument('--output', default=str(DEFAULT_CATALOG),
+                        help=f"catalog file (default: {DEFAULT_CATALOG})")
+    parser.add_argument('--search-index', default=str(DEFAULT_INDEX),
+                        help=f"search index file (default: {DEFAULT_INDEX})")
+    parser.add_argument('--no-search-index', action='store_true',
+                        help="do not build the search index")
+    parser.add_argument('--pages-dir', default=str(DEFAULT_PAGES_DIR),
+                        help=f"folder of the page shards (default: {DEFAULT_PAGES_DIR})")
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE,
+                        help=f"items per page shard (default: {PAGE_SIZE})")
+    args = parser.parse_args()
+
+    if not CONFIGS_DIR.exists():
+        print(f"Error: {CONFIGS_DIR} directory not found!")
+        print("Please run this script from the project root directory.")
+        sys.exit(1)
+    if args.page_size < 1:
+        parser.error("--page-size must be at least 1")
+
+    catalog, pages, index = rebuild(args.output, args.search_index, args.pages_dir,
+                                    args.page_size, not args.no_search_index)
+
+    print(f"✓ {len(catalog['items'])} items in {len(catalog['categories'])} top-level categories")
+    print(f"✓ Catalog written to {args.output}")
+    print(f"✓ {pages} pages of {args.page_size} items written to "
+          f"{Path(args.pages_dir) / catalog['buildId']}")
+    if not args.no_search_index:
+        print(f"✓ Search index written to {args.search_index} ({len(index['tokens'])} tokens)")
+
+
+if __name__ == '__main__':
+    main()
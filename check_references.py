@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Check that every path referenced in content/configs exists under content/
+
+Broken items used to show up only when a visitor tapped them. Checking each
+item with exists() is slow on the SD cards of the kiosks, so this checker
+walks content/files once with os.scandir, keeps the real paths in a set and
+compares all referenced paths against it:
+
+    missing             referenced file does not exist at all
+    mismatched          file exists, but under another Unicode form (NFD),
+                        with NBSP or in another letter case; works on macOS,
+                        fails on Linux (fix: normalize_filesystem_names.py)
+    missing thumbnails  image item without thumbnails/<name>
+    orphaned            file under content/files no config references
+                        (thumbnails, responsive/ variants and DZI tile
+                        folders are derivatives and never orphaned)
+
+Collections (the top-level folders of content/configs) are checked in
+parallel worker processes.
+
+Usage:
+    python3 check_references.py [--jobs N] [--report FILE] [--strict] [--no-orphans]
+
+Options:
+    --jobs N        Number of worker processes (default: CPU count, 1 = no pool)
+    --report FILE   Write all findings as JSON ("-" = stdout)
+    --strict        Also fail on missing thumbnails and orphaned files
+    --no-orphans    Do not report orphaned files
+
+Exits with 1 if referenced files are missing or mismatched (with --strict
+also for missing thumbnails and orphans), so it can gate a deploy.
+"""
+
+import json
+import os
+import sys
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from config_repository import get_repository
+from content_config import (
+    CONFIGS_DIR, CONTENT_DIR, FILES_DIR, RESPONSIVE_DIR_NAME, THUMBNAIL_DIR_NAME
+)
+from instrumentation import count, instrumented, phase
+from path_resolver import normalize_path_for_matching
+
+# Deep Zoom images keep their tiles in <name>_files next to <name>.dzi
+DZI_SUFFIX = '.dzi'
+DZI_TILES_SUFFIX = '_files'
+
+
+def _folded(path):
+    """Key for finding a file whose name differs only in form, NBSP or case."""
+    return normalize_path_for_matching(path).casefold()
+
+
+def mismatch_reason(path, actual):
+    """Describe how a referenced path differs from the name on disk."""
+    if unicodedata.normalize('NFC', path) == unicodedata.normalize('NFC', actual):
+        return "Unicode form"
+    if normalize_path_for_matching(path) == normalize_path_for_matching(actual):
+        return "non-breaking space"
+    return "letter case"
+
+
+def build_index(root=FILES_DIR):
+    """
+    Walk the files tree once and index every file.
+
+    Returns:
+        Dict with:
+            files: set of paths relative to content/ (real names on disk)
+            thumbnails: set of thumbnail paths relative to content/
+            folded: dict mapping _folded(path) to the real path
+    """
+    files = set()
+    thumbnails = set()
+    content_root = str(CONTENT_DIR)
+    root_rel = os.path.relpath(str(root), content_root).replace(os.sep, '/')
+    pending = [(str(root), root_rel)]
+
+    while pending:
+        abs_dir, rel_dir = pending.pop()
+        try:
+            with os.scandir(abs_dir) as it:
+                entries = [(entry.name, entry.path, entry.is_dir()) for entry in it
+                           if not entry.name.startswith('.')]
+        except OSError as e:
+            print(f"Error reading {abs_dir}: {e}")
+            continue
+
+        names = {name for name, _, _ in entries}
+        for name, path, is_dir in entries:
+            rel_path = f"{rel_dir}/{name}"
+            if not is_dir:
+                files.add(rel_path)
+            elif name == THUMBNAIL_DIR_NAME:
+                try:
+                    with os.scandir(path) as it:
+                        thumbnails.update(f"{rel_path}/{entry.name}" for entry in it
+                                          if entry.is_file())
+                except OSError as e:
+                    print(f"Error reading {path}: {e}")
+            elif name == RESPONSIVE_DIR_NAME:
+                continue
+            elif (name.endswith(DZI_TILES_SUFFIX)
+                  and name[:-len(DZI_TILES_SUFFIX)] + DZI_SUFFIX in names):
+                continue
+            else:
+                pending.append((path, rel_path))
+
+    folded = {}
+    for path in files:
+        folded.setdefault(_folded(path), path)
+    return {'files': files, 'thumbnails': thumbnails, 'folded': folded}
+
+
+def thumbnail_of(path):
+    """Thumbnail path of an image path: <dir>/thumbnails/<name>."""
+    directory, _, name = path.rpartition('/')
+    return f"{directory}/{THUMBNAIL_DIR_NAME}/{name}"
+
+
+def find_items_files(configs_root=CONFIGS_DIR):
+    """Return all config files that can hold items (every *.json but metadata.json)."""
+    return [path for path in sorted(Path(configs_root).rglob('*.json'))
+            if path.name != 'metadata.json']
+
+
+def check_config(items_file, index, check_thumbnails=True):
+    """
+    Check the items of one config file against an index.
+
+    Args:
+        items_file: Config file
+        index: Dict from build_index() (only 'files' is required)
+        check_thumbnails: Also check thumbnails of image items
+
+    Returns:
+        Dict with lists missing, mismatched, missing_thumbnails (entries:
+        config, item, path; mismatched also actual and reason) and the
+        referenced paths
+    """
+    result = {'missing': [], 'mismatched': [], 'missing_thumbnails': [], 'referenced': [],
+              'items': 0}
+    data = get_repository().load(items_file)
+    items = data.get('items', []) if isinstance(data, dict) else []
+    files = index['files']
+    folded = index.get('folded', {})
+    thumbnails = index.get('thumbnails', set())
+
+    for number, item in enumerate(items):
+        path = item.get('path') if isinstance(item, dict) else None
+        if not isinstance(path, str) or not path.startswith('files/'):
+            continue
+        result['items'] += 1
+        entry = {'config': str(items_file), 'item': number, 'path': path}
+        if path in files:
+            result['referenced'].append(path)
+        elif _folded(path) in folded:
+            actual = folded[_folded(path)]
+            result['mismatched'].append({**entry, 'actual': actual,
+                                         'reason': mismatch_reason(path, actual)})
+            result['referenced'].append(actual)
+            continue
+        else:
+            result['missing'].append(entry)
+            continue
+        if (check_thumbnails and item.get('type') == 'image'
+                and thumbnail_of(path) not in thumbnails):
+            result['missing_thumbnails'].append(entry)
+    return result
+
+
+# Index shared by the worker processes (set once per worker)
+_worker_index = None
+
+
+def _init_worker(index):
+    global _worker_index
+    _worker_index = index
+
+
+def check_collection(config_files):
+    """
+    Pool worker: check all config files of one collection.
+
+    Returns:
+        Dict like check_config() with the results of all files merged, plus
+        the list of errors (config, message)
+    """
+    merged = {'missing': [], 'mismatched': [], 'missing_thumbnails': [], 'referenced': [],
+              'items': 0, 'errors': []}
+    for items_file in config_files:
+        try:
+            result = check_config(items_file, _worker_index)
+        except (OSError, ValueError) as e:
+            merged['errors'].append({'config': str(items_file), 'error': str(e)})
+            continue
+        for key in ('missing', 'mismatched', 'missing_thumbnails', 'referenced'):
+            merged[key].extend(result[key])
+        merged['items'] += result['items']
+    return merged
+
+
+def group_collections(items_files, configs_root=CONFIGS_DIR):
+    """Group config files by collection (first folder below configs_root)."""
+    collections = {}
+    for path in items_files:
+        parts = Path(path).relative_to(configs_root).parts
+        name = parts[0] if len(parts) > 1 else ''
+        collections.setdefault(name, []).append(path)
+    return collections
+
+
+def check_all(index, configs_root=CONFIGS_DIR, jobs=None):
+    """
+    Check every collection, in parallel unless jobs is 1.
+
+    Returns:
+        Dict of collection name -> check_collection() result
+    """
+    collections = group_collections(find_items_files(configs_root), configs_root)
+    names = sorted(collections)
+    if jobs == 1 or len(names) < 2:
+        _init_worker(index)
+        results = [check_collection(collections[name]) for name in names]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(index,)) as pool:
+            results = list(pool.map(check_collection, [collections[name] for name in names]))
+    return dict(zip(names, results))
+
+
+def _option_value(name):
+    """Return the value following a command-line option, or None."""
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return None
+
+
+def main():
+    jobs = int(_option_value('--jobs')) if _option_value('--jobs') else None
+    report_file = _option_value('--report')
+    strict = '--strict' in sys.argv
+    with_orphans = '--no-orphans' not in sys.argv
+    quiet = report_file == '-'
+    # With the report on stdout, errors go to stderr to keep the JSON valid
+    diagnostics = sys.stderr if quiet else sys.stdout
+
+    def say(*args):
+        if not quiet:
+            print(*args)
+
+    if not FILES_DIR.exists() or not CONFIGS_DIR.exists():
+        print(f"Error: {FILES_DIR} or {CONFIGS_DIR} directory not found!", file=diagnostics)
+        print("Please run this script from the project root directory.", file=diagnostics)
+        sys.exit(1)
+
+    say("=== Checking config references ===")
+    with phase('scan'), redirect_stdout(diagnostics):
+        index = build_index()
+    count('files', len(index['files']))
+    say(f"Indexed {len(index['files'])} files and {len(index['thumbnails'])} thumbnails")
+
+    with phase('transform'):
+        results = check_all(index, jobs=jobs)
+
+    missing = [entry for result in results.values() for entry in result['missing']]
+    mismatched = [entry for result in results.values() for entry in result['mismatched']]
+    no_thumbnail = [entry for result in results.values()
+                    for entry in result['missing_thumbnails']]
+    errors = [entry for result in results.values() for entry in result['errors']]
+    referenced = {path for result in results.values() for path in result['referenced']}
+    orphans = sorted(index['files'] - referenced) if with_orphans else []
+    count('items', sum(result['items'] for result in results.values()))
+
+    say()
+    for name, result in results.items():
+        say(f"{name or '(root)'}: {result['items']} items, {len(result['missing'])} missing, "
+            f"{len(result['mismatched'])} mismatched, "
+            f"{len(result['missing_thumbnails'])} without thumbnail")
+    say()
+    for entry in errors:
+        print(f"✗ Error reading {entry['config']}: {entry['error']}", file=diagnostics)
+    for entry in missing:
+        say(f"✗ Missing: {entry['path']} ({entry['config']} item {entry['item']})")
+    for entry in mismatched:
+        say(f"✗ Name differs on disk ({entry['reason']}): {entry['path']} "
+            f"({entry['config']} item {entry['item']})")
+    for entry in no_thumbnail:
+        say(f"⊘ No thumbnail: {entry['path']} ({entry['config']} item {entry['item']})")
+    for path in orphans:
+        say(f"⊘ Not referenced: {path}")
+
+    if report_file:
+        report = {
+            'collections': {name or '(root)': {'items': result['items'],
+                                                 'missing': len(result['missing']),
+                                                 'mismatched': len(result['mismatched']),
+                                                 'missingThumbnails': len(result['missing_thumbnails'])}
+                            for name, result in results.items()},
+            'missing': missing,
+            'mismatched': mismatched,
+            'missingThumbnails': no_thumbnail,
+            'orphaned': orphans,
+            'errors': errors
+        }
+        if report_file == '-':
+            json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+            print()
+        else:
+            with open(report_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+    say()
+    say("=== Summary ===")
+    say(f"Missing files: {len(missing)}")
+    say(f"Names differing on disk: {len(mismatched)}")
+    say(f"Missing thumbnails: {len(no_thumbnail)}")
+    if with_orphans:
+        say(f"Orphaned files: {len(orphans)}")
+    say(f"Errors: {len(errors)}")
+
+    failed = missing or mismatched or errors or (strict and (no_thumbnail or orphans))
+    if failed:
+        sys.exit(1)
+    say("✓ All references are valid")
+
+
+if __name__ == '__main__':
+    with instrumented('check_references'):
+        main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Concurrent directory scanning for content on network mounts (NFS/SMB)
+
+On a network mount every directory listing and every stat() is a round trip
+to the server. generate_items_json.py walked the tree with Path.rglob() and
+called is_file() on every entry, one round trip after the other, so a scan of
+the archive took minutes. scan_tree() lists directories from a thread pool
+instead, with up to --jobs listings in flight, and takes file and directory
+types from the os.scandir() entries (d_type of the listing), so files are
+never stat-ed. Entries without a type (some SMB servers, symlinks) cost one
+stat, made in the worker thread as well.
+
+The result is the same file list Path.rglob() finds: symlinked directories
+are not followed, symlinks to files are files. PathResolver.prefetch() in
+path_resolver.py lists the directories of many config paths the same way,
+before find_actual_file() lookups.
+
+Usage:
+    from concurrent_scan import scan_tree
+    files = scan_tree("content/files/FOTO", jobs=16, skip_dirs={'thumbnails'})
+
+Check against the sequential scanner, optionally with simulated latency:
+    python3 concurrent_scan.py <source_directory> [--jobs N] [--latency MS]
+
+With --latency every os.scandir(), os.stat() and os.lstat() call sleeps for
+MS milliseconds first, like a round trip to a file server would. Both
+scanners then run on the local directory; the script prints their times and
+exits with 1 if the item lists differ.
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+# Concurrent listings; a file server answers many requests at once
+DEFAULT_JOBS = 16
+
+
+def list_directory(path, follow_symlinks=False):
+    """
+    List a directory, typing entries from the cached DirEntry data.
+
+    Args:
+        path: Directory to list
+        follow_symlinks: Report symlinks to directories as directories
+
+    Returns:
+        Tuple (dirs, files) of entry names; other entries (sockets, broken
+        links, ...) are left out
+    """
+    dirs = []
+    files = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=follow_symlinks):
+                dirs.append(entry.name)
+            elif entry.is_file():
+                files.append(entry.name)
+    return dirs, files
+
+
+def scan_tree(root, jobs=DEFAULT_JOBS, skip_dirs=(), follow_symlinks=False):
+    """
+    List all files below root, listing up to jobs directories concurrently.
+
+    Args:
+        root: Directory to scan
+        jobs: Maximum number of concurrent directory listings
+        skip_dirs: Directory names not to descend into (e.g. thumbnails)
+        follow_symlinks: Descend into symlinked directories
+
+    Returns:
+        List of file paths relative to root, in no particular order
+    """
+    files = []
+    root = str(root)
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        pending = {pool.submit(list_directory, root, follow_symlinks): ()}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                parts = pending.pop(future)
+                try:
+                    dirs, names = future.result()
+                except OSError as e:
+                    print(f"Error reading {os.path.join(root, *parts)}: {e}")
+                    continue
+                files.extend(Path(*parts, name) for name in names)
+                for name in dirs:
+                    if name not in skip_dirs:
+                        path = os.path.join(root, *parts, name)
+                        pending[pool.submit(list_directory, path, follow_symlinks)] = parts + (name,)
+    return files
+
+
+class SimulatedLatency:
+    """
+    Context manager delaying os.scandir(), os.stat() and os.lstat().
+
+    Makes a local directory behave like a network mount for testing: each
+    call sleeps first (releasing the GIL, like waiting for the server) and
+    is counted. Stats made internally by DirEntry are not delayed; they do
+    not happen for entries whose type comes with the listing.
+    """
+
+    _patched = ('scandir', 'stat', 'lstat')
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._originals = {}
+
+    def _delayed(self, function):
+        def call(*args, **kwargs):
+            with self._lock:
+                self.calls += 1
+            time.sleep(self.seconds)
+            return function(*args, **kwargs)
+        return call
+
+    def __enter__(self):
+        for name in self._patched:
+            self._originals[name] = getattr(os, name)
+            setattr(os, name, self._delayed(self._originals[name]))
+        return self
+
+    def __exit__(self, *exc):
+        for name, function in self._originals.items():
+            setattr(os, name, function)
+        self._originals.clear()
+
+
+def _option_value(name):
+    """Return the value following a command-line option, or None."""
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return None
+
+
+def main():
+    # Imported here: generate_items_json uses this module for --scan-jobs
+    from generate_items_json import generate_items, get_base_path
+
+    jobs = int(_option_value('--jobs') or DEFAULT_JOBS)
+    latency = float(_option_value('--latency') or 0) / 1000
+    option_values = {_option_value('--jobs'), _option_value('--latency')}
+    args = [arg for arg in sys.argv[1:]
+            if not arg.startswith('--') and arg not in option_values]
+    if not args:
+        print("Usage: python3 concurrent_scan.py <source_directory> [--jobs N] [--latency MS]")
+        sys.exit(1)
+
+    source_dir = args[0]
+    base_path = get_base_path(source_dir)
+    print(f"Scanning: {source_dir}")
+    print(f"Simulated latency: {latency * 1000:g} ms per call, {jobs} concurrent listings")
+    print("=" * 70)
+
+    results = {}
+    for label, scan_jobs in (('sequential', None), ('concurrent', jobs)):
+        with SimulatedLatency(latency) as simulated:
+            start = time.perf_counter()
+            items = generate_items(source_dir, base_path, scan_jobs=scan_jobs)
+            seconds = time.perf_counter() - start
+        results[label] = items
+        print(f"{label:<12}{seconds:>10.3f} s{simulated.calls:>10} calls{len(items):>10} items")
+
+    print("=" * 70)
+    if results['sequential'] != results['concurrent']:
+        print("✗ Item lists differ")
+        sys.exit(1)
+    print("✓ Same item list")
+
+
+if __name__ == '__main__':
+    main()
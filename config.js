@@ -9,6 +9,14 @@ module.exports = {
   // Paths
   CONTENT_DIR: './content',
 
+  // Compiled content catalog (generated by build_catalog.py)
+  CATALOG_FILE: './content/catalog.json',
+  SEARCH_INDEX_FILE: './content/search-index.json',
+
+  // Items per page of /api/items?page=N without a catalog (the catalog
+  // build writes its own page size, see build_catalog.py)
+  ITEMS_PAGE_SIZE: 60,
+
   // Session timeout (30 days for kiosk machines)
   SESSION_MAX_AGE: 30 * 24 * 60 * 60 * 1000,
 
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Shared, cached access to the JSON configs under content/configs
+
+All maintenance scripts load configs through one ConfigRepository, so a
+pipeline run in one process (normalize -> rename -> sort -> build catalog)
+parses every file at most once:
+
+    - lazy loading: a file is parsed the first time it is requested
+    - in-process cache keyed on (path, mtime, size): a file changed on disk
+      by someone else is re-read, an unchanged one is never parsed twice
+    - dirty tracking: callers modify the returned data and mark_dirty() it
+    - flush(): writes only the modified files, atomically (temp file +
+      rename), keeping each file's trailing-newline style
+
+Parsing uses orjson when it is installed (pip install orjson) and the
+standard json module otherwise. Writing always uses json with indent=2 and
+ensure_ascii=False so the files keep their current layout.
+
+Usage:
+    from config_repository import get_repository
+    repo = get_repository()
+    data = repo.load("content/configs/photos/items.json")
+    data['items'].append({...})
+    repo.mark_dirty("content/configs/photos/items.json")
+    repo.flush()
+"""
+
+import json
+import os
+from pathlib import Path
+
+from content_config import CONFIGS_DIR
+from instrumentation import count
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def parse_json(raw):
+    """Parse JSON bytes with the fastest available backend."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode('utf-8'))
+
+
+def write_json_atomic(path, data, trailing_newline=True):
+    """
+    Write JSON (indent=2, UTF-8) to a temporary file and rename it into place.
+
+    A crash or a full disk never leaves a truncated config behind.
+    """
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        if trailing_newline:
+            f.write('\n')
+    os.replace(tmp, path)
+
+
+class _Entry:
+    __slots__ = ('mtime_ns', 'size', 'data', 'trailing_newline')
+
+    def __init__(self, mtime_ns, size, data, trailing_newline):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.data = data
+        self.trailing_newline = trailing_newline
+
+
+class ConfigRepository:
+    """Lazy, cached loader for JSON config files with dirty tracking."""
+
+    def __init__(self, root=CONFIGS_DIR):
+        self.root = Path(root)
+        self._cache = {}
+        self._dirty = set()
+        self.parsed = 0
+        self.written = 0
+
+    @staticmethod
+    def _key(path):
+        return os.path.normpath(str(path))
+
+    def load(self, path):
+        """
+        Return the parsed content of a JSON file.
+
+        The same object is returned on every call while the file is
+        unchanged on disk (or marked dirty), so modifications made by one
+        tool are seen by the next one in the same process.
+        """
+        key = self._key(path)
+        entry = self._cache.get(key)
+        if entry is not None and key in self._dirty:
+            return entry.data
+
+        st = os.stat(key)
+        if entry is not None and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+            return entry.data
+
+        with open(key, 'rb') as f:
+            raw = f.read()
+        data = parse_json(raw)
+        self.parsed += 1
+        count('bytes_read', len(raw))
+        self._cache[key] = _Entry(st.st_mtime_ns, st.st_size, data, raw.endswith(b'\n'))
+        return data
+
+    def mark_dirty(self, path):
+        """Mark a loaded file as modified so flush() writes it."""
+        key = self._key(path)
+        if key not in self._cache:
+            raise KeyError(f"{path} was not loaded through the repository")
+        self._dirty.add(key)
+
+    def is_dirty(self, path):
+        return self._key(path) in self._dirty
+
+    def flush(self):
+        """
+        Write all modified files atomically.
+
+        Returns:
+            List of written file paths (as Path)
+        """
+        written = []
+        for key in sorted(self._dirty):
+            entry = self._cache[key]
+            write_json_atomic(key, entry.data, entry.trailing_newline)
+            st = os.stat(key)
+            entry.mtime_ns = st.st_mtime_ns
+            entry.size = st.st_size
+            count('bytes_written', st.st_size)
+            written.append(Path(key))
+        self._dirty.clear()
+        self.written += len(written)
+        return written
+
+    def discard(self, path=None):
+        """Drop cached data (and pending changes) of one file or of all files."""
+        if path is None:
+            self._cache.clear()
+            self._dirty.clear()
+        else:
+            key = self._key(path)
+            self._cache.pop(key, None)
+            self._dirty.discard(key)
+
+    def find(self, pattern='items.json', subdir=None):
+        """Return sorted config files matching a glob pattern, recursively."""
+        base = self.root / subdir if subdir else self.root
+        return sorted(base.rglob(pattern))
+
+
+_default_repository = None
+
+
+def get_repository():
+    """Return the process-wide repository for content/configs."""
+    global _default_repository
+    if _default_repository is None:
+        _default_repository = ConfigRepository()
+    return _default_repository
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Bulk path rewrites in JSON configs
+
+Renaming tools (rename_tabule_helper.py, ...) need to replace old file paths
+with new ones in every items.json that references them. Doing that per
+renamed file re-parses and rewrites the same config once per rename; this
+module groups all renames by config file, applies them in one pass over the
+items and writes each changed config exactly once, atomically. Configs are
+loaded and written through the shared ConfigRepository.
+
+Usage:
+    from config_rewrite import rewrite_paths
+    updated = rewrite_paths({"files/Tabule/Old name.jpg": "files/Tabule/new-name.jpg"})
+"""
+
+from collections import defaultdict
+from pathlib import Path
+
+from config_repository import get_repository
+from content_config import CONFIGS_DIR
+
+
+def find_item_configs(configs_dir=CONFIGS_DIR):
+    """Return all item config files (every *.json except metadata.json)."""
+    return sorted(path for path in Path(configs_dir).rglob('*.json')
+                  if path.name != 'metadata.json')
+
+
+def rewrite_config(config_file, path_map, field='path'):
+    """
+    Rewrite item paths in one config file.
+
+    Args:
+        config_file: items.json file
+        path_map: Dictionary old path -> new path
+        field: Item field holding the path
+
+    Returns:
+        Number of rewritten items (the file is only marked dirty if > 0)
+    """
+    repo = get_repository()
+    data = repo.load(config_file)
+
+    rewritten = 0
+    for item in data.get('items', []):
+        new_path = path_map.get(item.get(field))
+        if new_path is not None and new_path != item[field]:
+            item[field] = new_path
+            rewritten += 1
+
+    if rewritten:
+        repo.mark_dirty(config_file)
+    return rewritten
+
+
+def bulk_rewrite(renames_by_config, field='path', flush=True):
+    """
+    Apply renames grouped by config file; each config is parsed and written once.
+
+    Args:
+        renames_by_config: Dictionary config file -> {old path: new path}
+        field: Item field holding the path
+        flush: Write the changed configs now; pass False to leave them dirty
+            in the shared repository for a later flush()
+
+    Returns:
+        Dictionary config file -> number of rewritten items, for changed files
+    """
+    updated = {}
+    for config_file, path_map in renames_by_config.items():
+        rewritten = rewrite_config(config_file, path_map, field)
+        if rewritten:
+            updated[config_file] = rewritten
+    if flush:
+        get_repository().flush()
+    return updated
+
+
+def rewrite_paths(path_map, config_files=None, field='path', flush=True):
+    """
+    Apply old -> new path renames to every config that may reference them.
+
+    Args:
+        path_map: Dictionary old path -> new path
+        config_files: Configs to rewrite (default: all configs under
+            content/configs)
+        field: Item field holding the path
+        flush: Write the changed configs now (see bulk_rewrite)
+
+    Returns:
+        Dictionary config file -> number of rewritten items, for changed files
+    """
+    if config_files is None:
+        config_files = find_item_configs()
+    return bulk_rewrite({config_file: path_map for config_file in config_files}, field, flush)
+
+
+def group_by_config(path_map, references):
+    """
+    Group renames by the config files that reference the old paths.
+
+    Args:
+        path_map: Dictionary old path -> new path
+        references: Dictionary old path -> iterable of config files
+
+    Returns:
+        Dictionary config file -> {old path: new path}
+    """
+    grouped = defaultdict(dict)
+    for old_path, new_path in path_map.items():
+        for config_file in references.get(old_path, ()):
+            grouped[config_file][old_path] = new_path
+    return dict(grouped)
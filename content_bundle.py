@@ -0,0 +1,697 @@
+#!/usr/bin/env python3
+"""
+Content manifest and delta sync for deploying content to kiosk machines
+
+The content trees of the kiosks drift apart from the curator's machine, and
+so far they were brought back in line by replaying rename logs
+(apply_tabule_renames.py) and copying whole folders. This tool describes a
+content tree by a manifest and moves only what changed between two of them:
+
+    {"version": 1, "created": "...", "files": {
+        "files/FOTO/DTJ/img_0001.jpg": {"size": 2483211, "mtime": ...,
+                                        "hash": "<blake2b>",
+                                        "derivatives": ["files/FOTO/DTJ/thumbnails/img_0001.jpg",
+                                                        "files/FOTO/DTJ/responsive/img_0001.jpg-320w.avif",
+                                                        ...]},
+        "configs/photos/dtj/items.json": {...}, ...}}
+
+Every file under content/files and content/configs is listed (hidden files
+such as the caches are not), derivatives (thumbnails, responsive variants,
+DZI tiles) also as files of their own. Hashes are BLAKE2b like in the
+derivative cache, and a file is only re-hashed when its size or mtime changed
+since the previous manifest (or since the derivative cache recorded it).
+
+A delta between two manifests lists the paths whose content changed and the
+paths that disappeared. Applying it, a file whose hash already exists
+locally is renamed (the old path is gone) or copied (both paths stay)
+instead of transferred, so moving or renaming a folder transfers nothing and
+a small content change transfers kilobytes.
+
+Usage:
+    python3 content_bundle.py manifest [--output FILE] [--jobs N]
+    python3 content_bundle.py diff OLD NEW [--report FILE]
+    python3 content_bundle.py export BASE [--to DIR] [--jobs N]
+    python3 content_bundle.py apply SOURCE [--dry-run] [--jobs N]
+
+Commands:
+    manifest    Write the manifest of the local content (default
+                content/.manifest.json; the previous one is reused for hashes)
+    diff        Show what updating from manifest OLD to manifest NEW would
+                rename, copy, transfer and delete
+    export      Write a delta bundle (default: content-delta/) from manifest
+                BASE (e.g. the manifest of the kiosks, or of the last
+                release) to the local content: delta.json plus only the files
+                whose content the base does not have anywhere
+    apply       Bring the local content to the state of SOURCE: a delta
+                bundle written by export, or another content directory with
+                a manifest (e.g. a mounted share)
+
+Options:
+    --output FILE   Manifest file to write (manifest)
+    --report FILE   Write the plan as JSON ("-" = stdout) (diff)
+    --to DIR        Directory of the delta bundle (export)
+    --dry-run, -n   Only print the plan (apply)
+    --jobs N        Number of threads hashing and copying (default: 4)
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from content_config import CONTENT_DIR, RESPONSIVE_DIR_NAME, THUMBNAIL_DIR_NAME
+from derivative_cache import DEFAULT_DB, file_hash
+from instrumentation import count, instrumented, phase
+
+MANIFEST_VERSION = 1
+MANIFEST_FILE = CONTENT_DIR / ".manifest.json"
+DELTA_FILE = "delta.json"
+DEFAULT_BUNDLE_DIR = "content-delta"
+
+# Trees of the content directory that are deployed
+CONTENT_TREES = ("files", "configs")
+
+# Applied files are staged here first (hidden, so it is never listed, and on
+# the same file system, so moving into place is a rename)
+STAGING_DIR_NAME = ".bundle-staging"
+
+DEFAULT_JOBS = 4
+
+# Deep Zoom images keep their tiles in <name>_files next to <name>.dzi
+DZI_SUFFIX = '.dzi'
+DZI_TILES_SUFFIX = '_files'
+
+OP_RENAME = 'rename'
+OP_COPY = 'copy'
+OP_TRANSFER = 'transfer'
+OP_DELETE = 'delete'
+
+
+def walk_content(root=CONTENT_DIR):
+    """
+    List the deployed files of a content directory.
+
+    Returns:
+        Dict mapping the path relative to root ('/'-separated, real names on
+        disk) to (size, mtime_ns); hidden files and directories are skipped
+    """
+    files = {}
+    pending = [(os.path.join(str(root), tree), tree) for tree in CONTENT_TREES]
+    while pending:
+        abs_dir, rel_dir = pending.pop()
+        try:
+            with os.scandir(abs_dir) as it:
+                for entry in it:
+                    if entry.name.startswith('.'):
+                        continue
+                    rel_path = f"{rel_dir}/{entry.name}"
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append((entry.path, rel_path))
+                    elif entry.is_file():
+                        st = entry.stat()
+                        files[rel_path] = (st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            print(f"Error reading {abs_dir}: {e}")
+    return files
+
+
+def load_manifest(path):
+    """Load a manifest file; returns None if it does not exist."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError(f"{path}: unsupported manifest version {manifest.get('version')}")
+    return manifest
+
+
+def write_json(data, path):
+    """Write JSON atomically (tmp file + rename)."""
+    path = str(path)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def _cached_hashes(root, db_path=DEFAULT_DB):
+    """
+    Hashes the derivative cache already knows, with their outputs.
+
+    Returns:
+        Dict mapping the path relative to root to (size, mtime_ns, hash,
+        outputs relative to root); empty if there is no cache
+    """
+    if not os.path.exists(db_path):
+        return {}
+    known = {}
+    try:
+        db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            rows = db.execute("SELECT source, size, mtime_ns, hash, outputs FROM derivatives").fetchall()
+        finally:
+            db.close()
+    except sqlite3.Error:
+        return {}
+    for source, size, mtime_ns, content_hash, outputs in rows:
+        rel = Path(os.path.relpath(source, root)).as_posix()
+        outputs = [Path(os.path.relpath(out, root)).as_posix() for out in json.loads(outputs)]
+        known[rel] = (size, mtime_ns, content_hash, outputs)
+    return known
+
+
+def derivative_source(path, files):
+    """
+    Return the source a derivative was generated from, or None.
+
+    Thumbnails (<dir>/thumbnails/<name>) and responsive variants
+    (<dir>/responsive/<name>-<width>w.<fmt>) belong to <dir>/<name>, DZI
+    tiles (<name>_files/...) to <name>.dzi.
+    """
+    parts = path.split('/')
+    if len(parts) > 2 and parts[-2] == THUMBNAIL_DIR_NAME:
+        return '/'.join(parts[:-2] + [parts[-1]])
+    if len(parts) > 2 and parts[-2] == RESPONSIVE_DIR_NAME and '-' in parts[-1]:
+        return '/'.join(parts[:-2] + [parts[-1].rsplit('-', 1)[0]])
+    for depth in range(len(parts) - 2, 0, -1):
+        name = parts[depth]
+        if name.endswith(DZI_TILES_SUFFIX):
+            dzi = '/'.join(parts[:depth] + [name[:-len(DZI_TILES_SUFFIX)] + DZI_SUFFIX])
+            if dzi in files:
+                return dzi
+    return None
+
+
+def build_manifest(root=CONTENT_DIR, previous=None, jobs=DEFAULT_JOBS, db_path=None):
+    """
+    Build the manifest of a content directory.
+
+    Args:
+        root: Content directory
+        previous: Earlier manifest of the same directory; its hashes are
+            reused for files with unchanged size and mtime
+        jobs: Number of hashing threads
+        db_path: Derivative cache whose hashes and outputs are reused
+            (default: the one inside root)
+
+    Returns:
+        (manifest, stats) with stats keys files, hashed, reused and
+        bytes_hashed
+    """
+    with phase('scan'):
+        stats_on_disk = walk_content(root)
+    count('files', len(stats_on_disk))
+
+    known = {path: (entry['size'], entry.get('mtime'), entry['hash'])
+             for path, entry in ((previous or {}).get('files') or {}).items()}
+    cached = _cached_hashes(root, db_path or Path(root) / DEFAULT_DB.name)
+    for path, (size, mtime_ns, content_hash, _) in cached.items():
+        known.setdefault(path, (size, mtime_ns, content_hash))
+
+    files = {}
+    to_hash = []
+    for path, (size, mtime_ns) in sorted(stats_on_disk.items()):
+        files[path] = {'size': size, 'mtime': mtime_ns, 'hash': None}
+        hint = known.get(path)
+        if hint and hint[0] == size and hint[1] == mtime_ns:
+            files[path]['hash'] = hint[2]
+        else:
+            to_hash.append(path)
+
+    with phase('hash'):
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            hashes = pool.map(lambda path: file_hash(os.path.join(str(root), path)), to_hash)
+            for path, content_hash in zip(to_hash, hashes):
+                files[path]['hash'] = content_hash
+    bytes_hashed = sum(files[path]['size'] for path in to_hash)
+    count('bytes_read', bytes_hashed)
+
+    with phase('transform'):
+        derivatives = {}
+        for path in files:
+            source = derivative_source(path, files)
+            if source is None:
+                continue
+            if source.endswith(DZI_SUFFIX):
+                # One entry for the whole tile folder instead of every tile
+                path = source[:-len(DZI_SUFFIX)] + DZI_TILES_SUFFIX + '/'
+            derivatives.setdefault(source, set()).add(path)
+        for source, (_, _, _, outputs) in cached.items():
+            for out in outputs:
+                if out in files or os.path.isdir(os.path.join(str(root), out)):
+                    derivatives.setdefault(source, set()).add(
+                        out if out in files else out.rstrip('/') + '/')
+        for source, paths in derivatives.items():
+            if source in files:
+                files[source]['derivatives'] = sorted(paths)
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'files': files
+    }
+    stats = {'files': len(files), 'hashed': len(to_hash),
+             'reused': len(files) - len(to_hash), 'bytes_hashed': bytes_hashed}
+    return manifest, stats
+
+
+def _portable(entry):
+    """Manifest entry without the machine-specific mtime."""
+    return {key: value for key, value in entry.items() if key != 'mtime'}
+
+
+def make_delta(old_files, new_files):
+    """
+    Compute the delta from one manifest's files to another's.
+
+    Returns:
+        Dict with files (path -> entry for every new or changed path) and
+        remove (paths that no longer exist)
+    """
+    changed = {path: _portable(entry) for path, entry in new_files.items()
+               if path not in old_files or old_files[path]['hash'] != entry['hash']}
+    removed = sorted(path for path in old_files if path not in new_files)
+    return {'files': dict(sorted(changed.items())), 'remove': removed}
+
+
+def plan_delta(local_files, delta):
+    """
+    Turn a delta into operations on the local content.
+
+    A changed path whose content exists locally under another path is renamed
+    from there if that path is removed or overwritten by the delta, and copied
+    otherwise; all other content has to be transferred.
+
+    Args:
+        local_files: Manifest files of the local content
+        delta: Dict from make_delta()
+
+    Returns:
+        List of operations (dicts with op, path, hash, for rename/copy
+        'from', for transfers size): local renames and copies, transfers,
+        copies of transferred files, deletes
+    """
+    targets = {path: entry for path, entry in delta['files'].items()
+               if local_files.get(path, {}).get('hash') != entry['hash']}
+    vacated = set(delta['remove']) | {path for path in targets if path in local_files}
+
+    by_hash = {}
+    for path in sorted(local_files):
+        by_hash.setdefault(local_files[path]['hash'], []).append(path)
+
+    free = {}
+    for path in sorted(vacated):
+        if path in local_files:
+            free.setdefault(local_files[path]['hash'], []).append(path)
+
+    local_ops = []
+    transfers = []
+    transferred = {}
+    duplicates = []
+    renamed = set()
+    for path, entry in targets.items():
+        content_hash = entry['hash']
+        if free.get(content_hash):
+            source = free[content_hash].pop(0)
+            renamed.add(source)
+            local_ops.append({'op': OP_RENAME, 'path': path, 'from': source, 'hash': content_hash})
+        elif content_hash in by_hash:
+            local_ops.append({'op': OP_COPY, 'path': path, 'from': by_hash[content_hash][0],
+                              'hash': content_hash})
+        elif content_hash in transferred:
+            # Same new content at several paths: transfer it once
+            duplicates.append({'op': OP_COPY, 'path': path, 'from': transferred[content_hash],
+                               'hash': content_hash})
+        else:
+            transferred[content_hash] = path
+            transfers.append({'op': OP_TRANSFER, 'path': path, 'size': entry['size'],
+                              'hash': content_hash})
+
+    # Copies are staged before anything is renamed or deleted, so a copy may
+    # read from a path that goes away
+    deletes = [{'op': OP_DELETE, 'path': path} for path in delta['remove']
+               if path in local_files and path not in renamed]
+    return local_ops + transfers + duplicates + deletes
+
+
+def summarize_plan(plan):
+    """Count operations and bytes to transfer."""
+    summary = {OP_RENAME: 0, OP_COPY: 0, OP_TRANSFER: 0, OP_DELETE: 0, 'transferBytes': 0}
+    for op in plan:
+        summary[op['op']] += 1
+        if op['op'] == OP_TRANSFER:
+            summary['transferBytes'] += op['size']
+    return summary
+
+
+def format_size(size):
+    for unit in ('B', 'kB', 'MB', 'GB'):
+        if size < 1000 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1000
+
+
+def print_plan(plan, total_bytes=None):
+    for op in plan:
+        if op['op'] in (OP_RENAME, OP_COPY):
+            print(f"  {op['op']:<9} {op['from']} -> {op['path']}")
+        elif op['op'] == OP_TRANSFER:
+            print(f"  {op['op']:<9} {op['path']} ({format_size(op['size'])})")
+        else:
+            print(f"  {op['op']:<9} {op['path']}")
+    summary = summarize_plan(plan)
+    print()
+    print("=" * 70)
+    print(f"Renames: {summary[OP_RENAME]}")
+    print(f"Copies: {summary[OP_COPY]}")
+    print(f"Deletes: {summary[OP_DELETE]}")
+    transfer = f"Transfers: {summary[OP_TRANSFER]} ({format_size(summary['transferBytes'])})"
+    if total_bytes:
+        transfer += f" of {format_size(total_bytes)} content"
+    print(transfer)
+    print("=" * 70)
+
+
+def export_delta(base, manifest, bundle_dir, root=CONTENT_DIR, jobs=DEFAULT_JOBS):
+    """
+    Write a delta bundle from a base manifest to a (local) manifest.
+
+    Only files whose content the base has nowhere are copied into the
+    bundle; everything else is renamed or copied on the receiving side.
+
+    Returns:
+        (delta, list of bundled paths)
+    """
+    delta = make_delta(base['files'], manifest['files'])
+    bundled = [op['path'] for op in plan_delta(base['files'], delta) if op['op'] == OP_TRANSFER]
+
+    def copy(path):
+        dest = os.path.join(str(bundle_dir), path)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        shutil.copy2(os.path.join(str(root), path), dest)
+
+    with phase('write'):
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            list(pool.map(copy, bundled))
+        delta = {'version': MANIFEST_VERSION, 'created': manifest['created'], **delta}
+        write_json(delta, Path(bundle_dir) / DELTA_FILE)
+    count('bytes_written', sum(manifest['files'][path]['size'] for path in bundled))
+    return delta, bundled
+
+
+def read_source(source):
+    """
+    Read the delta of an apply source.
+
+    Args:
+        source: Delta bundle (with delta.json) or content directory (with
+            .manifest.json)
+
+    Returns:
+        (delta, target manifest files or None for a bundle)
+    """
+    delta_file = Path(source) / DELTA_FILE
+    if delta_file.exists():
+        with open(delta_file, encoding='utf-8') as f:
+            return json.load(f), None
+    manifest = load_manifest(Path(source) / MANIFEST_FILE.name)
+    if manifest is None:
+        raise FileNotFoundError(f"{source} has neither {DELTA_FILE} nor {MANIFEST_FILE.name}")
+    return None, manifest['files']
+
+
+def _staged(staging, number):
+    return os.path.join(staging, str(number))
+
+
+def apply_plan(plan, source, root=CONTENT_DIR, jobs=DEFAULT_JOBS):
+    """
+    Execute a plan on the local content.
+
+    New content is staged first (copies and verified transfers, then the
+    renamed files are moved into the staging folder), so a failed transfer
+    leaves the content untouched and a failed rename is moved back. Then the
+    staged files are moved to their paths and removed paths are deleted.
+
+    Returns:
+        List of errors (empty on success)
+    """
+    staging = os.path.join(str(root), STAGING_DIR_NAME)
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    numbered = [(number, op) for number, op in enumerate(plan) if op['op'] != OP_DELETE]
+
+    transferred = {op['path']: number for number, op in numbered if op['op'] == OP_TRANSFER}
+    # Copies of transferred files are made from the staged transfer
+    late = {number for number, op in numbered
+            if op['op'] == OP_COPY and op['from'] in transferred}
+
+    def fetch(item):
+        number, op = item
+        dest = _staged(staging, number)
+        try:
+            if number in late:
+                shutil.copy2(_staged(staging, transferred[op['from']]), dest)
+            elif op['op'] == OP_COPY:
+                shutil.copy2(os.path.join(str(root), op['from']), dest)
+            elif op['op'] == OP_TRANSFER:
+                shutil.copy2(os.path.join(str(source), op['path']), dest)
+            else:
+                return None
+            if file_hash(dest) != op['hash']:
+                return f"{op['path']}: content does not match the manifest"
+        except OSError as e:
+            return f"{op['path']}: {e}"
+        return None
+
+    with phase('transfer'):
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            errors = [error for error in pool.map(fetch, [item for item in numbered
+                                                           if item[0] not in late]) if error]
+            if not errors:
+                errors = [error for error in pool.map(fetch, [item for item in numbered
+                                                               if item[0] in late]) if error]
+    if errors:
+        shutil.rmtree(staging, ignore_errors=True)
+        return errors
+
+    with phase('write'):
+        moved = []
+        for number, op in numbered:
+            if op['op'] != OP_RENAME:
+                continue
+            try:
+                os.replace(os.path.join(str(root), op['from']), _staged(staging, number))
+                moved.append((number, op))
+            except OSError as e:
+                for number, op in reversed(moved):
+                    os.replace(_staged(staging, number), os.path.join(str(root), op['from']))
+                shutil.rmtree(staging, ignore_errors=True)
+                return [f"{op['from']}: {e}"]
+
+        touched = set()
+        for number, op in numbered:
+            dest = os.path.join(str(root), op['path'])
+            try:
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                os.replace(_staged(staging, number), dest)
+            except OSError as e:
+                errors.append(f"{op['path']}: {e} (staged as {_staged(staging, number)})")
+                continue
+            if op['op'] == OP_RENAME:
+                touched.add(os.path.dirname(os.path.join(str(root), op['from'])))
+            count('files')
+
+        for op in plan:
+            if op['op'] != OP_DELETE:
+                continue
+            path = os.path.join(str(root), op['path'])
+            try:
+                os.remove(path)
+                touched.add(os.path.dirname(path))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                errors.append(f"{op['path']}: {e}")
+
+        # Remove folders emptied by renames and deletes (deepest first)
+        roots = {os.path.normpath(os.path.join(str(root), tree)) for tree in CONTENT_TREES}
+        for directory in sorted(touched, key=len, reverse=True):
+            directory = os.path.normpath(directory)
+            while directory not in roots and directory.startswith(str(root)):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+                directory = os.path.dirname(directory)
+
+    if not errors:
+        shutil.rmtree(staging, ignore_errors=True)
+    return errors
+
+
+def applied_manifest(local, plan, root=CONTENT_DIR):
+    """
+    Update a manifest by an applied plan without hashing again.
+
+    Returns:
+        New manifest, to be passed as previous to build_manifest()
+    """
+    files = dict(local['files'])
+    for op in plan:
+        if op['op'] in (OP_RENAME, OP_DELETE):
+            files.pop(op.get('from', op['path']), None)
+    for op in plan:
+        if op['op'] == OP_DELETE:
+            continue
+        try:
+            st = os.stat(os.path.join(str(root), op['path']))
+        except OSError:
+            files.pop(op['path'], None)
+            continue
+        files[op['path']] = {'size': st.st_size, 'mtime': st.st_mtime_ns, 'hash': op['hash']}
+    return {**local, 'files': files}
+
+
+def _option_value(name):
+    """Return the value following a command-line option, or None."""
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return None
+
+
+def _positional(index):
+    """Return the index-th argument after the command that is not an option."""
+    args = []
+    skip = False
+    for arg in sys.argv[2:]:
+        if skip:
+            skip = False
+        elif arg in ('--output', '--report', '--to', '--jobs'):
+            skip = True
+        elif not arg.startswith('-'):
+            args.append(arg)
+    return args[index] if index < len(args) else None
+
+
+def update_manifest(jobs, path=MANIFEST_FILE, previous=None):
+    """Build the local manifest, reusing the stored (or given) one, and store it."""
+    manifest, stats = build_manifest(previous=previous or load_manifest(path), jobs=jobs)
+    with phase('write'):
+        write_json(manifest, path)
+    total = sum(entry['size'] for entry in manifest['files'].values())
+    print(f"✓ Manifest {path}: {stats['files']} files, {format_size(total)} "
+          f"({stats['reused']} unchanged, {stats['hashed']} hashed)")
+    return manifest
+
+
+def main():
+    commands = ('manifest', 'diff', 'export', 'apply')
+    if len(sys.argv) < 2 or sys.argv[1] not in commands:
+        print(__doc__.split('Usage:')[1].split('Commands:')[0].rstrip())
+        sys.exit(2)
+    command = sys.argv[1]
+    jobs = int(_option_value('--jobs')) if _option_value('--jobs') else DEFAULT_JOBS
+
+    if command != 'diff' and not CONTENT_DIR.exists():
+        print(f"Error: {CONTENT_DIR} directory not found!")
+        print("Please run this script from the project root directory.")
+        sys.exit(1)
+
+    if command == 'manifest':
+        update_manifest(jobs, _option_value('--output') or MANIFEST_FILE)
+        return
+
+    if command == 'diff':
+        old_file, new_file = _positional(0), _positional(1)
+        if not old_file or not new_file:
+            print("Usage: python3 content_bundle.py diff OLD NEW [--report FILE]")
+            sys.exit(2)
+        old, new = load_manifest(old_file), load_manifest(new_file)
+        if old is None or new is None:
+            print(f"Error: Manifest '{old_file if old is None else new_file}' not found!")
+            sys.exit(1)
+        with phase('transform'):
+            plan = plan_delta(old['files'], make_delta(old['files'], new['files']))
+        report_file = _option_value('--report')
+        if report_file == '-':
+            json.dump({'summary': summarize_plan(plan), 'plan': plan}, sys.stdout,
+                      ensure_ascii=False, indent=2)
+            print()
+            return
+        print_plan(plan, sum(entry['size'] for entry in new['files'].values()))
+        if report_file:
+            with open(report_file, 'w', encoding='utf-8') as f:
+                json.dump({'summary': summarize_plan(plan), 'plan': plan}, f,
+                          ensure_ascii=False, indent=2)
+        return
+
+    if command == 'export':
+        base_file = _positional(0)
+        bundle_dir = _option_value('--to') or DEFAULT_BUNDLE_DIR
+        base = load_manifest(base_file) if base_file else None
+        if base is None:
+            print(f"Error: Base manifest '{base_file}' not found!")
+            print("Usage: python3 content_bundle.py export BASE [--to DIR]")
+            sys.exit(1)
+        manifest = update_manifest(jobs)
+        if os.path.exists(os.path.join(bundle_dir, DELTA_FILE)):
+            shutil.rmtree(bundle_dir)
+        delta, bundled = export_delta(base, manifest, bundle_dir, jobs=jobs)
+        size = sum(manifest['files'][path]['size'] for path in bundled)
+        print(f"✓ Delta bundle written to {bundle_dir}: {len(delta['files'])} changed, "
+              f"{len(delta['remove'])} removed, {len(bundled)} files included "
+              f"({format_size(size)})")
+        return
+
+    source = _positional(0)
+    dry_run = '--dry-run' in sys.argv or '-n' in sys.argv
+    if not source:
+        print("Usage: python3 content_bundle.py apply SOURCE [--dry-run]")
+        sys.exit(2)
+    try:
+        delta, target_files = read_source(source)
+    except (OSError, ValueError) as e:
+        print(f"✗ Error: {e}")
+        sys.exit(1)
+
+    local = update_manifest(jobs)
+    with phase('transform'):
+        if delta is None:
+            delta = make_delta(local['files'], target_files)
+        plan = plan_delta(local['files'], delta)
+
+    missing = [op['path'] for op in plan if op['op'] == OP_TRANSFER
+               and not os.path.isfile(os.path.join(source, op['path']))]
+    print_plan(plan)
+    if missing:
+        for path in missing:
+            print(f"✗ Not in {source} and no local file has its content: {path}")
+        sys.exit(1)
+    if dry_run or not plan:
+        print("✓ Nothing to do" if not plan else "⊘ Dry run, nothing changed")
+        return
+
+    errors = apply_plan(plan, source, jobs=jobs)
+    for error in errors:
+        print(f"✗ {error}")
+    update_manifest(jobs, previous=applied_manifest(local, plan))
+    if errors:
+        sys.exit(1)
+    print("✓ Content is up to date")
+
+
+if __name__ == '__main__':
+    with instrumented('content_bundle'):
+        main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Shared configuration for the Python content-maintenance tools
+
+Paths are relative to the project root, like in the other scripts, so all
+tools are expected to be run from there.
+"""
+
+from pathlib import Path
+
+# Content layout
+CONTENT_DIR = Path("content")
+FILES_DIR = CONTENT_DIR / "files"
+CONFIGS_DIR = CONTENT_DIR / "configs"
+
+# Thumbnails live in a 'thumbnails' subdirectory next to each image
+THUMBNAIL_DIR_NAME = "thumbnails"
+
+# Thumbnail dimensions (bounding box, aspect ratio is kept) and JPEG quality
+THUMB_WIDTH = 400
+THUMB_HEIGHT = 400
+THUMB_QUALITY = 85
+
+# Responsive derivatives (derivatives.py): a ladder of widths in several
+# formats, in a 'responsive' subdirectory next to each image. Rungs wider than
+# the image are capped at its own width; formats the encoder lacks are skipped.
+RESPONSIVE_DIR_NAME = "responsive"
+RESPONSIVE_WIDTHS = (320, 640, 1280, 1920)
+RESPONSIVE_FORMATS = ("avif", "webp", "jpg")
+RESPONSIVE_QUALITY = {"avif": 50, "webp": 75, "jpg": 80}
+
+# Supported image extensions (lowercase, without dot)
+IMAGE_EXTENSIONS = ("jpg", "jpeg", "png", "gif", "bmp", "webp", "tiff", "tif")
+
+# Exhibition panels (Tabule): PDFs rendered to Deep Zoom tiles
+PANELS_DIR = FILES_DIR / "Tabule"
+PANEL_CONFIGS_DIR = CONFIGS_DIR / "exhibition-panels"
+DZI_DPI = 300
+DZI_TILE_SUFFIX = ".jpg[Q=95]"
+DZI_OVERLAP = 0
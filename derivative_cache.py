@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Derivative cache index
+
+Maps each source file (by content hash) and the generation parameters to the
+derivatives built from it (thumbnails, DZI tiles, ...). Generators ask the
+index whether a source is fresh instead of only checking that the output
+exists, so a rescanned page with the same name gets a new thumbnail, and
+changing the thumbnail size regenerates everything built with the old size.
+
+The index is a single SQLite file (content/.derivatives.sqlite). A source is
+only re-hashed when its size or mtime changed since it was recorded, so a
+fresh check normally costs one stat() and one indexed lookup.
+
+Usage (for shell scripts):
+    python3 derivative_cache.py check <kind> <source> <params> <output>...
+    python3 derivative_cache.py record <kind> <source> <params> <output>...
+    python3 derivative_cache.py prune [<kind>]
+
+"check" exits with 0 if the outputs are up to date and 1 otherwise.
+"prune" deletes derivatives whose source file no longer exists.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+
+from content_config import CONTENT_DIR
+
+DEFAULT_DB = CONTENT_DIR / ".derivatives.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS derivatives (
+    kind TEXT NOT NULL,
+    source TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    params TEXT NOT NULL,
+    outputs TEXT NOT NULL,
+    PRIMARY KEY (kind, source)
+)
+"""
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Return a BLAKE2b content hash of a file (hex)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def params_key(params):
+    """Turn generation parameters (dict or string) into a stable string."""
+    if isinstance(params, str):
+        return params
+    return json.dumps(params, sort_keys=True, separators=(',', ':'))
+
+
+def remove_output(path):
+    """Delete a derivative file or directory (e.g. DZI *_files folder)."""
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+class DerivativeCache:
+    """SQLite-backed index of source content hashes and their derivatives."""
+
+    def __init__(self, db_path=DEFAULT_DB):
+        self.db_path = str(db_path)
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(self.db_path)
+        self.db.execute(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def lookup(self, kind, source):
+        """
+        Return the recorded entry for a source, or None.
+
+        The entry is a dict with size, mtime_ns, hash, params and outputs.
+        """
+        row = self.db.execute(
+            "SELECT size, mtime_ns, hash, params, outputs FROM derivatives "
+            "WHERE kind = ? AND source = ?", (kind, str(source))
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'size': row[0], 'mtime_ns': row[1], 'hash': row[2],
+            'params': row[3], 'outputs': json.loads(row[4])
+        }
+
+    def is_fresh(self, kind, source, params, content_hash=None):
+        """
+        Check whether the derivatives of a source are up to date.
+
+        A source is fresh if the parameters match, all recorded outputs
+        exist and either its size/mtime are unchanged or its content hash is
+        still the same (e.g. the file was only touched or copied).
+
+        Args:
+            kind: Derivative kind, e.g. "thumbnail" or "dzi"
+            source: Source file path
+            params: Generation parameters (dict or string)
+            content_hash: Hash of the source if the caller already has it
+        """
+        entry = self.lookup(kind, source)
+        if entry is None or entry['params'] != params_key(params):
+            return False
+        if not all(os.path.lexists(out) for out in entry['outputs']):
+            return False
+
+        try:
+            st = os.stat(source)
+        except OSError:
+            return False
+        if st.st_size == entry['size'] and st.st_mtime_ns == entry['mtime_ns']:
+            return True
+
+        if content_hash is None:
+            content_hash = file_hash(source)
+        if content_hash != entry['hash']:
+            return False
+
+        # Same bytes, new stat (touched/copied): remember the new signature
+        self.db.execute(
+            "UPDATE derivatives SET size = ?, mtime_ns = ? WHERE kind = ? AND source = ?",
+            (st.st_size, st.st_mtime_ns, kind, str(source))
+        )
+        return True
+
+    def record(self, kind, source, params, outputs, content_hash=None):
+        """Record the derivatives generated from a source."""
+        st = os.stat(source)
+        if content_hash is None:
+            content_hash = file_hash(source)
+        self.db.execute(
+            "INSERT OR REPLACE INTO derivatives "
+            "(kind, source, size, mtime_ns, hash, params, outputs) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (kind, str(source), st.st_size, st.st_mtime_ns, content_hash,
+             params_key(params), json.dumps([str(out) for out in outputs], ensure_ascii=False))
+        )
+
+    def forget(self, kind, source):
+        """Drop the entry of a source (outputs are left alone)."""
+        self.db.execute("DELETE FROM derivatives WHERE kind = ? AND source = ?",
+                        (kind, str(source)))
+
+    def prune(self, kind=None, live_sources=None):
+        """
+        Delete derivatives whose source is gone and drop their entries.
+
+        Args:
+            kind: Only prune this derivative kind (None = all kinds)
+            live_sources: Set of sources that still exist; when omitted
+                every recorded source is checked with os.path.exists()
+
+        Returns:
+            List of deleted output paths
+        """
+        if kind is None:
+            rows = self.db.execute("SELECT kind, source, outputs FROM derivatives").fetchall()
+        else:
+            rows = self.db.execute("SELECT kind, source, outputs FROM derivatives WHERE kind = ?",
+                                   (kind,)).fetchall()
+
+        removed = []
+        for row_kind, source, outputs in rows:
+            alive = source in live_sources if live_sources is not None else os.path.exists(source)
+            if alive:
+                continue
+            for out in json.loads(outputs):
+                remove_output(out)
+                removed.append(out)
+            self.forget(row_kind, source)
+        self.db.commit()
+        return removed
+
+    def commit(self):
+        self.db.commit()
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('check', 'record', 'prune'):
+        print("Usage: python3 derivative_cache.py check|record <kind> <source> <params> <output>...")
+        print("       python3 derivative_cache.py prune [<kind>]")
+        sys.exit(2)
+
+    command = sys.argv[1]
+    with DerivativeCache() as cache:
+        if command == 'prune':
+            kind = sys.argv[2] if len(sys.argv) > 2 else None
+            removed = cache.prune(kind)
+            for out in removed:
+                print(f"✓ Removed orphaned derivative: {out}")
+            print(f"Pruned {len(removed)} derivatives")
+            return
+
+        if len(sys.argv) < 6:
+            print(f"Usage: python3 derivative_cache.py {command} <kind> <source> <params> <output>...")
+            sys.exit(2)
+        kind, source, params = sys.argv[2:5]
+        outputs = sys.argv[5:]
+
+        if command == 'check':
+            sys.exit(0 if cache.is_fresh(kind, source, params) else 1)
+        cache.record(kind, source, params, outputs)
+
+
+if __name__ == '__main__':
+    main()
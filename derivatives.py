@@ -0,0 +1,580 @@
+#!/usr/bin/env python3
+"""
+Responsive image derivatives: a ladder of sizes in AVIF, WebP and JPEG
+
+The gallery had one 400px thumbnail per image and otherwise sent the full
+original, so opening a photo in the viewer downloaded several megabytes.
+This generator writes a ladder of widths (RESPONSIVE_WIDTHS) in every format
+of RESPONSIVE_FORMATS into a 'responsive' subdirectory next to each image:
+
+    content/files/FOTO/DTJ/responsive/img_0001.jpg-1280w.webp
+
+Each source is decoded once (scaled down while decoding for JPEG); the rungs
+are resized from the previous, larger rung and encoded in all formats. Rungs
+wider than the image are capped at its width, formats the encoder does not
+support are skipped.
+
+The ladder of every image is recorded in the items.json entries referencing
+it, as "derivatives": [{path, width, height, format, fileSize}, ...], so the
+front end can pick the smallest adequate variant (public/js/utils.js).
+generate_items_json.py --enrich keeps the field when items are regenerated.
+
+Staleness is decided by the derivative cache index (derivative_cache.py),
+like for thumbnails: changed content or changed ladder settings regenerate.
+
+Usage:
+    python3 derivatives.py [options]
+
+Options:
+    --jobs N            Number of worker processes (default: CPU count)
+    --files FILE        Process only the images listed in FILE ("-" for stdin)
+    --no-configs        Do not write the ladders into items.json files
+    --prune             Delete derivatives whose source image no longer exists
+    --benchmark N       Generate ladders for N synthetic photos and report
+                        generation time and bytes served per 1,000 images
+
+Images are processed with Pillow when it is installed (pip install Pillow),
+otherwise with one ImageMagick convert call per image.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from config_repository import get_repository
+from content_config import (
+    CONTENT_DIR, FILES_DIR, RESPONSIVE_DIR_NAME,
+    RESPONSIVE_WIDTHS, RESPONSIVE_FORMATS, RESPONSIVE_QUALITY
+)
+from derivative_cache import DEFAULT_DB, DerivativeCache, file_hash, params_key, remove_output
+from generate_thumbnails import (
+    STATUS_CREATED, STATUS_SKIPPED, STATUS_ERROR, find_images, read_file_list
+)
+from image_metadata import extract_metadata, read_image_header
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+# Derivative cache kind
+CACHE_KIND = "responsive"
+
+_PILLOW_FORMATS = {'avif': 'AVIF', 'webp': 'WEBP', 'jpg': 'JPEG'}
+_IMAGEMAGICK_FORMATS = {'avif': 'AVIF', 'webp': 'WEBP', 'jpg': 'JPEG'}
+
+# Ladders per source, next to the derivative index in the same database
+_LADDER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responsive_ladders (
+    source TEXT PRIMARY KEY,
+    ladder TEXT NOT NULL
+)
+"""
+
+# Viewer widths (CSS px x device pixel ratio) reported by --benchmark
+BENCHMARK_VIEWPORTS = (640, 1280, 1920)
+
+
+def available_formats():
+    """Return the configured formats the installed encoder can write."""
+    if Image is not None:
+        return tuple(fmt for fmt in RESPONSIVE_FORMATS
+                     if fmt == 'jpg' or features.check(fmt))
+    try:
+        listing = subprocess.run(['convert', '-list', 'format'], capture_output=True,
+                                 text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return ()
+    supported = {line.split()[0].rstrip('*').upper() for line in listing.splitlines()
+                 if line.strip()}
+    return tuple(fmt for fmt in RESPONSIVE_FORMATS if _IMAGEMAGICK_FORMATS[fmt] in supported)
+
+
+def ladder_params(formats):
+    """Settings a ladder depends on (stored in the derivative cache)."""
+    return {
+        'widths': list(RESPONSIVE_WIDTHS),
+        'formats': list(formats),
+        'quality': {fmt: RESPONSIVE_QUALITY[fmt] for fmt in formats}
+    }
+
+
+def ladder_widths(width):
+    """Rung widths for an image of the given width (never upscaled)."""
+    return sorted({min(rung, width) for rung in RESPONSIVE_WIDTHS})
+
+
+def variant_path(image_path, width, fmt):
+    """Return <dir>/responsive/<name>-<width>w.<fmt> for an image."""
+    image_path = Path(image_path)
+    return image_path.parent / RESPONSIVE_DIR_NAME / f"{image_path.name}-{width}w.{fmt}"
+
+
+def source_key(path):
+    """Key of a source file in the ladder table (normalized, NFC)."""
+    return unicodedata.normalize('NFC', os.path.normpath(str(path)))
+
+
+def _content_path(path):
+    """Path relative to the content directory, as used in items.json."""
+    rel = os.path.relpath(path, CONTENT_DIR)
+    return unicodedata.normalize('NFC', Path(rel).as_posix())
+
+
+def _tmp_path(dest):
+    return dest.with_name(f".{dest.name}.tmp")
+
+
+def _render_pillow(source, formats, quality):
+    """
+    Decode a source once and write all rungs in all formats.
+
+    Returns:
+        List of (dest, width, height, format) of the written files
+    """
+    written = []
+    with Image.open(source) as img:
+        # JPEG: decode at a reduced scale that still covers the widest rung
+        # (the rung widths apply to the stored height of rotated photos)
+        widest = max(RESPONSIVE_WIDTHS)
+        rotated = img.getexif().get(0x0112) in (5, 6, 7, 8)
+        img.draft('RGB', (1, widest) if rotated else (widest, 1))
+        img = ImageOps.exif_transpose(img)
+        has_alpha = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+        full_width, full_height = img.size
+
+        current = img
+        # Largest rung first, each smaller rung is resized from the previous one
+        for width in reversed(ladder_widths(full_width)):
+            height = max(1, round(full_height * width / full_width))
+            if current.size != (width, height):
+                current = current.resize((width, height), Image.LANCZOS)
+            flat = current
+            for fmt in formats:
+                if fmt == 'jpg' and has_alpha:
+                    if flat is current:
+                        flat = Image.new('RGB', current.size, 'white')
+                        flat.paste(current, mask=current.getchannel('A'))
+                    frame = flat
+                else:
+                    frame = current
+                dest = variant_path(source, width, fmt)
+                options = {'quality': quality[fmt]}
+                if fmt == 'jpg':
+                    options['optimize'] = True
+                frame.save(_tmp_path(dest), format=_PILLOW_FORMATS[fmt], **options)
+                written.append((dest, width, height, fmt))
+    return written
+
+
+def _render_imagemagick(source, formats, quality):
+    """Same as _render_pillow() with a single convert call (one decode)."""
+    width = extract_metadata(source, blurhash=False).get('width')
+    if not width:
+        raise ValueError("unknown image size")
+
+    args = ['convert', str(source), '-auto-orient', '-strip', '-write', 'mpr:src']
+    planned = []
+    for rung in reversed(ladder_widths(width)):
+        args += ['(', 'mpr:src', '-resize', f'{rung}x']
+        for fmt in formats:
+            dest = variant_path(source, rung, fmt)
+            args += ['-quality', str(quality[fmt]), '-write',
+                     f'{_IMAGEMAGICK_FORMATS[fmt]}:{_tmp_path(dest)}']
+            planned.append((dest, fmt))
+        args += ['+delete', ')']
+    args.append('null:')
+    subprocess.run(args, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    written = []
+    for dest, fmt in planned:
+        header = read_image_header(_tmp_path(dest))
+        written.append((dest, header['width'], header['height'], fmt))
+    return written
+
+
+def create_ladder(source, formats):
+    """
+    Write the responsive ladder of one image atomically.
+
+    All variants go to temporary files first and are renamed into place only
+    when every one of them was written.
+
+    Returns:
+        Ladder as a list of dicts (path, width, height, format, fileSize)
+    """
+    out_dir = variant_path(source, 0, 'jpg').parent
+    out_dir.mkdir(parents=True, exist_ok=True)
+    quality = {fmt: RESPONSIVE_QUALITY[fmt] for fmt in formats}
+    try:
+        if Image is not None:
+            written = _render_pillow(source, formats, quality)
+        else:
+            written = _render_imagemagick(source, formats, quality)
+        ladder = []
+        for dest, width, height, fmt in written:
+            os.replace(_tmp_path(dest), dest)
+            ladder.append({
+                'path': _content_path(dest),
+                'width': width,
+                'height': height,
+                'format': fmt,
+                'fileSize': dest.stat().st_size
+            })
+    finally:
+        # Temporary files of a failed render
+        prefix = f".{Path(source).name}-"
+        for name in os.listdir(out_dir):
+            if name.startswith(prefix) and name.endswith('.tmp'):
+                os.remove(out_dir / name)
+    return ladder
+
+
+def process_image(job):
+    """
+    Worker: create the ladder of one image unless it is still valid.
+
+    Args:
+        job: Tuple (image_path, known_hash, formats). known_hash is the content
+            hash the cache recorded for the current settings (or None)
+
+    Returns:
+        Tuple (image_path, status, error message or None, content hash, ladder
+        or None when skipped)
+    """
+    image_path, known_hash, formats = job
+    try:
+        content_hash = file_hash(image_path)
+        if known_hash == content_hash:
+            return image_path, STATUS_SKIPPED, None, content_hash, None
+        ladder = create_ladder(image_path, formats)
+    except Exception as e:
+        return image_path, STATUS_ERROR, str(e) or e.__class__.__name__, None, None
+    return image_path, STATUS_CREATED, None, content_hash, ladder
+
+
+def _ladder_db(cache):
+    cache.db.execute(_LADDER_SCHEMA)
+    return cache.db
+
+
+def save_ladder(cache, source, ladder):
+    """Store the ladder of a source in the derivative cache database."""
+    _ladder_db(cache).execute(
+        "INSERT OR REPLACE INTO responsive_ladders (source, ladder) VALUES (?, ?)",
+        (source_key(source), json.dumps(ladder, ensure_ascii=False))
+    )
+
+
+def get_ladder(cache, source):
+    """Return the stored ladder of a source, or None."""
+    row = _ladder_db(cache).execute(
+        "SELECT ladder FROM responsive_ladders WHERE source = ?", (source_key(source),)
+    ).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def load_ladders(cache):
+    """Return all stored ladders keyed by source_key()."""
+    rows = _ladder_db(cache).execute("SELECT source, ladder FROM responsive_ladders")
+    return {source: json.loads(ladder) for source, ladder in rows}
+
+
+def plan_jobs(images, cache, formats):
+    """
+    Split images into worker jobs and images that are fresh by stat alone.
+
+    Returns:
+        Tuple (jobs, fresh_images)
+    """
+    params = params_key(ladder_params(formats))
+    jobs = []
+    fresh = []
+    for image_path in images:
+        entry = cache.lookup(CACHE_KIND, image_path)
+        if entry is None or entry['params'] != params:
+            jobs.append((image_path, None, formats))
+            continue
+        outputs_exist = all(os.path.lexists(out) for out in entry['outputs'])
+        try:
+            st = os.stat(image_path)
+        except OSError:
+            jobs.append((image_path, None, formats))
+            continue
+        if not outputs_exist:
+            jobs.append((image_path, None, formats))
+        elif st.st_size == entry['size'] and st.st_mtime_ns == entry['mtime_ns']:
+            fresh.append(image_path)
+        else:
+            jobs.append((image_path, entry['hash'], formats))
+    return jobs, fresh
+
+
+def run(images, jobs=None, cache=None, quiet=False, formats=None):
+    """
+    Generate responsive ladders for a list of images across a process pool.
+
+    Args:
+        images: List of image paths
+        jobs: Number of worker processes (None = CPU count)
+        cache: DerivativeCache to use (None = open the default index)
+        quiet: Do not print per-image lines
+        formats: Formats to write (default: available_formats())
+
+    Returns:
+        Dictionary with counts per status, bytes written, elapsed seconds and
+        images/second
+    """
+    formats = available_formats() if formats is None else formats
+    own_cache = cache is None
+    if own_cache:
+        cache = DerivativeCache()
+    params = ladder_params(formats)
+    worker_jobs, fresh = plan_jobs(images, cache, formats)
+
+    stats = {STATUS_CREATED: 0, STATUS_SKIPPED: len(fresh), STATUS_ERROR: 0, 'bytes': 0}
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = pool.map(process_image, worker_jobs, chunksize=4)
+            for path, status, error, content_hash, ladder in results:
+                stats[status] += 1
+                if status == STATUS_ERROR:
+                    print(f"✗ Failed: {path} ({error})")
+                    continue
+                old = cache.lookup(CACHE_KIND, path)
+                if ladder is None:
+                    ladder = get_ladder(cache, path) or []
+                outputs = [str(CONTENT_DIR / rung['path']) for rung in ladder]
+                if old is not None:
+                    # Rungs or formats dropped by new settings
+                    for out in set(old['outputs']) - set(outputs):
+                        remove_output(out)
+                cache.record(CACHE_KIND, path, params, outputs, content_hash=content_hash)
+                save_ladder(cache, path, ladder)
+                if status == STATUS_CREATED:
+                    stats['bytes'] += sum(rung['fileSize'] for rung in ladder)
+                    if not quiet:
+                        print(f"✓ Created {len(ladder)} variants: {path}")
+    finally:
+        if own_cache:
+            cache.close()
+        else:
+            cache.commit()
+    elapsed = time.perf_counter() - start
+
+    stats['total'] = len(images)
+    stats['seconds'] = elapsed
+    stats['images_per_second'] = len(images) / elapsed if elapsed > 0 else 0.0
+    return stats
+
+
+def update_configs(cache, repo=None):
+    """
+    Write the stored ladders into the items.json entries of their images.
+
+    Returns:
+        Number of updated items
+    """
+    repo = repo or get_repository()
+    ladders = load_ladders(cache)
+    updated = 0
+    for items_file in repo.find('*.json'):
+        data = repo.load(items_file)
+        if not isinstance(data, dict) or not isinstance(data.get('items'), list):
+            continue
+        changed = False
+        for item in data['items']:
+            if item.get('type') != 'image' or not isinstance(item.get('path'), str):
+                continue
+            ladder = ladders.get(source_key(CONTENT_DIR / item['path']))
+            if ladder and item.get('derivatives') != ladder:
+                item['derivatives'] = ladder
+                changed = True
+                updated += 1
+        if changed:
+            repo.mark_dirty(items_file)
+    repo.flush()
+    return updated
+
+
+def prune(images, cache):
+    """
+    Delete derivatives of images that are gone and forget their ladders.
+
+    Returns:
+        List of deleted derivative paths
+    """
+    live = set(images)
+    removed = cache.prune(CACHE_KIND, live_sources=live)
+    live_keys = {source_key(path) for path in live}
+    db = _ladder_db(cache)
+    for source in list(load_ladders(cache)):
+        if source not in live_keys:
+            db.execute("DELETE FROM responsive_ladders WHERE source = ?", (source,))
+    cache.commit()
+    return removed
+
+
+def print_summary(stats):
+    """Print run statistics in the layout of generate_thumbnails.py."""
+    print()
+    print("=" * 40)
+    print("  Summary")
+    print("=" * 40)
+    print(f"Total images processed:  {stats['total']}")
+    print(f"Ladders created:         {stats[STATUS_CREATED]}")
+    print(f"Ladders skipped:         {stats[STATUS_SKIPPED]}")
+    if 'pruned' in stats:
+        print(f"Orphans pruned:          {stats['pruned']}")
+    if 'configs' in stats:
+        print(f"Items updated:           {stats['configs']}")
+    print(f"Errors:                  {stats[STATUS_ERROR]}")
+    print(f"Bytes written:           {stats['bytes'] / 1e6:.1f} MB")
+    print(f"Elapsed:                 {stats['seconds']:.2f} s")
+    print(f"Throughput:              {stats['images_per_second']:.1f} images/s")
+
+
+def pick_variant(ladder, fmt, min_width):
+    """
+    Smallest rung of a format at least min_width wide (else the widest).
+
+    Mirrors getVariantPath() in public/js/utils.js.
+    """
+    rungs = sorted((rung for rung in ladder if rung['format'] == fmt),
+                   key=lambda rung: rung['width'])
+    for rung in rungs:
+        if rung['width'] >= min_width:
+            return rung
+    return rungs[-1] if rungs else None
+
+
+def _make_synthetic_photos(root, count):
+    """Create count photo-like 4000x3000 JPEGs (smooth areas plus grain)."""
+    bench_dir = Path(root) / FILES_DIR / "bench"
+    bench_dir.mkdir(parents=True)
+    first = bench_dir / "img_00000.jpg"
+    size = (4000, 3000)
+    if Image is not None:
+        channels = [Image.effect_noise((size[0] // 64, size[1] // 64), 96)
+                    .resize(size, Image.BICUBIC) for _ in range(3)]
+        photo = Image.merge('RGB', channels)
+        grain = Image.effect_noise(size, 24).convert('RGB')
+        Image.blend(photo, grain, 0.15).save(first, quality=90)
+    else:
+        subprocess.run(['convert', '-size', f'{size[0]}x{size[1]}', 'plasma:',
+                        '-attenuate', '0.3', '+noise', 'Gaussian', str(first)], check=True)
+    for i in range(1, count):
+        shutil.copyfile(first, bench_dir / f"img_{i:05d}.jpg")
+
+
+def benchmark(count, jobs=None):
+    """Report generation time and bytes served per 1,000 images."""
+    with tempfile.TemporaryDirectory() as root:
+        _make_synthetic_photos(root, count)
+        formats = available_formats()
+        print(f"Benchmark: {count} synthetic 4000x3000 JPEG photos")
+        print(f"Ladder: widths {', '.join(map(str, RESPONSIVE_WIDTHS))}; "
+              f"formats {', '.join(formats)}")
+        print("=" * 70)
+
+        cwd = os.getcwd()
+        os.chdir(root)
+        try:
+            images = find_images()
+            originals = sum(os.path.getsize(path) for path in images)
+            with DerivativeCache(DEFAULT_DB) as cache:
+                stats = run(images, jobs=jobs, cache=cache, quiet=True, formats=formats)
+                ladders = [get_ladder(cache, path) for path in images]
+        finally:
+            os.chdir(cwd)
+
+        scale = 1000 / count
+        backend = "Pillow" if Image is not None else "convert"
+        print(f"Generation:              {stats['seconds'] * scale:8.1f} s per 1,000 images  "
+              f"({backend}, {jobs or os.cpu_count()} workers)")
+        print(f"Derivatives written:     {stats['bytes'] * scale / 1e6:8.1f} MB per 1,000 images")
+        print()
+        print("Bytes served per 1,000 image views (smallest adequate variant):")
+        print(f"  {'viewer width':<14}{'original':>12}" + ''.join(f"{fmt:>12}" for fmt in formats))
+        for viewport in BENCHMARK_VIEWPORTS:
+            row = f"  {str(viewport) + ' px':<14}{originals * scale / 1e6:>9.1f} MB"
+            for fmt in formats:
+                served = sum(pick_variant(ladder, fmt, viewport)['fileSize'] for ladder in ladders)
+                row += f"{served * scale / 1e6:>9.1f} MB"
+            print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate responsive image derivatives")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument('--files', metavar='FILE',
+                        help='process only images listed in FILE ("-" for stdin)')
+    parser.add_argument('--no-configs', action='store_true',
+                        help="do not write the ladders into items.json files")
+    parser.add_argument('--prune', action='store_true',
+                        help="delete derivatives whose source image no longer exists")
+    parser.add_argument('--benchmark', type=int, metavar='N',
+                        help="generate ladders for N synthetic photos and report costs")
+    args = parser.parse_args()
+
+    if Image is None and not shutil.which('convert'):
+        print("✗ Error: Neither Pillow nor ImageMagick found!")
+        print("Please install Pillow: pip install Pillow")
+        sys.exit(1)
+
+    if args.benchmark:
+        benchmark(args.benchmark, args.jobs)
+        return
+
+    formats = available_formats()
+    print("=" * 40)
+    print("  Responsive Derivatives")
+    print("=" * 40)
+    print(f"Widths: {', '.join(map(str, RESPONSIVE_WIDTHS))}")
+    print(f"Formats: {', '.join(formats)}")
+    skipped = [fmt for fmt in RESPONSIVE_FORMATS if fmt not in formats]
+    if skipped:
+        print(f"⊘ Not supported by the encoder, skipped: {', '.join(skipped)}")
+    print(f"Backend: {'Pillow' if Image is not None else 'ImageMagick (convert)'}")
+
+    if args.files:
+        images = read_file_list(args.files)
+        print(f"Images from list: {args.files}")
+    else:
+        images = find_images()
+        print(f"Searching in: {FILES_DIR}")
+    print(f"Found {len(images)} images")
+    print()
+
+    with DerivativeCache() as cache:
+        stats = run(images, jobs=args.jobs, cache=cache, formats=formats)
+        if args.prune:
+            if args.files:
+                print("⊘ --prune needs a full scan, ignored with --files")
+            else:
+                removed = prune(images, cache)
+                for path in removed:
+                    print(f"✓ Removed orphaned derivative: {path}")
+                stats['pruned'] = len(removed)
+        if not args.no_configs:
+            stats['configs'] = update_configs(cache)
+    print_summary(stats)
+
+    if stats[STATUS_ERROR]:
+        sys.exit(1)
+    print("✓ Done!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Multi-page DZI tile generator for exhibition panels
+
+Python replacement for generate_dzi_tiles.sh. Every page of each PDF in
+content/files/Tabule is rendered with libvips and streamed straight into
+dzsave - no intermediate PNG/TIFF files are written. Panels are processed
+across a worker pool.
+
+Usage:
+    python3 generate_dzi_tiles.py [--jobs N] [--no-configs] [pdf ...]
+
+Options:
+    --jobs N        Number of panels rendered in parallel (default: 2)
+    --no-configs    Do not add page entries to exhibition-panels items.json
+    pdf ...         Only process these PDFs (default: all PDFs directly in
+                    content/files/Tabule)
+
+Output:
+    Page 1 keeps the name the shell script used (<name>.dzi + <name>_files),
+    so existing items.json entries keep working. Further pages are written
+    as <name>_page-2.dzi, <name>_page-3.dzi, ...
+
+    For every config entry pointing at <name>.dzi, entries for the other
+    pages are inserted right after it (and entries for pages that no longer
+    exist are removed).
+
+Requires pyvips (pip install pyvips) with libvips built with PDF support
+(poppler or pdfium).
+"""
+
+import argparse
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from content_config import (
+    CONTENT_DIR, PANELS_DIR, PANEL_CONFIGS_DIR,
+    DZI_DPI, DZI_TILE_SUFFIX, DZI_OVERLAP
+)
+from config_repository import get_repository
+from derivative_cache import DerivativeCache, remove_output
+
+try:
+    import pyvips
+except ImportError:
+    pyvips = None
+
+# Derivative cache kind and the settings the tiles depend on
+CACHE_KIND = "dzi"
+DZI_PARAMS = {'pages': 'all', 'dpi': DZI_DPI, 'suffix': DZI_TILE_SUFFIX, 'overlap': DZI_OVERLAP}
+
+_PAGE_SUFFIX_RE = re.compile(r'_page-(\d+)\.dzi$')
+
+
+def page_basename(pdf_path, page):
+    """Return the output base path (without .dzi) for a 1-based page number."""
+    pdf_path = Path(pdf_path)
+    if page == 1:
+        return pdf_path.with_suffix('')
+    return pdf_path.with_name(f"{pdf_path.stem}_page-{page}")
+
+
+def page_outputs(pdf_path, page):
+    """Return the .dzi file and the tile folder for a page."""
+    base = page_basename(pdf_path, page)
+    return [f"{base}.dzi", f"{base}_files"]
+
+
+def find_pdfs(source_dir=PANELS_DIR):
+    """Find PDFs directly in the panels folder (not in subdirectories)."""
+    if not source_dir.is_dir():
+        return []
+    return sorted(str(entry) for entry in source_dir.iterdir()
+                  if entry.is_file() and entry.suffix.lower() == '.pdf')
+
+
+def render_pdf(pdf_path):
+    """
+    Worker: render every page of a PDF to Deep Zoom tiles.
+
+    Each page is loaded lazily by libvips and written by dzsave through the
+    same pipeline, so the full-size raster never touches the disk. Tiles are
+    written under a temporary name and moved into place when the page is
+    done, so an interrupted run never leaves half a pyramid under the real
+    name.
+
+    Returns:
+        Tuple (pdf_path, page count, error message or None)
+    """
+    try:
+        pages = pyvips.Image.new_from_file(pdf_path, access='sequential').get('n-pages')
+        for page in range(1, pages + 1):
+            image = pyvips.Image.pdfload(pdf_path, page=page - 1, dpi=DZI_DPI,
+                                         access='sequential')
+            if image.hasalpha():
+                image = image.flatten(background=[255, 255, 255])
+
+            base = page_basename(pdf_path, page)
+            tmp_base = base.with_name(f".{base.name}.tmp")
+            image.dzsave(str(tmp_base), suffix=DZI_TILE_SUFFIX, overlap=DZI_OVERLAP)
+
+            for final, tmp in zip(page_outputs(pdf_path, page),
+                                  [f"{tmp_base}.dzi", f"{tmp_base}_files"]):
+                remove_output(final)
+                os.replace(tmp, final)
+    except Exception as e:
+        return pdf_path, 0, str(e) or e.__class__.__name__
+    return pdf_path, pages, None
+
+
+def remove_extra_pages(pdf_path, pages):
+    """Delete tiles of pages beyond the current page count (PDF got shorter)."""
+    pdf_path = Path(pdf_path)
+    prefix = f"{pdf_path.stem}_page-"
+    for entry in pdf_path.parent.iterdir():
+        match = _PAGE_SUFFIX_RE.search(entry.name)
+        if entry.name.startswith(prefix) and match and int(match.group(1)) > pages:
+            for out in page_outputs(pdf_path, int(match.group(1))):
+                remove_output(out)
+
+
+def content_path(path):
+    """Return a path as referenced in items.json (relative to content/)."""
+    return Path(path).relative_to(CONTENT_DIR).as_posix()
+
+
+def update_panel_configs(page_counts, configs_dir=PANEL_CONFIGS_DIR):
+    """
+    Add entries for pages 2..N after every entry pointing at a panel's page 1.
+
+    Args:
+        page_counts: Dictionary of PDF path -> number of rendered pages
+
+    Returns:
+        List of updated config files
+    """
+    # items.json path of page 1 -> (pdf path, page count)
+    first_pages = {
+        content_path(f"{page_basename(pdf, 1)}.dzi"): (pdf, pages)
+        for pdf, pages in page_counts.items()
+    }
+    repo = get_repository()
+    updated = []
+
+    for items_file in sorted(configs_dir.rglob("items.json")):
+        data = repo.load(items_file)
+        items = data.get('items', [])
+        if not any(item.get('path') in first_pages for item in items):
+            continue
+
+        existing = {item.get('path'): item for item in items}
+        new_items = []
+        for item in items:
+            path = item.get('path') or ''
+            match = _PAGE_SUFFIX_RE.search(path)
+            if match and f"{path[:match.start()]}.dzi" in first_pages:
+                # Generated page entry, re-inserted below in page order
+                continue
+            new_items.append(item)
+            if path in first_pages:
+                pdf, pages = first_pages[path]
+                title = item.get('title', Path(pdf).stem)
+                for page in range(2, pages + 1):
+                    page_path = content_path(f"{page_basename(pdf, page)}.dzi")
+                    # Keep hand-edited page entries (description, keywords...)
+                    new_items.append(existing.get(page_path) or {
+                        'path': page_path,
+                        'type': 'panel',
+                        'title': f"{title} - strana {page}"
+                    })
+
+        if new_items != items:
+            data['items'] = new_items
+            repo.mark_dirty(items_file)
+            updated.append(items_file)
+
+    repo.flush()
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate DZI tiles for exhibition panels")
+    parser.add_argument('--jobs', type=int, default=2,
+                        help="number of panels rendered in parallel (default: 2)")
+    parser.add_argument('--no-configs', action='store_true',
+                        help="do not add page entries to items.json")
+    parser.add_argument('pdfs', nargs='*', help="PDFs to process (default: all panels)")
+    args = parser.parse_args()
+
+    print("=" * 40)
+    print("  DZI Tile Generator for Panels")
+    print("=" * 40)
+
+    if pyvips is None:
+        print("✗ Error: pyvips not found!")
+        print()
+        print("Please install libvips and pyvips:")
+        print("  macOS:  brew install vips && pip install pyvips")
+        print("  Ubuntu: sudo apt install libvips42 && pip install pyvips")
+        sys.exit(1)
+
+    pdfs = args.pdfs or find_pdfs()
+    print(f"Found {len(pdfs)} PDFs")
+    print()
+
+    created = skipped = errors = 0
+    page_counts = {}
+
+    with DerivativeCache() as cache:
+        todo = []
+        for pdf in pdfs:
+            if cache.is_fresh(CACHE_KIND, pdf, DZI_PARAMS):
+                entry = cache.lookup(CACHE_KIND, pdf)
+                page_counts[pdf] = len(entry['outputs']) // 2
+                skipped += 1
+            else:
+                todo.append(pdf)
+
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = [pool.submit(render_pdf, pdf) for pdf in todo]
+            for future in as_completed(futures):
+                pdf, pages, error = future.result()
+                if error:
+                    print(f"✗ Failed to generate DZI: {pdf} ({error})")
+                    errors += 1
+                    continue
+                remove_extra_pages(pdf, pages)
+                outputs = [out for page in range(1, pages + 1) for out in page_outputs(pdf, page)]
+                cache.record(CACHE_KIND, pdf, DZI_PARAMS, outputs)
+                page_counts[pdf] = pages
+                created += 1
+                print(f"✓ Created: {Path(pdf).stem} ({pages} pages)")
+
+        if not args.pdfs:
+            for out in cache.prune(CACHE_KIND):
+                print(f"✓ Removed orphaned tiles: {out}")
+
+    if not args.no_configs:
+        for items_file in update_panel_configs(page_counts):
+            print(f"✓ Updated page entries: {items_file}")
+
+    print()
+    print("=" * 40)
+    print("  Summary")
+    print("=" * 40)
+    print(f"Total PDFs found:        {len(pdfs)}")
+    print(f"DZI tiles created:       {created}")
+    print(f"DZI tiles skipped:       {skipped}")
+    print(f"Errors:                  {errors}")
+
+    if errors:
+        sys.exit(1)
+    print("✓ Done!")
+
+
+if __name__ == '__main__':
+    main()
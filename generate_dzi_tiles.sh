@@ -19,6 +19,10 @@ errors=0
 # Source directory
 SOURCE_DIR="content/files/Tabule"
 
+# Generation settings, recorded in the derivative cache index
+# (derivative_cache.py) so tiles are rebuilt when the PDF or settings change
+DZI_PARAMS="page=1,dpi=300,suffix=.jpg[Q=95],overlap=0"
+
 echo -e "${BLUE}========================================${NC}"
 echo -e "${BLUE}  DZI Tile Generator for Panels${NC}"
 echo -e "${BLUE}========================================${NC}"
@@ -60,18 +64,22 @@ process_pdf() {
     local pdf_dir=$(dirname "$pdf_path")
     local pdf_name=$(basename "$pdf_path" .pdf)
     local dzi_path="$pdf_dir/${pdf_name}.dzi"
+    local dzi_files="$pdf_dir/${pdf_name}_files"
     local png_temp="$pdf_dir/${pdf_name}_page-1.png"
     local tif_temp="$pdf_dir/${pdf_name}_page-1.tif"
 
     ((total_pdfs++))
 
-    # Check if DZI already exists
-    if [ -f "$dzi_path" ]; then
-#        echo -e "${YELLOW}⊙${NC} Skipping (exists): $pdf_name.dzi"
+    # Check if DZI is up to date (same PDF content and settings)
+    if python3 derivative_cache.py check dzi "$pdf_path" "$DZI_PARAMS" "$dzi_path" "$dzi_files"; then
+#        echo -e "${YELLOW}⊙${NC} Skipping (up to date): $pdf_name.dzi"
         ((skipped_dzi++))
         return 0
     fi
 
+    # Remove stale tiles before regenerating
+    rm -rf "$dzi_path" "$dzi_files"
+
     echo -e "${BLUE}→${NC} Processing: $pdf_name.pdf"
 
     # Step 1: Convert PDF to PNG using pdftoppm (first page only)
@@ -104,6 +112,7 @@ process_pdf() {
     if [ $? -eq 0 ] && [ -f "$dzi_path" ]; then
         echo -e "${GREEN}✓${NC} Created: $pdf_name.dzi"
         ((created_dzi++))
+        python3 derivative_cache.py record dzi "$pdf_path" "$DZI_PARAMS" "$dzi_path" "$dzi_files"
 
         # Clean up temporary files
         rm -f "$png_temp" "$tif_temp"
@@ -126,6 +135,9 @@ while IFS= read -r -d '' pdf_file; do
     process_pdf "$pdf_file"
 done < <(find "$SOURCE_DIR" -maxdepth 1 -type f -name "*.pdf" -print0)
 
+# Remove tiles of PDFs that no longer exist
+python3 derivative_cache.py prune dzi
+
 # Print statistics
 echo ""
 echo -e "${BLUE}========================================${NC}"
@@ -6,7 +6,33 @@ This script generates items.json files from directory contents with proper
 NFC Unicode normalization for cross-platform compatibility (macOS/Linux).
 
 Usage:
-    python3 generate_items_json.py <source_directory> <output_file>
+    python3 generate_items_json.py <source_directory> <output_file> [--manifest | --stream] [--enrich] [--scan-jobs N]
+    python3 generate_items_json.py --batch <targets.toml|targets.json> [--enrich] [--scan-jobs N]
+
+Options:
+    --manifest      Incremental mode: keep a scan manifest next to the output
+                    and only rescan directories that changed since last run
+    --stream        Streaming mode for very large collections: walk the tree
+                    in sorted order and write each item as soon as it is
+                    found, to a temporary file renamed into place at the end.
+                    Memory stays flat; the output is byte-identical.
+    --batch FILE    Regenerate many items.json files in one process. FILE maps
+                    source directories to output files, either as a TOML
+                    [targets] table or a JSON object (optionally under
+                    "targets"). The files tree is walked once and every file
+                    is dispatched to each target whose source contains it.
+    --enrich        Add width, height, fileSize, dateTaken and blurhash to
+                    image items (see image_metadata.py). Headers are read in
+                    a process pool and results cached by file signature, so
+                    re-runs only look at new or changed images. Responsive
+                    ladders made by derivatives.py are added as well.
+    --scan-jobs N   List up to N directories concurrently instead of walking
+                    the tree one call at a time (see concurrent_scan.py).
+                    For content on NFS/SMB mounts; the items are the same.
+                    Not used with --manifest or --stream.
+
+Timing and profiling: --stats[=FILE], --profile[=FILE], --trace-memory (see
+instrumentation.py).
 
 Example:
     python3 generate_items_json.py "content/files/FOTO/DTJ" "content/configs/photos/dtj/items.json"
@@ -14,8 +40,15 @@ Example:
 The script:
 1. Scans the source directory for images and documents
 2. Generates properly formatted items with NFC-normalized paths
-3. Excludes thumbnail directories
+3. Excludes thumbnail and responsive derivative directories
 4. Auto-detects file types
+5. Sorts items naturally with Czech collation ("Strana 2" before "Strana 10",
+   see ordering.py)
+
+In --manifest mode the script records directory mtimes and file signatures
+(size, mtime, inode) in <output_file>.manifest. Later runs descend only into
+directories whose mtime changed, merge added/removed files into the existing
+item list and keep hand-edited fields (description, keywords, display, ...).
 """
 
 import os
@@ -24,6 +57,28 @@ import json
 import unicodedata
 from pathlib import Path
 
+from concurrent_scan import scan_tree
+from instrumentation import count, instrumented, phase
+from ordering import path_key, sort_key
+from path_resolver import PathResolver
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+# Supported extensions
+SUPPORTED_EXTS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.pdf',
+                  '.txt', '.md', '.mp4', '.avi', '.mov', '.webm', '.mp3', '.wav', '.ogg'}
+
+# Directories holding generated derivatives, never listed as items
+THUMBNAIL_DIRS = {'thumbnail', 'thumbnails', 'responsive'}
+
+# Manifest is stored next to the output. It must not end in ".json",
+# otherwise server.js would merge it as another items file.
+MANIFEST_SUFFIX = '.manifest'
+MANIFEST_VERSION = 1
+
 
 def normalize_to_nfc(text):
     """Normalize text to NFC (composed) form for Linux compatibility."""
@@ -47,13 +102,15 @@ def get_file_type(extension):
         return 'document'
 
 
-def generate_items(source_dir, base_path):
+def generate_items(source_dir, base_path, scan_jobs=None):
     """
     Generate items list from directory contents.
 
     Args:
         source_dir: Directory to scan for files
         base_path: Base path to use in items (e.g., "files/FOTO/DTJ")
+        scan_jobs: List this many directories concurrently (see
+            concurrent_scan.py); None walks the tree sequentially
 
     Returns:
         List of item dictionaries
@@ -65,74 +122,502 @@ def generate_items(source_dir, base_path):
         print(f"Error: Directory not found: {source_dir}")
         sys.exit(1)
 
-    # Supported extensions
-    supported_exts = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.pdf',
-                      '.txt', '.md', '.mp4', '.avi', '.mov', '.webm', '.mp3', '.wav', '.ogg'}
-
     # Find all files recursively
     all_files = []
-    for file_path in source_path.rglob('*'):
-        if file_path.is_file():
-            # Skip thumbnails and hidden files
-            if 'thumbnail' not in file_path.parts and not file_path.name.startswith('.'):
-                if file_path.suffix.lower() in supported_exts:
-                    # Get relative path from source directory
+    with phase('scan'):
+        if scan_jobs:
+            all_files = [rel_path for rel_path in scan_tree(source_path, scan_jobs, THUMBNAIL_DIRS)
+                         if is_supported_file(rel_path)]
+        else:
+            for file_path in source_path.rglob('*'):
+                if file_path.is_file():
                     rel_path = file_path.relative_to(source_path)
-                    all_files.append((file_path, rel_path))
+                    # Skip thumbnails and hidden files
+                    if is_supported_file(rel_path):
+                        all_files.append(rel_path)
+    count('files', len(all_files))
 
-    # Sort files
-    all_files.sort(key=lambda x: str(x[1]))
+    with phase('transform'):
+        # Sort files (natural, Czech-aware order, see ordering.py)
+        all_files.sort(key=file_sort_key)
 
-    # Generate items
-    for file_path, rel_path in all_files:
-        # Normalize all path components to NFC
-        path_parts = [base_path] + [normalize_to_nfc(part) for part in rel_path.parts]
-        normalized_path = '/'.join(path_parts)
+        # Generate items
+        for rel_path in all_files:
+            items.append(make_item(rel_path, base_path))
 
-        # Generate title from filename
-        title = normalize_to_nfc(file_path.stem)
+    return items
 
+
+def file_sort_key(rel_path):
+    """Sort key of a file path relative to the source directory."""
+    return path_key(rel_path.as_posix())
+
+
+def _sorted_entries(directory):
+    """
+    List a directory for iter_sorted_files(), in output order.
+
+    Paths compare component by component, so sorting every listing by
+    sort_key() of the names yields the order of file_sort_key().
+
+    Returns:
+        Iterator of (name, is_dir, path)
+    """
+    entries = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                # Like Path.rglob(): symlinked directories are not followed
+                if entry.is_dir(follow_symlinks=False):
+                    entries.append((sort_key(entry.name), entry.name, True, entry.path))
+                elif entry.is_file():
+                    entries.append((sort_key(entry.name), entry.name, False, entry.path))
+    except OSError as e:
+        print(f"Error reading {directory}: {e}")
+    entries.sort()
+    return ((name, is_dir, path) for _, name, is_dir, path in entries)
+
+
+def iter_sorted_files(source_dir):
+    """
+    Yield supported files in the order generate_items() sorts them.
+
+    Only one directory listing per level of the current path is held in
+    memory, so memory use does not grow with the size of the collection.
+
+    Args:
+        source_dir: Directory to scan for files
+
+    Yields:
+        File paths relative to source_dir
+    """
+    stack = [((), _sorted_entries(source_dir))]
+    while stack:
+        parts, entries = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        name, is_dir, path = entry
+        if is_dir:
+            if name not in THUMBNAIL_DIRS:
+                stack.append((parts + (name,), _sorted_entries(path)))
+        else:
+            rel_path = Path(*parts, name)
+            if is_supported_file(rel_path):
+                yield rel_path
+
+
+def is_supported_file(rel_path):
+    """Check whether a file (relative to the source directory) becomes an item."""
+    if THUMBNAIL_DIRS.intersection(rel_path.parts[:-1]):
+        return False
+    if rel_path.name.startswith('.'):
+        return False
+    return rel_path.suffix.lower() in SUPPORTED_EXTS
+
+
+def make_item(rel_path, base_path):
+    """Build a fresh item dictionary for a file relative to the source directory."""
+    # Normalize all path components to NFC
+    path_parts = [base_path] + [normalize_to_nfc(part) for part in rel_path.parts]
+    normalized_path = '/'.join(path_parts)
+
+    return {
+        'path': normalized_path,
         # Determine file type
-        file_type = get_file_type(file_path.suffix)
+        'type': get_file_type(rel_path.suffix),
+        # Generate title from filename
+        'title': normalize_to_nfc(rel_path.stem)
+    }
 
-        items.append({
-            'path': normalized_path,
-            'type': file_type,
-            'title': title
-        })
 
-    return items
+def load_manifest(manifest_file):
+    """
+    Load a scan manifest written by a previous --manifest run.
 
+    Returns:
+        Dictionary of directory records keyed by relative directory path
+        ("" for the source root), or an empty dict if there is no usable manifest
+    """
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-def main():
-    """Main function."""
-    if len(sys.argv) < 3:
-        print("Usage: python3 generate_items_json.py <source_directory> <output_file>")
-        print("\nExample:")
-        print('  python3 generate_items_json.py "content/files/FOTO/DTJ" "content/configs/photos/dtj/items.json"')
+    if data.get('version') != MANIFEST_VERSION:
+        return {}
+    return data.get('dirs', {})
+
+
+def save_manifest(manifest_file, source_dir, dirs):
+    """Write the scan manifest next to the output file."""
+    data = {
+        'version': MANIFEST_VERSION,
+        'source': source_dir,
+        'dirs': dirs
+    }
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def scan_incremental(source_dir, old_dirs):
+    """
+    Scan the source directory, reusing manifest records of unchanged directories.
+
+    A directory whose mtime matches the manifest has the same entries as last
+    time, so its file list and subdirectories are taken from the manifest and
+    only its subdirectories are stat-ed. Changed directories are re-listed
+    with os.scandir.
+
+    Args:
+        source_dir: Directory to scan for files
+        old_dirs: Directory records from load_manifest()
+
+    Returns:
+        Tuple (files, dirs, rescanned) where files is a list of relative file
+        paths, dirs the new directory records and rescanned the number of
+        directories that had to be listed again
+    """
+    files = []
+    dirs = {}
+    rescanned = 0
+    pending = ['']
+
+    while pending:
+        rel_dir = pending.pop()
+        abs_dir = os.path.join(source_dir, rel_dir) if rel_dir else source_dir
+        try:
+            mtime = os.stat(abs_dir).st_mtime_ns
+        except OSError:
+            continue
+
+        record = old_dirs.get(rel_dir)
+        if record is None or record.get('mtime') != mtime:
+            record = {'mtime': mtime, 'files': {}, 'subdirs': []}
+            rescanned += 1
+            with os.scandir(abs_dir) as entries:
+                for entry in entries:
+                    # Like Path.rglob(): symlinked directories are not followed
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in THUMBNAIL_DIRS:
+                            record['subdirs'].append(entry.name)
+                    elif entry.is_file(follow_symlinks=True):
+                        rel_path = Path(rel_dir, entry.name)
+                        if is_supported_file(rel_path):
+                            st = entry.stat()
+                            record['files'][entry.name] = [st.st_size, st.st_mtime_ns, st.st_ino]
+
+        dirs[rel_dir] = record
+        for name in record['files']:
+            files.append(Path(rel_dir, name))
+        for name in record['subdirs']:
+            pending.append(f"{rel_dir}/{name}" if rel_dir else name)
+
+    files.sort(key=file_sort_key)
+    return files, dirs, rescanned
+
+
+def merge_items(existing_items, scanned_items, removed_paths, known_paths=()):
+    """
+    Merge freshly scanned items into an existing item list.
+
+    Existing items are kept as they are (including hand-edited fields such as
+    description, keywords or display) unless their file was removed. New
+    items are inserted in sorted position among the existing ones.
+
+    Args:
+        existing_items: Items currently stored in the output file
+        scanned_items: Sorted items generated from the current scan
+        removed_paths: Paths of files that disappeared since the last scan
+        known_paths: Paths seen by the previous scan; these are not re-added
+            even if a curator deleted their entry from the output by hand
+
+    Returns:
+        Tuple (items, added_count, removed_count)
+    """
+    kept = [item for item in existing_items if item.get('path') not in removed_paths]
+    removed_count = len(existing_items) - len(kept)
+    known_paths = set(known_paths) | {item.get('path') for item in kept}
+    new_items = [item for item in scanned_items if item['path'] not in known_paths]
+
+    new_keys = [path_key(item['path']) for item in new_items]
+    merged = []
+    i = 0
+    for item in kept:
+        key = path_key(item.get('path', ''))
+        while i < len(new_items) and new_keys[i] < key:
+            merged.append(new_items[i])
+            i += 1
+        merged.append(item)
+    merged.extend(new_items[i:])
+
+    return merged, len(new_items), removed_count
+
+
+def generate_items_incremental(source_dir, base_path, output_file, quiet=False, stats=None):
+    """
+    Generate items using the scan manifest stored next to the output file.
+
+    Args:
+        source_dir: Directory to scan
+        base_path: Item path prefix (see get_base_path())
+        output_file: items.json file whose items are merged
+        quiet: Do not print progress lines
+        stats: Optional dict receiving added, removed and rescanned counts
+
+    Returns:
+        Tuple (items, changed, dirs) where changed is False if the output file
+        is already up to date and dirs are the directory records to save with
+        save_manifest() once the output is written
+    """
+    if not Path(source_dir).exists():
+        print(f"Error: Directory not found: {source_dir}")
         sys.exit(1)
 
-    source_dir = sys.argv[1]
-    output_file = sys.argv[2]
+    with phase('parse'):
+        old_dirs = load_manifest(output_file + MANIFEST_SUFFIX)
+    with phase('scan'):
+        files, dirs, rescanned = scan_incremental(source_dir, old_dirs)
+    count('files', len(files))
+    count('dirs_rescanned', rescanned)
+
+    if not quiet:
+        print(f"Rescanned {rescanned} of {len(dirs)} directories")
+
+    existing_items = []
+    if os.path.exists(output_file):
+        with phase('parse'):
+            with open(output_file, 'r', encoding='utf-8') as f:
+                existing_items = json.load(f).get('items', [])
+        count('bytes_read', os.path.getsize(output_file))
+
+    with phase('transform'):
+        scanned_items = [make_item(rel_path, base_path) for rel_path in files]
+        old_paths = {
+            make_item(Path(rel_dir, name), base_path)['path']
+            for rel_dir, record in old_dirs.items()
+            for name in record.get('files', {})
+        }
+        removed_paths = old_paths - {item['path'] for item in scanned_items}
+
+        items, added, removed = merge_items(existing_items, scanned_items, removed_paths, old_paths)
+    if not quiet:
+        print(f"Added {added} items, removed {removed} items")
+    if stats is not None:
+        stats.update(added=added, removed=removed, rescanned=rescanned)
+
+    changed = added > 0 or removed > 0 or not os.path.exists(output_file)
+    return items, changed, dirs
+
+
+def file_resolver(source_dir, base_path):
+    """
+    Return a function mapping an item back to its file in source_dir.
 
-    # Extract base path from source directory
-    # Assumes source is like "content/files/FOTO/DTJ"
-    # and we want base path like "files/FOTO/DTJ"
-    if source_dir.startswith('content/'):
-        base_path = source_dir.replace('content/', '', 1)
+    Item paths are NFC; a file stored under another Unicode form (macOS) is
+    found through PathResolver.
+    """
+    resolver = PathResolver(source_dir)
+    prefix = base_path + '/'
+
+    def resolve(item):
+        path = item.get('path', '')
+        if not path.startswith(prefix):
+            return None
+        rel = path[len(prefix):]
+        candidate = os.path.join(source_dir, rel)
+        if os.path.isfile(candidate):
+            return candidate
+        return resolver.resolve(rel)
+
+    return resolve
+
+
+def enrich(items, source_dir, base_path):
+    """
+    Add image metadata (image_metadata.py) and the responsive ladders built
+    by derivatives.py to items, lazily and in order.
+
+    Returns:
+        Tuple (iterator of items, stats dict filled while iterating)
+    """
+    from image_metadata import iter_enriched
+
+    resolve = file_resolver(source_dir, base_path)
+    stats = {'ladders': 0}
+    return _with_ladders(iter_enriched(items, resolve, stats=stats), resolve, stats), stats
+
+
+def _with_ladders(items, resolve, stats):
+    """Set "derivatives" of image items that have a stored ladder."""
+    from derivatives import get_ladder
+    from derivative_cache import DerivativeCache
+
+    with DerivativeCache() as cache:
+        for item in items:
+            if item.get('type') == 'image':
+                path = resolve(item)
+                ladder = get_ladder(cache, path) if path is not None else None
+                if ladder and item.get('derivatives') != ladder:
+                    item['derivatives'] = ladder
+                    stats['ladders'] += 1
+            yield item
+
+
+def print_enrich_stats(stats):
+    """Print the summary of an enrich() run."""
+    print(f"Image metadata: {stats['images']} images, {stats['cached']} cached, "
+          f"{stats['changed']} items updated, {stats['ladders']} responsive ladders added")
+    if stats['errors']:
+        print(f"✗ {stats['errors']} images could not be read")
+
+
+def load_batch_targets(batch_file):
+    """
+    Load the source directory -> output file mapping for --batch mode.
+
+    Returns:
+        Dictionary mapping normalized source directories to output files
+    """
+    if batch_file.endswith('.toml'):
+        if tomllib is None:
+            print("Error: TOML batch files require Python 3.11+ (use JSON instead)")
+            sys.exit(1)
+        with open(batch_file, 'rb') as f:
+            data = tomllib.load(f)
     else:
-        base_path = source_dir
+        with open(batch_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
 
-    print(f"Scanning: {source_dir}")
-    print(f"Base path: {base_path}")
-    print(f"Output: {output_file}")
-    print("=" * 70)
+    targets = data.get('targets', data)
+    return {os.path.normpath(source): output for source, output in targets.items()}
 
-    # Generate items
-    items = generate_items(source_dir, base_path)
 
-    print(f"Found {len(items)} items")
+def scan_targets(sources, jobs=None):
+    """
+    Scan several source directories in a single filesystem traversal.
+
+    The walk starts at the common ancestor of all sources, descends only into
+    directories that lead to or lie inside a source, and dispatches each file
+    to every source that contains it. Nested sources therefore get the same
+    files as separate generate_items() calls, without rescanning the subtree.
+
+    Args:
+        sources: Iterable of normalized source directories
+        jobs: List this many directories concurrently (see
+            scan_targets_concurrent()); None walks sequentially
 
+    Returns:
+        Dictionary mapping each source to a sorted list of relative file paths
+    """
+    sources = sorted(set(sources))
+    if jobs:
+        return scan_targets_concurrent(sources, jobs)
+    files = {source: [] for source in sources}
+    if not sources:
+        return files
+
+    root = os.path.commonpath(sources)
+    # Directories on the way from the common root down to a source
+    ancestors = set()
+    for source in sources:
+        parent = os.path.dirname(source)
+        while parent and len(parent) >= len(root):
+            ancestors.add(parent)
+            parent = os.path.dirname(parent)
+
+    # Stack of (directory, [(source, relative parts), ...] owning it)
+    pending = [(root, [])]
+    while pending:
+        current, owners = pending.pop()
+        if current in files:
+            owners = owners + [(current, ())]
+        try:
+            entries = list(os.scandir(current))
+        except OSError as e:
+            print(f"Error reading {current}: {e}")
+            continue
+
+        for entry in entries:
+            # Like Path.rglob(): symlinked directories are not followed
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name in THUMBNAIL_DIRS:
+                    continue
+                if owners or entry.path in ancestors or entry.path in files:
+                    pending.append((entry.path, [(source, parts + (entry.name,))
+                                                 for source, parts in owners]))
+            elif (entry.path in ancestors or entry.path in files) and entry.is_dir():
+                # A symlinked source (or the way to one) is read like a
+                # separate run would read it, without the sources around it
+                if entry.name not in THUMBNAIL_DIRS:
+                    pending.append((entry.path, []))
+            elif owners and entry.is_file(follow_symlinks=True):
+                for source, parts in owners:
+                    rel_path = Path(*parts, entry.name)
+                    if is_supported_file(rel_path):
+                        files[source].append(rel_path)
+
+    for source_files in files.values():
+        source_files.sort(key=file_sort_key)
+    return files
+
+
+def scan_targets_concurrent(sources, jobs):
+    """
+    Scan several source directories like scan_targets(), but concurrently.
+
+    Each outermost source is listed with scan_tree(); a source nested in
+    another one takes its files from the outer listing, unless it is reached
+    through a symlink the outer listing did not follow.
+
+    Returns:
+        Dictionary mapping each source to a sorted list of relative file paths
+    """
+    files = {}
+    listed = []
+    for source in sorted(set(sources)):
+        parent = max((path for path in listed if source.startswith(path + os.sep)),
+                     key=len, default=None)
+        if parent is None or _through_symlink(parent, source):
+            listed.append(source)
+            files[source] = scan_tree(source, jobs, THUMBNAIL_DIRS)
+            continue
+        prefix = Path(os.path.relpath(source, parent)).parts
+        files[source] = [Path(*rel_path.parts[len(prefix):]) for rel_path in files[parent]
+                         if rel_path.parts[:len(prefix)] == prefix]
+
+    for source, rel_paths in files.items():
+        files[source] = sorted((rel_path for rel_path in rel_paths if is_supported_file(rel_path)),
+                               key=file_sort_key)
+    return files
+
+
+def _through_symlink(parent, source):
+    """Check whether the path from parent down to source passes a symlink."""
+    path = parent
+    for part in Path(os.path.relpath(source, parent)).parts:
+        path = os.path.join(path, part)
+        if os.path.islink(path):
+            return True
+    return False
+
+
+def get_base_path(source_dir):
+    """
+    Extract base path from source directory.
+
+    Assumes source is like "content/files/FOTO/DTJ"
+    and we want base path like "files/FOTO/DTJ"
+    """
+    if source_dir.startswith('content/'):
+        return source_dir.replace('content/', '', 1)
+    return source_dir
+
+
+def write_items_file(output_file, items):
+    """Write items to an items.json file, creating the directory if needed."""
     # Create output directory if needed
     output_path = Path(output_file)
     output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -143,9 +628,184 @@ def main():
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(output_data, f, ensure_ascii=False, indent=2)
 
+
+def write_items_stream(output_file, items):
+    """
+    Write items one by one to an items.json file.
+
+    The output is byte-identical to write_items_file() (json.dump with
+    indent=2), but items are consumed from an iterator and never collected
+    in a list. Data goes to a temporary file that replaces the output only
+    when everything is written, so readers never see a partial file.
+
+    Args:
+        output_file: items.json file to write
+        items: Iterable of item dictionaries, in output order
+
+    Returns:
+        Number of written items
+    """
+    output_path = Path(output_file)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+
+    written = 0
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('{\n  "items": [')
+            for item in items:
+                text = json.dumps(item, ensure_ascii=False, indent=2)
+                f.write(',\n    ' if written else '\n    ')
+                f.write(text.replace('\n', '\n    '))
+                written += 1
+            f.write('\n  ]\n}' if written else ']\n}')
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    return written
+
+
+def run_batch(batch_file, use_enrich=False, scan_jobs=None):
+    """Regenerate every target listed in a batch file with one shared scan."""
+    targets = load_batch_targets(batch_file)
+
+    print(f"Batch file: {batch_file}")
+    print(f"Targets: {len(targets)}")
+    print("=" * 70)
+
+    missing = [source for source in targets if not os.path.isdir(source)]
+    for source in missing:
+        print(f"✗ Directory not found, skipping: {source}")
+
+    with phase('scan'):
+        files = scan_targets((source for source in targets if source not in missing), scan_jobs)
+
+    for source, rel_paths in files.items():
+        output_file = targets[source]
+        base_path = get_base_path(source)
+        count('files', len(rel_paths))
+        with phase('transform'):
+            items = [make_item(rel_path, base_path) for rel_path in rel_paths]
+        if use_enrich:
+            with phase('enrich'):
+                enriched, stats = enrich(items, source, base_path)
+                items = list(enriched)
+        with phase('write'):
+            write_items_file(output_file, items)
+        count('bytes_written', os.path.getsize(output_file))
+        print(f"✓ {output_file}: {len(items)} items")
+        if use_enrich:
+            print_enrich_stats(stats)
+
+    print("=" * 70)
+    print(f"✓ Generated {len(files)} items files from a single scan")
+    if missing:
+        print(f"✗ Skipped {len(missing)} targets (source not found)")
+        sys.exit(1)
+
+
+def _option_value(name):
+    """Return the value following a command-line option, or None."""
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return None
+
+
+def main():
+    """Main function."""
+    args = [arg for i, arg in enumerate(sys.argv[1:], 1)
+            if not arg.startswith('--') and sys.argv[i - 1] != '--scan-jobs']
+    scan_jobs = int(_option_value('--scan-jobs')) if _option_value('--scan-jobs') else None
+    use_manifest = '--manifest' in sys.argv
+    use_stream = '--stream' in sys.argv
+    use_enrich = '--enrich' in sys.argv
+
+    if '--batch' in sys.argv:
+        if not args:
+            print("Usage: python3 generate_items_json.py --batch <targets.toml|targets.json> [--enrich] [--scan-jobs N]")
+            sys.exit(1)
+        run_batch(args[0], use_enrich, scan_jobs)
+        return
+
+    if len(args) < 2:
+        print("Usage: python3 generate_items_json.py <source_directory> <output_file> [--manifest | --stream] [--enrich] [--scan-jobs N]")
+        print("       python3 generate_items_json.py --batch <targets.toml|targets.json> [--enrich] [--scan-jobs N]")
+        print("\nExample:")
+        print('  python3 generate_items_json.py "content/files/FOTO/DTJ" "content/configs/photos/dtj/items.json"')
+        sys.exit(1)
+
+    if use_manifest and use_stream:
+        print("Error: --manifest merges into the existing items and cannot be used with --stream")
+        sys.exit(1)
+
+    source_dir = args[0]
+    output_file = args[1]
+
+    base_path = get_base_path(source_dir)
+
+    print(f"Scanning: {source_dir}")
+    print(f"Base path: {base_path}")
+    print(f"Output: {output_file}")
+    print("=" * 70)
+
+    if use_stream:
+        if not Path(source_dir).exists():
+            print(f"Error: Directory not found: {source_dir}")
+            sys.exit(1)
+        items = (make_item(rel_path, base_path) for rel_path in iter_sorted_files(source_dir))
+        if use_enrich:
+            items, stats = enrich(items, source_dir, base_path)
+        # Scanning, building and writing items are interleaved in this mode
+        with phase('write'):
+            item_count = write_items_stream(output_file, items)
+        count('files', item_count)
+        count('bytes_written', os.path.getsize(output_file))
+        print(f"Found {item_count} items")
+        if use_enrich:
+            print_enrich_stats(stats)
+        print(f"✓ Generated {output_file}")
+        print("✓ All paths normalized to NFC for Linux/Ubuntu compatibility")
+        return
+
+    # Generate items
+    if use_manifest:
+        items, changed, manifest_dirs = generate_items_incremental(source_dir, base_path, output_file)
+        if use_enrich:
+            # Runs even without added/removed files: an edited image keeps
+            # its path, and older outputs may have no metadata yet
+            with phase('enrich'):
+                enriched, stats = enrich(items, source_dir, base_path)
+                items = list(enriched)
+            print_enrich_stats(stats)
+            changed = changed or stats['changed'] > 0 or stats['ladders'] > 0
+        if not changed:
+            save_manifest(output_file + MANIFEST_SUFFIX, source_dir, manifest_dirs)
+            print(f"✓ {output_file} is up to date ({len(items)} items)")
+            return
+    else:
+        items = generate_items(source_dir, base_path, scan_jobs)
+        if use_enrich:
+            with phase('enrich'):
+                enriched, stats = enrich(items, source_dir, base_path)
+                items = list(enriched)
+            print_enrich_stats(stats)
+
+    print(f"Found {len(items)} items")
+
+    with phase('write'):
+        write_items_file(output_file, items)
+        if use_manifest:
+            save_manifest(output_file + MANIFEST_SUFFIX, source_dir, manifest_dirs)
+    count('bytes_written', os.path.getsize(output_file))
+
     print(f"✓ Generated {output_file}")
     print("✓ All paths normalized to NFC for Linux/Ubuntu compatibility")
 
 
 if __name__ == '__main__':
-    main()
+    with instrumented('generate_items_json'):
+        main()
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Parallel, resumable thumbnail generator
+
+Python replacement for generate_thumbnails.sh. Thumbnails are written to a
+'thumbnails' subdirectory next to each image, using the size, quality and
+extensions from content_config.py.
+
+Usage:
+    python3 generate_thumbnails.py [options]
+
+Options:
+    --jobs N            Number of worker processes (default: CPU count)
+    --files FILE        Process only the images listed in FILE (one path per
+                        line, "-" for stdin) instead of scanning content/files
+    --journal FILE      Job journal (default: content/.thumbnails.journal)
+    --resume            Skip images the journal already records as done
+    --prune             Delete thumbnails whose source image no longer exists
+    --benchmark N       Compare against generate_thumbnails.sh on N synthetic
+                        images in a temporary directory
+
+Staleness is decided by the derivative cache index (derivative_cache.py):
+an image is regenerated when its content hash or the thumbnail settings
+changed, not only when the thumbnail is missing. Thumbnails made by the shell
+script before the index existed are adopted if they are newer than their
+source.
+
+The journal records every finished image, so a crashed or interrupted run
+continues where it stopped with --resume. Thumbnails are written to a
+temporary file and renamed, so a crash never leaves a truncated thumbnail
+that would be skipped as "exists" later.
+
+Images are resized with Pillow when it is installed (pip install Pillow),
+otherwise ImageMagick's convert is called per image like the shell script.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from content_config import (
+    CONTENT_DIR, FILES_DIR, THUMBNAIL_DIR_NAME, RESPONSIVE_DIR_NAME,
+    THUMB_WIDTH, THUMB_HEIGHT, THUMB_QUALITY, IMAGE_EXTENSIONS
+)
+from derivative_cache import DEFAULT_DB, DerivativeCache, file_hash, params_key
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+DEFAULT_JOURNAL = CONTENT_DIR / ".thumbnails.journal"
+
+# Derivative cache kind and the settings a thumbnail depends on
+CACHE_KIND = "thumbnail"
+THUMB_PARAMS = {'width': THUMB_WIDTH, 'height': THUMB_HEIGHT, 'quality': THUMB_QUALITY}
+
+# Result statuses reported by workers and stored in the journal
+STATUS_CREATED = "created"
+STATUS_SKIPPED = "skipped"
+STATUS_ERROR = "error"
+
+_IMAGE_SUFFIXES = {f".{ext}" for ext in IMAGE_EXTENSIONS}
+
+
+def is_image(path):
+    """Check if a file is an image by its extension (case-insensitive)."""
+    return os.path.splitext(path)[1].lower() in _IMAGE_SUFFIXES
+
+
+def thumbnail_path(image_path):
+    """Return the thumbnail path for an image: <dir>/thumbnails/<name>."""
+    image_path = Path(image_path)
+    return image_path.parent / THUMBNAIL_DIR_NAME / image_path.name
+
+
+def find_images(root=FILES_DIR):
+    """Find all images under root, skipping thumbnail/responsive directories."""
+    images = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in (THUMBNAIL_DIR_NAME, RESPONSIVE_DIR_NAME)]
+        for name in filenames:
+            if is_image(name):
+                images.append(os.path.join(dirpath, name))
+    images.sort()
+    return images
+
+
+def read_file_list(list_file):
+    """Read image paths from a file (or stdin for "-"), one per line."""
+    if list_file == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(list_file, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and is_image(line.strip())]
+
+
+def _resize_pillow(source, dest):
+    """Create a thumbnail with Pillow (only shrinks, keeps aspect ratio)."""
+    fmt = Image.registered_extensions().get(Path(source).suffix.lower())
+    with Image.open(source) as img:
+        # Let the JPEG decoder scale down while decoding
+        img.draft('RGB', (THUMB_WIDTH, THUMB_HEIGHT))
+        img.thumbnail((THUMB_WIDTH, THUMB_HEIGHT))
+        if fmt == 'JPEG' and img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        img.save(dest, format=fmt, quality=THUMB_QUALITY)
+
+
+def _resize_imagemagick(source, dest):
+    """Create a thumbnail with ImageMagick, same options as the shell script."""
+    ext = Path(source).suffix.lstrip('.').lower()
+    subprocess.run(
+        ['convert', source, '-thumbnail', f'{THUMB_WIDTH}x{THUMB_HEIGHT}>',
+         '-quality', str(THUMB_QUALITY), f'{ext}:{dest}'],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def create_thumbnail(source, dest):
+    """Create a thumbnail atomically (temporary file + rename)."""
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.tmp")
+    try:
+        if Image is not None:
+            _resize_pillow(source, tmp)
+        else:
+            _resize_imagemagick(source, tmp)
+        os.replace(tmp, dest)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def process_image(job):
+    """
+    Worker: create the thumbnail for one image unless it is still valid.
+
+    Args:
+        job: Tuple (image_path, known_hash, adopt). known_hash is the content
+            hash the cache recorded for the current settings (or None); adopt
+            allows keeping an unindexed thumbnail that is newer than its source
+
+    Returns:
+        Tuple (image_path, status, error message or None, content hash)
+    """
+    image_path, known_hash, adopt = job
+    dest = thumbnail_path(image_path)
+    try:
+        content_hash = file_hash(image_path)
+        if dest.exists():
+            if known_hash == content_hash:
+                return image_path, STATUS_SKIPPED, None, content_hash
+            if adopt and dest.stat().st_mtime_ns >= os.stat(image_path).st_mtime_ns:
+                return image_path, STATUS_SKIPPED, None, content_hash
+        create_thumbnail(image_path, dest)
+    except Exception as e:
+        return image_path, STATUS_ERROR, str(e) or e.__class__.__name__, None
+    return image_path, STATUS_CREATED, None, content_hash
+
+
+def plan_jobs(images, cache):
+    """
+    Split images into worker jobs and images that are fresh by stat alone.
+
+    Images whose size and mtime match the cache entry (with the current
+    settings and an existing thumbnail) are skipped without being read.
+    Everything else goes to a worker, which hashes the file in parallel.
+
+    Returns:
+        Tuple (jobs, fresh_images)
+    """
+    params = params_key(THUMB_PARAMS)
+    jobs = []
+    fresh = []
+    for image_path in images:
+        entry = cache.lookup(CACHE_KIND, image_path)
+        if entry is None:
+            jobs.append((image_path, None, True))
+            continue
+        if entry['params'] != params:
+            jobs.append((image_path, None, False))
+            continue
+        try:
+            st = os.stat(image_path)
+        except OSError:
+            jobs.append((image_path, None, False))
+            continue
+        if (st.st_size == entry['size'] and st.st_mtime_ns == entry['mtime_ns']
+                and thumbnail_path(image_path).exists()):
+            fresh.append(image_path)
+        else:
+            jobs.append((image_path, entry['hash'], False))
+    return jobs, fresh
+
+
+def find_orphaned_thumbnails(root=FILES_DIR):
+    """Find thumbnails whose source image no longer exists next to them."""
+    orphans = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        if os.path.basename(dirpath) != THUMBNAIL_DIR_NAME:
+            continue
+        source_dir = os.path.dirname(dirpath)
+        for name in filenames:
+            if is_image(name) and not os.path.exists(os.path.join(source_dir, name)):
+                orphans.append(os.path.join(dirpath, name))
+    return orphans
+
+
+def prune(images, cache, root=FILES_DIR):
+    """
+    Delete thumbnails of images that are gone.
+
+    Covers both indexed thumbnails (via the cache) and thumbnails left in
+    thumbnails/ folders by older runs of the shell script.
+
+    Returns:
+        List of deleted thumbnail paths
+    """
+    removed = cache.prune(CACHE_KIND, live_sources=set(images))
+    for orphan in find_orphaned_thumbnails(root):
+        os.remove(orphan)
+        removed.append(orphan)
+    return removed
+
+
+def load_journal(journal_file):
+    """Return the set of images a previous run finished (created or skipped)."""
+    done = set()
+    try:
+        with open(journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                status, _, path = line.rstrip('\n').partition('\t')
+                if status in (STATUS_CREATED, STATUS_SKIPPED):
+                    done.add(path)
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def run(images, jobs=None, journal_file=DEFAULT_JOURNAL, resume=False, quiet=False,
+        cache=None):
+    """
+    Generate thumbnails for a list of images across a process pool.
+
+    Args:
+        images: List of image paths
+        jobs: Number of worker processes (None = CPU count)
+        journal_file: Job journal path, or None to disable journaling
+        resume: Skip images the journal records as done
+        quiet: Do not print per-image lines
+        cache: DerivativeCache to use (None = open the default index)
+
+    Returns:
+        Dictionary with counts per status, elapsed seconds and images/second
+    """
+    if resume and journal_file:
+        done = load_journal(journal_file)
+        images = [path for path in images if path not in done]
+
+    own_cache = cache is None
+    if own_cache:
+        cache = DerivativeCache()
+    worker_jobs, fresh = plan_jobs(images, cache)
+
+    stats = {STATUS_CREATED: 0, STATUS_SKIPPED: len(fresh), STATUS_ERROR: 0}
+    journal = None
+    if journal_file:
+        Path(journal_file).parent.mkdir(parents=True, exist_ok=True)
+        journal = open(journal_file, 'a' if resume else 'w', encoding='utf-8', buffering=1)
+
+    start = time.perf_counter()
+    try:
+        if journal:
+            for path in fresh:
+                journal.write(f"{STATUS_SKIPPED}\t{path}\n")
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for path, status, error, content_hash in pool.map(process_image, worker_jobs,
+                                                                chunksize=8):
+                stats[status] += 1
+                if status != STATUS_ERROR:
+                    cache.record(CACHE_KIND, path, THUMB_PARAMS, [thumbnail_path(path)],
+                                 content_hash=content_hash)
+                if journal:
+                    journal.write(f"{status}\t{path}\n")
+                if status == STATUS_CREATED and not quiet:
+                    print(f"✓ Created: {thumbnail_path(path)}")
+                elif status == STATUS_ERROR:
+                    print(f"✗ Failed: {path} ({error})")
+    finally:
+        if journal:
+            journal.close()
+        if own_cache:
+            cache.close()
+        else:
+            cache.commit()
+    elapsed = time.perf_counter() - start
+
+    stats['total'] = len(images)
+    stats['seconds'] = elapsed
+    stats['images_per_second'] = len(images) / elapsed if elapsed > 0 else 0.0
+    return stats
+
+
+def print_summary(stats):
+    """Print run statistics in the same layout as the shell script."""
+    print()
+    print("=" * 40)
+    print("  Summary")
+    print("=" * 40)
+    print(f"Total images processed:  {stats['total']}")
+    print(f"Thumbnails created:      {stats[STATUS_CREATED]}")
+    print(f"Thumbnails skipped:      {stats[STATUS_SKIPPED]}")
+    if 'pruned' in stats:
+        print(f"Orphans pruned:          {stats['pruned']}")
+    print(f"Errors:                  {stats[STATUS_ERROR]}")
+    print(f"Elapsed:                 {stats['seconds']:.2f} s")
+    print(f"Throughput:              {stats['images_per_second']:.1f} images/s")
+
+
+def _make_synthetic_images(root, count):
+    """Create count test images (2000x1500) under root/content/files/bench."""
+    bench_dir = Path(root) / FILES_DIR / "bench"
+    bench_dir.mkdir(parents=True)
+    first = bench_dir / "img_00000.jpg"
+    if Image is not None:
+        Image.effect_noise((2000, 1500), 64).convert('RGB').save(first, quality=90)
+    else:
+        subprocess.run(['convert', '-size', '2000x1500', 'plasma:', str(first)], check=True)
+    for i in range(1, count):
+        shutil.copyfile(first, bench_dir / f"img_{i:05d}.jpg")
+
+
+def benchmark(count, jobs=None):
+    """Time generate_thumbnails.sh against this module on synthetic images."""
+    shell_script = Path(__file__).resolve().parent / "generate_thumbnails.sh"
+
+    with tempfile.TemporaryDirectory() as root:
+        bench_db = Path(root) / DEFAULT_DB
+        _make_synthetic_images(root, count)
+        bench_dir = Path(root) / FILES_DIR / "bench"
+        print(f"Benchmark: {count} synthetic 2000x1500 JPEG images")
+        print("=" * 70)
+
+        if shutil.which('convert') or shutil.which('sips'):
+            start = time.perf_counter()
+            subprocess.run(['bash', str(shell_script)], cwd=root,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            shell_seconds = time.perf_counter() - start
+            print(f"generate_thumbnails.sh:  {shell_seconds:8.2f} s  "
+                  f"{count / shell_seconds:8.1f} images/s")
+            shutil.rmtree(bench_dir / THUMBNAIL_DIR_NAME, ignore_errors=True)
+        else:
+            shell_seconds = None
+            print("generate_thumbnails.sh:  skipped (ImageMagick/sips not installed)")
+
+        cwd = os.getcwd()
+        os.chdir(root)
+        try:
+            with DerivativeCache(bench_db) as cache:
+                stats = run(find_images(), jobs=jobs, journal_file=None, quiet=True,
+                            cache=cache)
+        finally:
+            os.chdir(cwd)
+        backend = "Pillow" if Image is not None else "convert"
+        print(f"generate_thumbnails.py:  {stats['seconds']:8.2f} s  "
+              f"{stats['images_per_second']:8.1f} images/s  "
+              f"({backend}, {jobs or os.cpu_count()} workers)")
+        if shell_seconds:
+            print(f"Speedup:                 {shell_seconds / stats['seconds']:8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate thumbnails for content images")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument('--files', metavar='FILE',
+                        help='process only images listed in FILE ("-" for stdin)')
+    parser.add_argument('--journal', default=str(DEFAULT_JOURNAL),
+                        help=f"job journal (default: {DEFAULT_JOURNAL})")
+    parser.add_argument('--resume', action='store_true',
+                        help="skip images the journal records as done")
+    parser.add_argument('--prune', action='store_true',
+                        help="delete thumbnails whose source image no longer exists")
+    parser.add_argument('--benchmark', type=int, metavar='N',
+                        help="benchmark against generate_thumbnails.sh on N images")
+    args = parser.parse_args()
+
+    if Image is None and not shutil.which('convert'):
+        print("✗ Error: Neither Pillow nor ImageMagick found!")
+        print("Please install Pillow: pip install Pillow")
+        sys.exit(1)
+
+    if args.benchmark:
+        benchmark(args.benchmark, args.jobs)
+        return
+
+    print("=" * 40)
+    print("  Thumbnail Generator")
+    print("=" * 40)
+    print(f"Thumbnail size: {THUMB_WIDTH}x{THUMB_HEIGHT}px, quality {THUMB_QUALITY}")
+    print(f"Backend: {'Pillow' if Image is not None else 'ImageMagick (convert)'}")
+
+    if args.files:
+        images = read_file_list(args.files)
+        print(f"Images from list: {args.files}")
+    else:
+        images = find_images()
+        print(f"Searching in: {FILES_DIR}")
+    print(f"Found {len(images)} images")
+    print()
+
+    with DerivativeCache() as cache:
+        stats = run(images, jobs=args.jobs, journal_file=args.journal, resume=args.resume,
+                    cache=cache)
+        if args.prune:
+            if args.files:
+                print("⊘ --prune needs a full scan, ignored with --files")
+            else:
+                removed = prune(images, cache)
+                for path in removed:
+                    print(f"✓ Removed orphaned thumbnail: {path}")
+                stats['pruned'] = len(removed)
+    print_summary(stats)
+
+    if stats[STATUS_ERROR]:
+        sys.exit(1)
+    print("✓ Done!")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@
 
 # Script to generate thumbnails for all images in content/configs
 # Thumbnails are created in a 'thumbnails' subdirectory relative to each image
+# See generate_thumbnails.py for the parallel, resumable Python version
 
 # Thumbnail dimensions
 THUMB_WIDTH=400
@@ -130,7 +131,7 @@ while IFS= read -r -d '' image_path; do
     if is_image "$image_path"; then
         process_image "$image_path"
     fi
-done < <(find content/files -type d -name 'thumbnails' -prune -o -type f -print0)
+done < <(find content/files -type d \( -name 'thumbnails' -o -name 'responsive' \) -prune -o -type f -print0)
 
 # Print statistics
 echo ""
@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+"""
+Image metadata for items.json: dimensions, file size, EXIF date, blurhash
+
+The kiosk front end only knew path, type and title of an image, so it had to
+download the full image before it knew the aspect ratio. This module reads
+what the gallery needs up front:
+
+    width, height   from the image header only (JPEG SOF, PNG IHDR, GIF,
+                    WebP VP8/VP8L/VP8X, BMP), already swapped for EXIF
+                    orientations that rotate by 90 degrees
+    fileSize        in bytes
+    dateTaken       EXIF DateTimeOriginal (or DateTime) of JPEGs, ISO 8601
+    blurhash        tiny placeholder (https://blurha.sh), computed from a
+                    32x32 version of the image; needs Pillow, which lets the
+                    JPEG decoder scale down while decoding (draft mode)
+
+Results are cached in the derivative cache database
+(content/.derivatives.sqlite) by source path and signature (size, mtime), so
+unchanged images cost one stat() on re-runs. Uncached images are processed
+in a process pool.
+
+Usage:
+    python3 image_metadata.py <image>...      # print metadata as JSON
+
+    from image_metadata import iter_enriched
+    items = list(iter_enriched(items, resolve_file))
+"""
+
+import json
+import math
+import os
+import sqlite3
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from derivative_cache import DEFAULT_DB
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# Item fields written by the enrichment
+METADATA_FIELDS = ('width', 'height', 'fileSize', 'dateTaken', 'blurhash')
+
+# Bump when the extraction changes, so cached results are recomputed
+METADATA_VERSION = 2
+BLURHASH_COMPONENTS = (4, 3)
+BLURHASH_SAMPLE_SIZE = 32
+
+# Below this many uncached images a process pool costs more than it saves
+MIN_FILES_FOR_POOL = 16
+# Items handled per batch in iter_enriched() (bounds memory when streaming)
+ENRICH_CHUNK = 512
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_metadata (
+    source TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    params TEXT NOT NULL,
+    data TEXT NOT NULL
+)
+"""
+
+# JPEG start-of-frame markers (SOF0-SOF15 without DHT, JPG and DAC)
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+_EXIF_ORIENTATION = 0x0112
+_EXIF_DATETIME = 0x0132
+_EXIF_IFD_POINTER = 0x8769
+_EXIF_DATETIME_ORIGINAL = 0x9003
+
+
+# --- Header parsing ---------------------------------------------------------
+
+def _parse_exif(data):
+    """
+    Read orientation and capture date from an Exif APP1 payload.
+
+    Returns:
+        Tuple (orientation or None, date string or None)
+    """
+    if not data.startswith(b'Exif\0\0'):
+        return None, None
+    tiff = data[6:]
+    if tiff[:2] == b'II':
+        endian = '<'
+    elif tiff[:2] == b'MM':
+        endian = '>'
+    else:
+        return None, None
+
+    def read_ifd(offset):
+        entries = {}
+        if offset + 2 > len(tiff):
+            return entries
+        count = struct.unpack_from(endian + 'H', tiff, offset)[0]
+        for index in range(count):
+            pos = offset + 2 + index * 12
+            if pos + 12 > len(tiff):
+                break
+            tag, kind, n = struct.unpack_from(endian + 'HHI', tiff, pos)
+            if kind == 3:  # SHORT
+                entries[tag] = struct.unpack_from(endian + 'H', tiff, pos + 8)[0]
+            elif kind == 4:  # LONG
+                entries[tag] = struct.unpack_from(endian + 'I', tiff, pos + 8)[0]
+            elif kind == 2:  # ASCII, stored inline if it fits in 4 bytes
+                start = pos + 8 if n <= 4 else struct.unpack_from(endian + 'I', tiff, pos + 8)[0]
+                entries[tag] = tiff[start:start + n].split(b'\0', 1)[0].decode('ascii', 'replace')
+        return entries
+
+    try:
+        ifd0 = read_ifd(struct.unpack_from(endian + 'I', tiff, 4)[0])
+        exif = read_ifd(ifd0[_EXIF_IFD_POINTER]) if _EXIF_IFD_POINTER in ifd0 else {}
+    except struct.error:
+        return None, None
+    return ifd0.get(_EXIF_ORIENTATION), exif.get(_EXIF_DATETIME_ORIGINAL) or ifd0.get(_EXIF_DATETIME)
+
+
+def _jpeg_header(f):
+    width = height = orientation = taken = None
+    exif_read = False
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte == b'\xff':
+            byte = f.read(1)
+        if not byte:
+            break
+        marker = byte[0]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue  # markers without a length
+        if marker in (0xD9, 0xDA):
+            break  # end of image / start of scan: no more headers
+        raw = f.read(2)
+        if len(raw) < 2:
+            break
+        length = struct.unpack('>H', raw)[0] - 2
+        if marker == 0xE1 and not exif_read:
+            # APP1 also holds XMP; only the first Exif segment counts
+            data = f.read(length)
+            if data.startswith(b'Exif\0\0'):
+                orientation, taken = _parse_exif(data)
+                exif_read = True
+        elif marker in _JPEG_SOF:
+            segment = f.read(5)
+            height, width = struct.unpack('>HH', segment[1:5])
+            break
+        else:
+            f.seek(length, os.SEEK_CUR)
+    return width, height, orientation, taken
+
+
+def _webp_header(head):
+    chunk = head[12:16]
+    if chunk == b'VP8 ' and head[23:26] == b'\x9d\x01\x2a':
+        width, height = struct.unpack('<HH', head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and head[20:21] == b'\x2f':
+        bits = int.from_bytes(head[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X':
+        return int.from_bytes(head[24:27], 'little') + 1, int.from_bytes(head[27:30], 'little') + 1
+    return None, None
+
+
+def read_image_header(path):
+    """
+    Read dimensions (and for JPEG the EXIF orientation/date) without decoding.
+
+    Returns:
+        Dict with width, height, orientation and taken (values may be None)
+    """
+    width = height = orientation = taken = None
+    with open(path, 'rb') as f:
+        head = f.read(32)
+        if head[:2] == b'\xff\xd8':
+            width, height, orientation, taken = _jpeg_header(f)
+        elif head[:8] == b'\x89PNG\r\n\x1a\n' and head[12:16] == b'IHDR':
+            width, height = struct.unpack('>II', head[16:24])
+        elif head[:6] in (b'GIF87a', b'GIF89a'):
+            width, height = struct.unpack('<HH', head[6:10])
+        elif head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+            width, height = _webp_header(head)
+        elif head[:2] == b'BM':
+            if struct.unpack('<I', head[14:18])[0] == 12:
+                width, height = struct.unpack('<HH', head[18:22])
+            else:
+                width, height = struct.unpack('<ii', head[18:26])
+                height = abs(height)
+    return {'width': width, 'height': height, 'orientation': orientation, 'taken': taken}
+
+
+def exif_date_to_iso(value):
+    """Convert "YYYY:MM:DD HH:MM:SS" to ISO 8601, or None if not a real date."""
+    if not value or len(value) < 19 or value.startswith('0000'):
+        return None
+    date, time_part = value[:10].replace(':', '-'), value[11:19]
+    if not (date[:4].isdigit() and date[5:7].isdigit() and date[8:10].isdigit()):
+        return None
+    return f"{date}T{time_part}"
+
+
+# --- Blurhash ---------------------------------------------------------------
+
+_BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+def _base83(value, length):
+    return ''.join(_BASE83[(value // 83 ** (length - i - 1)) % 83] for i in range(length))
+
+
+def _srgb_to_linear(value):
+    v = value / 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(value):
+    v = max(0.0, min(1.0, value))
+    return int(v * 12.92 * 255 + 0.5) if v <= 0.0031308 else int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value, exp):
+    return math.copysign(abs(value) ** exp, value)
+
+
+def encode_blurhash(pixels, width, height, components=BLURHASH_COMPONENTS):
+    """
+    Encode RGB pixels as a blurhash string.
+
+    Args:
+        pixels: Flat sequence of (r, g, b) tuples, row by row
+        width, height: Size of the pixel grid
+        components: Number of (x, y) components
+    """
+    cx, cy = components
+    linear = [tuple(_srgb_to_linear(c) for c in pixel) for pixel in pixels]
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(cx)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(cy)]
+
+    factors = []
+    for j in range(cy):
+        for i in range(cx):
+            scale = (1 if i == 0 and j == 0 else 2) / (width * height)
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                basis_y = cos_y[j][y]
+                for x in range(width):
+                    basis = cos_x[i][x] * basis_y
+                    pr, pg, pb = linear[row + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83((cx - 1) + (cy - 1) * 9, 1)
+    if ac:
+        actual_max = max(abs(value) for factor in ac for value in factor)
+        quantised_max = max(0, min(82, int(actual_max * 166 - 0.5)))
+        maximum = (quantised_max + 1) / 166
+        result += _base83(quantised_max, 1)
+    else:
+        maximum = 1
+        result += _base83(0, 1)
+
+    result += _base83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8)
+                      + _linear_to_srgb(dc[2]), 4)
+    for factor in ac:
+        r, g, b = (max(0, min(18, int(_sign_pow(value / maximum, 0.5) * 9 + 9.5))) for value in factor)
+        result += _base83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+def image_blurhash(path):
+    """Blurhash of an image file, or None when Pillow is not installed."""
+    if Image is None:
+        return None
+    size = BLURHASH_SAMPLE_SIZE
+    with Image.open(path) as img:
+        # JPEG: decode at 1/2 - 1/8 scale instead of full size
+        img.draft('RGB', (size * 2, size * 2))
+        img = ImageOps.exif_transpose(img).convert('RGB')
+        img.thumbnail((size, size))
+        # From the raw RGB bytes: Image.getdata() is deprecated in Pillow 12
+        data = img.tobytes()
+        pixels = list(zip(data[0::3], data[1::3], data[2::3]))
+        return encode_blurhash(pixels, img.width, img.height)
+
+
+# --- Extraction and cache ---------------------------------------------------
+
+def extract_metadata(path, blurhash=True):
+    """
+    Extract the item metadata of one image.
+
+    Returns:
+        Dict with the METADATA_FIELDS that could be determined
+    """
+    header = read_image_header(path)
+    metadata = {}
+    if header['width'] and header['height']:
+        width, height = header['width'], header['height']
+        if header['orientation'] in (5, 6, 7, 8):
+            width, height = height, width
+        metadata['width'] = width
+        metadata['height'] = height
+    metadata['fileSize'] = os.path.getsize(path)
+    taken = exif_date_to_iso(header['taken'])
+    if taken:
+        metadata['dateTaken'] = taken
+    if blurhash:
+        value = image_blurhash(path)
+        if value:
+            metadata['blurhash'] = value
+    return metadata
+
+
+def _extract_worker(args):
+    """Pool worker: return (path, metadata, error)."""
+    path, blurhash = args
+    try:
+        return path, extract_metadata(path, blurhash), None
+    except Exception as e:
+        return path, None, str(e) or e.__class__.__name__
+
+
+class MetadataCache:
+    """Image metadata keyed by source path and (size, mtime) signature."""
+
+    def __init__(self, db_path=DEFAULT_DB):
+        os.makedirs(os.path.dirname(str(db_path)) or '.', exist_ok=True)
+        self.db = sqlite3.connect(str(db_path))
+        self.db.execute(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def get(self, source, st, params):
+        row = self.db.execute(
+            "SELECT size, mtime_ns, params, data FROM image_metadata WHERE source = ?",
+            (str(source),)
+        ).fetchone()
+        if row is None or (row[0], row[1], row[2]) != (st.st_size, st.st_mtime_ns, params):
+            return None
+        return json.loads(row[3])
+
+    def put(self, source, st, params, metadata):
+        self.db.execute(
+            "INSERT OR REPLACE INTO image_metadata (source, size, mtime_ns, params, data) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (str(source), st.st_size, st.st_mtime_ns, params, json.dumps(metadata))
+        )
+
+
+def _params(blurhash):
+    return f"v{METADATA_VERSION}" + (f"-bh{BLURHASH_COMPONENTS[0]}x{BLURHASH_COMPONENTS[1]}"
+                                     if blurhash and Image is not None else "")
+
+
+def collect_metadata(paths, cache, jobs=None, blurhash=True, pool=None):
+    """
+    Return metadata for many images, from the cache where possible.
+
+    Args:
+        paths: Image file paths
+        cache: MetadataCache
+        jobs: Worker processes for uncached images (1 = no pool)
+        blurhash: Compute blurhash placeholders (needs Pillow)
+        pool: Existing ProcessPoolExecutor to use
+
+    Returns:
+        Tuple (metadata by path, list of (path, error), number of cache hits)
+    """
+    params = _params(blurhash)
+    results = {}
+    errors = []
+    missing = []
+    stats = {}
+    for path in paths:
+        try:
+            st = stats[path] = os.stat(path)
+        except OSError as e:
+            errors.append((path, str(e)))
+            continue
+        cached = cache.get(path, st, params)
+        if cached is None:
+            missing.append(path)
+        else:
+            results[path] = cached
+    hits = len(results)
+
+    tasks = [(path, blurhash) for path in missing]
+    if pool is not None and len(tasks) >= MIN_FILES_FOR_POOL:
+        outcomes = pool.map(_extract_worker, tasks, chunksize=4)
+    elif jobs != 1 and len(tasks) >= MIN_FILES_FOR_POOL:
+        with ProcessPoolExecutor(max_workers=jobs) as new_pool:
+            outcomes = list(new_pool.map(_extract_worker, tasks, chunksize=4))
+    else:
+        outcomes = map(_extract_worker, tasks)
+
+    for path, metadata, error in outcomes:
+        if error:
+            errors.append((path, error))
+            continue
+        results[path] = metadata
+        cache.put(path, stats[path], params, metadata)
+    cache.db.commit()
+    return results, errors, hits
+
+
+def apply_metadata(item, metadata):
+    """
+    Set the extracted metadata fields of an item; returns True if it changed.
+
+    Fields the extractor could not determine are left alone, so values set
+    by hand (e.g. dateTaken of a scanned PNG) are kept.
+    """
+    changed = False
+    for field in METADATA_FIELDS:
+        if field in metadata and item.get(field) != metadata[field]:
+            item[field] = metadata[field]
+            changed = True
+    return changed
+
+
+def iter_enriched(items, resolve_file, jobs=None, blurhash=True, cache=None, stats=None):
+    """
+    Yield items with image metadata applied, in input order.
+
+    Items are handled in chunks of ENRICH_CHUNK, so a streamed item list is
+    never held in memory as a whole; the worker pool is shared by all chunks.
+
+    Args:
+        items: Iterable of item dictionaries
+        resolve_file: Function item -> image file path (or None)
+        jobs: Worker processes (default: CPU count, 1 = no pool)
+        blurhash: Compute blurhash placeholders (needs Pillow)
+        cache: MetadataCache (default: one on content/.derivatives.sqlite)
+        stats: Optional dict that receives images/cached/changed/errors counts
+    """
+    own_cache = cache is None
+    cache = cache or MetadataCache()
+    stats = stats if stats is not None else {}
+    for key in ('images', 'cached', 'changed', 'errors'):
+        stats.setdefault(key, 0)
+    pool = None
+    items = iter(items)
+    try:
+        while True:
+            chunk = list(islice(items, ENRICH_CHUNK))
+            if not chunk:
+                break
+            files = {}
+            for index, item in enumerate(chunk):
+                if item.get('type') == 'image':
+                    path = resolve_file(item)
+                    if path is not None:
+                        files[index] = str(path)
+            if pool is None and jobs != 1 and len(files) >= MIN_FILES_FOR_POOL:
+                pool = ProcessPoolExecutor(max_workers=jobs)
+            results, errors, hits = collect_metadata(files.values(), cache, jobs, blurhash, pool)
+            for path, error in errors:
+                print(f"✗ Metadata of {path}: {error}")
+            stats['images'] += len(files)
+            stats['cached'] += hits
+            stats['errors'] += len(errors)
+            for index, item in enumerate(chunk):
+                metadata = results.get(files.get(index))
+                if metadata is not None and apply_metadata(item, metadata):
+                    stats['changed'] += 1
+                yield item
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if own_cache:
+            cache.close()
+
+
+def main():
+    paths = sys.argv[1:]
+    if not paths:
+        print("Usage: python3 image_metadata.py <image>...")
+        sys.exit(1)
+    for path in paths:
+        print(json.dumps({'path': path, **extract_metadata(path)}, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
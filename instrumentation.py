@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Phase timers, counters and optional profiling for the maintenance scripts
+
+The content tools only printed per-file lines, so nobody could tell where a
+run spent its time or how runs grow with the archive. Scripts mark their
+phases and count what they touch; the numbers are always collected (a phase
+costs about a microsecond) and reported on request:
+
+    from instrumentation import count, instrumented, phase
+
+    with phase('scan'):
+        files = find_files()
+    count('files', len(files))
+
+    if __name__ == '__main__':
+        with instrumented('my_script'):
+            main()
+
+Common phase names are scan (walk directories), parse (read configs),
+transform (compute changes), write (write files or rename). Phases may nest;
+an inner phase is also included in the outer one. Common counters are files,
+bytes_read and bytes_written (config_repository.py counts its reads and
+writes automatically).
+
+Options understood by every instrumented script. They are removed from
+sys.argv before the script parses its own options:
+
+    --stats[=FILE]      Print wall/CPU time per phase and the counters when
+                        the script ends. With FILE, also write the JSON
+                        summary; a FILE ending in .jsonl gets one line
+                        appended per run, to track runs over time.
+    --profile[=FILE]    Run under cProfile and print the 25 functions with
+                        the highest cumulative time; with FILE also dump the
+                        pstats data (e.g. for snakeviz)
+    --trace-memory      Track allocations with tracemalloc and add the peak
+                        and the top allocation sites to the summary
+
+The report goes to stderr, so stdout stays usable (e.g. --report -).
+CPU time of worker processes is reported as cpu_children once the pool has
+been shut down.
+"""
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Number of lines printed by --profile and allocation sites by --trace-memory
+PROFILE_TOP = 25
+MEMORY_TOP = 10
+
+
+class Run:
+    """Timers and counters of one script run."""
+
+    def __init__(self, name=None):
+        self.name = name
+        self.started = datetime.now(timezone.utc)
+        self.phases = {}
+        self.counters = {}
+        self.memory = None
+        self.exit_code = None
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._children = _children_cpu()
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block of code under a phase name (wall and CPU seconds)."""
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            record = self.phases.get(name)
+            if record is None:
+                record = self.phases[name] = {'wall': 0.0, 'cpu': 0.0, 'calls': 0}
+            record['wall'] += time.perf_counter() - wall
+            record['cpu'] += time.process_time() - cpu
+            record['calls'] += 1
+
+    def count(self, name, amount=1):
+        """Add to a counter (files, bytes_read, bytes_written, ...)."""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self):
+        """Return the run summary as a JSON-serializable dict."""
+        data = {
+            'script': self.name,
+            'started': self.started.isoformat(timespec='seconds'),
+            'argv': sys.argv[1:],
+            'python': sys.version.split()[0],
+            'wall': round(time.perf_counter() - self._wall, 6),
+            'cpu': round(time.process_time() - self._cpu, 6),
+            'cpu_children': round(_children_cpu() - self._children, 6),
+            'phases': {
+                name: {'wall': round(record['wall'], 6), 'cpu': round(record['cpu'], 6),
+                       'calls': record['calls']}
+                for name, record in self.phases.items()
+            },
+            'counters': dict(self.counters)
+        }
+        if self.memory is not None:
+            data['memory'] = self.memory
+        if self.exit_code is not None:
+            data['exit_code'] = self.exit_code
+        return data
+
+
+def _children_cpu():
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+# Collects from import time on; instrumented() starts a fresh run
+_current = Run()
+
+
+def current_run():
+    """Return the Run that phase() and count() record into."""
+    return _current
+
+
+def phase(name):
+    """Time a block under a phase name in the current run (context manager)."""
+    return _current.phase(name)
+
+
+def count(name, amount=1):
+    """Add to a counter of the current run."""
+    _current.count(name, amount)
+
+
+def _take_option(name):
+    """
+    Remove --name / --name=VALUE from sys.argv.
+
+    Returns:
+        None if absent, True if given without a value, otherwise the value
+    """
+    value = None
+    remaining = [sys.argv[0]]
+    for arg in sys.argv[1:]:
+        if arg == name:
+            value = True
+        elif arg.startswith(name + '='):
+            value = arg.split('=', 1)[1]
+        else:
+            remaining.append(arg)
+    sys.argv[:] = remaining
+    return value
+
+
+def format_summary(data):
+    """Render a summary as the table printed by --stats."""
+    lines = ["=" * 70, f"Timing: {data['script']}", "=" * 70]
+    lines.append(f"{'phase':<20}{'wall s':>12}{'cpu s':>12}{'calls':>10}{'share':>10}")
+    total = data['wall'] or 1e-9
+    for name, record in sorted(data['phases'].items(), key=lambda kv: -kv[1]['wall']):
+        lines.append(f"{name:<20}{record['wall']:>12.3f}{record['cpu']:>12.3f}"
+                     f"{record['calls']:>10}{record['wall'] / total:>10.0%}")
+    lines.append(f"{'total':<20}{data['wall']:>12.3f}{data['cpu']:>12.3f}")
+    if data['cpu_children']:
+        lines.append(f"{'worker processes':<20}{'':>12}{data['cpu_children']:>12.3f}")
+    for name, value in sorted(data['counters'].items()):
+        lines.append(f"{name:<20}{value:>12,}")
+    memory = data.get('memory')
+    if memory:
+        lines.append(f"{'peak memory':<20}{memory['peak_bytes'] / 1e6:>10.1f} MB")
+        for site in memory['top']:
+            lines.append(f"  {site['bytes'] / 1e3:>10.1f} kB  {site['where']}")
+    return '\n'.join(lines)
+
+
+def write_summary(data, path):
+    """Write a summary as JSON, or append it as one line to a .jsonl file."""
+    if path.endswith('.jsonl'):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(data, ensure_ascii=False) + '\n')
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+
+
+@contextmanager
+def instrumented(name):
+    """
+    Run a script's main() with the instrumentation options applied.
+
+    Starts a fresh Run, enables cProfile/tracemalloc when requested and
+    reports when the block ends, also on sys.exit().
+    """
+    global _current
+    stats = _take_option('--stats')
+    profile = _take_option('--profile')
+    trace_memory = _take_option('--trace-memory')
+
+    run = _current = Run(name)
+    profiler = None
+    if trace_memory:
+        import tracemalloc
+        tracemalloc.start()
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        yield run
+    except SystemExit as e:
+        run.exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if trace_memory:
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            run.memory = {
+                'peak_bytes': peak,
+                'top': [{'where': str(stat.traceback), 'bytes': stat.size}
+                        for stat in snapshot.statistics('lineno')[:MEMORY_TOP]]
+            }
+        if stats or profile or trace_memory:
+            data = run.summary()
+            print(format_summary(data), file=sys.stderr)
+            if isinstance(stats, str):
+                write_summary(data, stats)
+                print(f"✓ Timing summary written to {stats}", file=sys.stderr)
+        if profiler is not None:
+            import pstats
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(PROFILE_TOP)
+            if isinstance(profile, str):
+                profiler.dump_stats(profile)
+                print(f"✓ Profile written to {profile}", file=sys.stderr)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Short, collision-free file names for renamed content files
+
+rename_tabule_helper.py used to deduplicate new names with one global set
+for all directories and a `while name in existing: counter += 1` loop per
+file, so files in different folders got needless "-1", "-2" suffixes and
+every additional duplicate of a common name cost one more loop step.
+
+NameAllocator keeps one namespace per directory and remembers the next free
+counter for every base name, so a duplicate is resolved in O(1). The batch
+function sorts its input, so the generated names depend only on the set of
+paths, not on the order they were collected in.
+
+Usage:
+    from name_allocator import allocate_short_names
+    rename_map = allocate_short_names(["files/Tabule/1-PRAVĚKÁ.pdf", ...])
+
+Benchmark (synthetic names, default 100,000):
+    python3 name_allocator.py --benchmark [N]
+"""
+
+import posixpath
+import re
+import sys
+import time
+from collections import defaultdict
+
+from slugify import slugify, transliterate
+
+# Words to skip (common Czech words that don't add meaning)
+SKIP_WORDS = {
+    'a', 'v', 'na', 'z', 'ze', 'do', 'od', 'u', 'o', 'pro', 'pri', 'pred',
+    'po', 'roku', 'leta', 'let', 'st', 'stol', 'c', 'p', 'cp', 'inv', 'foto',
+    'fotila', 'fotil', 'nalezen', 'nalezena', 'nalezeno', 'podle', 'archiv',
+    'muzeum', 'misto', 'ulozeni', 'str', 'mapa', 'poli', 'pole', 'mezi',
+    'lety', 'bliznosti', 'typ', 'typu', 'se', 'tak', 'kol', 'tzv', 'tis'
+}
+
+# Fallback base name when a file name has no usable words
+DEFAULT_BASE_NAME = "tabule"
+
+_PARENTHESES_RE = re.compile(r'\([^)]*\)')
+_PART_SEPARATOR_RE = re.compile(r'[,–—-]')
+_WORD_RE = re.compile(r'\w+')
+_MAIN_PDF_RE = re.compile(r'^(\d+(?:-\d+)?)\s*-\s*(.+)$')
+
+
+def normalize_czech(text):
+    """Convert Czech (and other Latin) characters to ASCII equivalents"""
+    return transliterate(text)
+
+
+def extract_meaningful_words(filename, max_words=4):
+    """Extract 2-4 meaningful words from filename"""
+    # Remove extension
+    name_no_ext = posixpath.splitext(filename)[0]
+
+    # Remove content in parentheses (usually metadata)
+    name_no_ext = _PARENTHESES_RE.sub('', name_no_ext)
+
+    # Remove extra info after commas or dashes in long names
+    # But keep the important first part
+    parts = _PART_SEPARATOR_RE.split(name_no_ext)
+    if len(parts) > 1:
+        # Take first part which usually has the main subject
+        name_no_ext = parts[0].strip()
+
+    # Split into words
+    words = _WORD_RE.findall(name_no_ext)
+
+    # Filter out numbers, skip words, and very short words
+    meaningful = []
+    for word in words:
+        word_lower = word.lower()
+        if not word.isdigit() and word_lower not in SKIP_WORDS and len(word) >= 2:
+            meaningful.append(word_lower)
+
+    if not meaningful:
+        # Fallback to first few words if filtering was too aggressive
+        meaningful = [w.lower() for w in words[:max_words] if len(w) >= 2]
+
+    selected = meaningful[:max_words]
+
+    # If still less than 2 words, add more
+    if len(selected) < 2 and len(words) > len(selected):
+        for word in words:
+            if word.lower() not in selected:
+                selected.append(word.lower())
+                if len(selected) >= 2:
+                    break
+
+    return selected[:max_words]
+
+
+def short_base_name(old_path):
+    """
+    Build the short base name (without deduplication) for a content path.
+
+    Main panel PDFs directly in files/Tabule keep their number
+    ("1-PRAVĚKÁ.pdf" -> "1-praveka"); other files get 2-4 meaningful words.
+
+    Returns:
+        Tuple (base name, lowercase extension)
+    """
+    directory, filename = posixpath.split(old_path)
+    stem, extension = posixpath.splitext(filename)
+    extension = extension.lower()
+
+    if directory == 'files/Tabule' and extension == '.pdf':
+        match = _MAIN_PDF_RE.match(stem)
+        if match:
+            return f"{match.group(1)}-{slugify(match.group(2), '')}", extension
+
+    # Characters that are not ASCII letters/digits after transliteration
+    # (e.g. "_" in "DSC_0059") are dropped, not turned into dashes
+    words = extract_meaningful_words(filename) or [DEFAULT_BASE_NAME]
+    return '-'.join(slug for slug in (slugify(word, '') for word in words) if slug), extension
+
+
+class NameAllocator:
+    """
+    Hand out unique file names per directory.
+
+    The first file with a base name gets "<base><ext>", the following ones
+    "<base>-1<ext>", "<base>-2<ext>", ... Names reserved with reserve() (or
+    allocated for another base that happens to look like "<base>-N") are
+    skipped.
+    """
+
+    def __init__(self):
+        self._taken = defaultdict(set)
+        self._next = {}
+
+    def reserve(self, directory, name):
+        """Mark a name in a directory as used (e.g. a file that is kept)."""
+        self._taken[directory].add(name)
+
+    def allocate(self, directory, base_name, extension):
+        """Return a new unique name for base_name + extension in directory."""
+        taken = self._taken[directory]
+        key = (directory, base_name, extension)
+        counter = self._next.get(key, 0)
+        name = f"{base_name}{extension}" if counter == 0 else f"{base_name}-{counter}{extension}"
+        while name in taken:
+            counter += 1
+            name = f"{base_name}-{counter}{extension}"
+        self._next[key] = counter + 1
+        taken.add(name)
+        return name
+
+
+def allocate_short_names(old_paths, allocator=None):
+    """
+    Generate new short names for many content paths in one call.
+
+    Files keep their directory; names only have to be unique within it.
+
+    Args:
+        old_paths: Iterable of "/"-separated paths relative to content/
+        allocator: NameAllocator to use (e.g. with reserved names)
+
+    Returns:
+        Dictionary old path -> new path
+    """
+    allocator = allocator or NameAllocator()
+    rename_map = {}
+    for old_path in sorted(set(old_paths)):
+        directory = posixpath.dirname(old_path)
+        base_name, extension = short_base_name(old_path)
+        rename_map[old_path] = posixpath.join(directory, allocator.allocate(directory, base_name, extension))
+    return rename_map
+
+
+def _legacy_allocate(old_paths):
+    """The previous global-set allocation, kept for the benchmark only."""
+    existing_names = set()
+    rename_map = {}
+    for old_path in sorted(old_paths):
+        base_name, extension = short_base_name(old_path)
+        new_name = base_name + extension
+        counter = 1
+        while new_name in existing_names:
+            new_name = f"{base_name}-{counter}{extension}"
+            counter += 1
+        existing_names.add(new_name)
+        rename_map[old_path] = posixpath.join(posixpath.dirname(old_path), new_name)
+    return rename_map
+
+
+def benchmark(total=100000, dirs=100, legacy_limit=20000):
+    """Compare the legacy global-set loop with NameAllocator."""
+    subjects = ['Mamutí kel nalezen v řečišti', 'Pohled na náměstí', 'Kostel sv. Bartoloměje',
+                'Škola v Odrách', 'Foto archiv muzea', 'Hradiště u Odry']
+    paths = [f"files/Tabule/{d:03d}-složka/{subjects[i % len(subjects)]} ({i}).jpg"
+             for i in range(total // dirs) for d in range(dirs)]
+    suffix_re = re.compile(r'-(\d+)\.\w+$')
+
+    def max_suffix(rename_map):
+        return max((int(m.group(1)) for m in map(suffix_re.search, rename_map.values()) if m), default=0)
+
+    # The legacy loop is quadratic in the number of duplicates
+    sample = paths[:legacy_limit]
+    print(f"Allocating {len(sample)} names in {dirs} directories")
+    print("=" * 70)
+
+    start = time.perf_counter()
+    legacy = _legacy_allocate(sample)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    allocated = allocate_short_names(sample)
+    seconds = time.perf_counter() - start
+
+    print(f"Global set (legacy): {legacy_seconds:8.3f} s  highest suffix {max_suffix(legacy)}")
+    print(f"NameAllocator:       {seconds:8.3f} s  highest suffix {max_suffix(allocated)}")
+    print(f"Speedup:             {legacy_seconds / seconds:8.1f}x")
+
+    if len(paths) > len(sample):
+        start = time.perf_counter()
+        allocated = allocate_short_names(paths)
+        seconds = time.perf_counter() - start
+        print(f"NameAllocator, {len(paths)} names: {seconds:.3f} s  highest suffix {max_suffix(allocated)}")
+
+
+def main():
+    if '--benchmark' not in sys.argv:
+        print("Usage: python3 name_allocator.py --benchmark [N]")
+        sys.exit(1)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    benchmark(int(args[0]) if args else 100000)
+
+
+if __name__ == '__main__':
+    main()
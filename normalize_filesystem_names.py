@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Normalize file and directory names under content/files to NFC
+
+normalize_unicode_paths.py fixes the strings in the JSON configs, but files
+copied from macOS keep their NFD (decomposed) names on disk, so every lookup
+has to fall back to fuzzy matching. This script walks content/files once,
+renames all NFD/mixed names to NFC bottom-up (children before their parent
+directory) and then checks every path referenced in content/configs against
+the resulting tree.
+
+Usage:
+    python3 normalize_filesystem_names.py [--dry-run] [--report FILE]
+
+Options:
+    --dry-run       Only show what would be renamed
+    --report FILE   Write renames, conflicts and dangling references as JSON
+
+A name is not renamed if a different entry with the NFC name already exists
+in the same directory; such conflicts are reported and must be resolved by
+hand. The script exits with 1 if there are conflicts or dangling references.
+"""
+
+import json
+import os
+import sys
+import unicodedata
+
+from check_references import check_config, find_items_files
+from content_config import CONFIGS_DIR, CONTENT_DIR, FILES_DIR
+
+
+def is_nfc(name):
+    return name.isascii() or unicodedata.is_normalized('NFC', name)
+
+
+def plan_renames(root=FILES_DIR):
+    """
+    Walk the tree once and plan NFC renames bottom-up.
+
+    Returns:
+        Tuple (renames, conflicts, paths):
+            renames: list of (old absolute path, new absolute path), deepest
+                entries first, so renaming in order never invalidates a
+                later entry
+            conflicts: list of (path, existing NFC path) that cannot be renamed
+            paths: set of all paths relative to content/ after the renames
+    """
+    renames = []
+    conflicts = []
+    root = str(root)
+    content_root = str(CONTENT_DIR)
+    # Name every entry will have after the renames (its own name when skipped)
+    planned = {}
+    listings = []
+
+    for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+        # Names on disk plus the targets planned so far: two non-NFC names
+        # can normalize to the same NFC name (e.g. other combining mark order)
+        claimed = set(dirnames) | set(filenames)
+        for name in sorted(filenames + dirnames):
+            new_name = name if is_nfc(name) else unicodedata.normalize('NFC', name)
+            if new_name != name:
+                if new_name in claimed:
+                    conflicts.append((os.path.join(dirpath, name), os.path.join(dirpath, new_name)))
+                    new_name = name
+                else:
+                    claimed.add(new_name)
+                    renames.append((os.path.join(dirpath, name), os.path.join(dirpath, new_name)))
+            planned[os.path.join(dirpath, name)] = new_name
+        listings.append((dirpath, filenames + dirnames))
+
+    # Directories are renamed after their contents, so the final path of a
+    # directory is only known once the walk has reached its ancestors
+    final_dirs = {root: os.path.relpath(root, content_root).replace(os.sep, '/')}
+
+    def final_dir(dirpath):
+        if dirpath not in final_dirs:
+            parent = os.path.dirname(dirpath)
+            final_dirs[dirpath] = f"{final_dir(parent)}/{planned[dirpath]}"
+        return final_dirs[dirpath]
+
+    paths = {f"{final_dir(dirpath)}/{planned[os.path.join(dirpath, name)]}"
+             for dirpath, names in listings for name in names}
+    return renames, conflicts, paths
+
+
+def apply_renames(renames):
+    """Rename entries in plan order; returns the list of failures."""
+    failures = []
+    for old_path, new_path in renames:
+        try:
+            # os.rename() overwrites on POSIX; a normalizing file system
+            # (macOS) reports the entry itself under the new name
+            if (os.path.lexists(new_path)
+                    and not os.path.samestat(os.lstat(old_path), os.lstat(new_path))):
+                failures.append((old_path, f"{new_path} already exists"))
+                continue
+            os.rename(old_path, new_path)
+        except OSError as e:
+            failures.append((old_path, str(e)))
+    return failures
+
+
+def find_dangling_references(paths, configs_root=CONFIGS_DIR):
+    """
+    Check all item paths in the configs against a set of existing paths.
+
+    Args:
+        paths: Set of existing paths relative to content/
+        configs_root: Configs folder (default: content/configs)
+
+    Returns:
+        List of dicts with the config file, item index and missing path
+    """
+    dangling = []
+    for items_file in find_items_files(configs_root):
+        try:
+            dangling.extend(check_config(items_file, {'files': paths}, check_thumbnails=False)['missing'])
+        except (OSError, ValueError) as e:
+            print(f"Error reading {items_file}: {e}")
+    return dangling
+
+
+def main():
+    dry_run = '--dry-run' in sys.argv or '-n' in sys.argv
+    report_file = None
+    if '--report' in sys.argv:
+        index = sys.argv.index('--report')
+        report_file = sys.argv[index + 1] if index + 1 < len(sys.argv) else None
+
+    if not FILES_DIR.exists():
+        print(f"Error: {FILES_DIR} directory not found!")
+        print("Please run this script from the project root directory.")
+        sys.exit(1)
+
+    print("=== Normalizing file and directory names to NFC ===")
+    if dry_run:
+        print("*** DRY RUN MODE - No files will be renamed ***")
+    print()
+
+    renames, conflicts, paths = plan_renames()
+
+    for old_path, new_path in renames:
+        prefix = "[DRY RUN] Would rename" if dry_run else "✓ Renamed"
+        print(f"{prefix}: {old_path}")
+
+    failures = [] if dry_run else apply_renames(renames)
+    for old_path, error in failures:
+        print(f"✗ Error renaming {old_path}: {error}")
+
+    for path, existing in conflicts:
+        print(f"⊘ Conflict, NFC name already taken: {path} -> {existing}")
+
+    print()
+    print("=== Checking config references ===")
+    dangling = find_dangling_references(paths)
+    for entry in dangling:
+        print(f"✗ {entry['config']} item {entry['item']}: {entry['path']}")
+
+    if report_file:
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'dryRun': dry_run,
+                'renamed': [{'from': old, 'to': new} for old, new in renames],
+                'failed': [{'path': path, 'error': error} for path, error in failures],
+                'conflicts': [{'path': path, 'existing': existing} for path, existing in conflicts],
+                'dangling': dangling
+            }, f, ensure_ascii=False, indent=2)
+
+    print()
+    print("=== Summary ===")
+    print(f"Entries {'to rename' if dry_run else 'renamed'}: {len(renames) - len(failures)}")
+    print(f"Conflicts: {len(conflicts)}")
+    print(f"Errors: {len(failures)}")
+    print(f"Dangling references: {len(dangling)}")
+
+    if conflicts or failures or dangling:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
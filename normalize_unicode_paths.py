@@ -2,14 +2,28 @@
 """
 Unicode Path Normalization Script for zlaty_jelen
 
-This script normalizes all file paths in items.json files to NFC (composed) form
-to ensure compatibility between macOS (which uses NFD) and Linux/Ubuntu (which uses NFC).
+This script normalizes all strings in items.json files (paths, titles,
+descriptions, keywords, ...) to NFC (composed) form to ensure compatibility
+between macOS (which uses NFD) and Linux/Ubuntu (which uses NFC).
 
 Usage:
-    python3 normalize_unicode_paths.py [--check-only]
+    python3 normalize_unicode_paths.py [--check-only] [--jobs N] [--report FILE]
 
 Options:
-    --check-only    Only check for non-normalized paths without fixing them
+    --check-only    Only check for non-normalized strings without fixing them
+    --jobs N        Number of worker processes (default: CPU count, 1 = no pool)
+    --report FILE   Write a JSON report of every non-NFC string ("-" = stdout)
+
+Timing and profiling: --stats[=FILE], --profile[=FILE], --trace-memory (see
+instrumentation.py).
+
+Performance:
+    Files are spread across a process pool. ASCII strings (the vast majority:
+    paths of renamed files, most keys and numbers) are skipped with
+    str.isascii(), and unicodedata.is_normalized() checks the rest without
+    building normalized copies, so the check is fast enough to run as a
+    pre-deploy gate on every content sync. --check-only exits with 1 if any
+    string needs normalization.
 
 Background:
     - macOS uses NFD (decomposed) Unicode normalization for filesystems
@@ -25,12 +39,25 @@ Solution:
     Always normalize paths to NFC in JSON configs for cross-platform compatibility
 """
 
-import os
 import json
-import unicodedata
+import os
 import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from config_repository import get_repository
+from instrumentation import count, instrumented, phase
+
+# Below this many files a process pool costs more than it saves
+MIN_FILES_FOR_POOL = 64
+
+
+def is_nfc(text):
+    """Fast NFC check: ASCII strings are always NFC."""
+    return text.isascii() or unicodedata.is_normalized('NFC', text)
+
 
 def normalize_path_to_nfc(path):
     """
@@ -42,9 +69,11 @@ def normalize_path_to_nfc(path):
     Returns:
         Normalized path string in NFC form
     """
-    parts = path.split('/')
-    normalized_parts = [unicodedata.normalize('NFC', part) for part in parts]
-    return '/'.join(normalized_parts)
+    if is_nfc(path):
+        return path
+    # "/" never combines with its neighbours, so the whole string can be
+    # normalized at once
+    return unicodedata.normalize('NFC', path)
 
 
 def check_unicode_form(text):
@@ -57,110 +86,236 @@ def check_unicode_form(text):
     Returns:
         String indicating form: "NFC", "NFD", "ASCII", or "MIXED"
     """
-    nfc = unicodedata.normalize('NFC', text)
-    nfd = unicodedata.normalize('NFD', text)
+    if text.isascii():
+        return "ASCII"
 
-    if text == nfc and text != nfd:
+    is_composed = unicodedata.is_normalized('NFC', text)
+    is_decomposed = unicodedata.is_normalized('NFD', text)
+
+    if is_composed and is_decomposed:
+        return "ASCII"
+    elif is_composed:
         return "NFC"
-    elif text == nfd and text != nfc:
+    elif is_decomposed:
         return "NFD"
-    elif text == nfc == nfd:
-        return "ASCII"
     else:
         return "MIXED"
 
 
+def normalize_value(value, location, issues):
+    """
+    Recursively normalize all strings in a JSON value to NFC, object keys
+    included.
+
+    Args:
+        value: Parsed JSON value
+        location: JSON pointer-like location of the value (e.g. "items/3/title")
+        issues: List collecting {"location", "form", "nfc"} for each fix
+            ("key": true when an object key was fixed)
+
+    Returns:
+        The normalized value (the same object if nothing changed)
+    """
+    if isinstance(value, str):
+        if is_nfc(value):
+            return value
+        issues.append({
+            'location': location,
+            'form': check_unicode_form(value),
+            'nfc': unicodedata.normalize('NFC', value)
+        })
+        return unicodedata.normalize('NFC', value)
+    if isinstance(value, list):
+        for index, element in enumerate(value):
+            normalized = normalize_value(element, f"{location}/{index}", issues)
+            if normalized is not element:
+                value[index] = normalized
+        return value
+    if isinstance(value, dict):
+        if not all(is_nfc(key) for key in value):
+            # Rebuild in place to keep the key order
+            entries = list(value.items())
+            value.clear()
+            for key, element in entries:
+                if not is_nfc(key):
+                    issues.append({
+                        'location': f"{location}/{key}",
+                        'form': check_unicode_form(key),
+                        'nfc': unicodedata.normalize('NFC', key),
+                        'key': True
+                    })
+                    key = unicodedata.normalize('NFC', key)
+                value[key] = element
+        for key, element in value.items():
+            normalized = normalize_value(element, f"{location}/{key}", issues)
+            if normalized is not element:
+                value[key] = normalized
+        return value
+    return value
+
+
 def process_items_file(filepath, check_only=False):
     """
-    Process a single items.json file and normalize all paths.
+    Process a single items.json file and normalize all strings.
 
     Args:
         filepath: Path to items.json file
         check_only: If True, only report issues without fixing
 
     Returns:
-        Number of paths that were fixed (or would be fixed if check_only)
+        List of issues found (and fixed unless check_only); each issue is a
+        dict with the location, the original form and the NFC value
     """
-    with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    repo = get_repository()
+    data = repo.load(filepath)
+
+    issues = []
+    # Configs whose top level is not an object (e.g. a list) hold no items
+    if isinstance(data, dict):
+        normalize_value(data.get('items', []), 'items', issues)
+
+    if issues:
+        if check_only:
+            # The cached data was normalized in place, do not keep it
+            repo.discard(filepath)
+        else:
+            repo.mark_dirty(filepath)
+            repo.flush()
 
-    if not data.get('items'):
-        return 0
+    return issues
 
-    items_fixed = 0
 
-    for item in data['items']:
-        if 'path' in item:
-            original_path = item['path']
-            normalized_path = normalize_path_to_nfc(original_path)
+def _process_worker(args):
+    """Pool worker: process one file and return (file, issues, error)."""
+    filepath, check_only = args
+    try:
+        return filepath, process_items_file(filepath, check_only), None
+    except (OSError, ValueError) as e:
+        return filepath, [], str(e)
 
-            if original_path != normalized_path:
-                items_fixed += 1
-                if not check_only:
-                    item['path'] = normalized_path
 
-    if items_fixed > 0 and not check_only:
-        # Write back the normalized version
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+def process_all(items_files, check_only=False, jobs=None):
+    """
+    Process many items.json files, in parallel when it pays off.
 
-    return items_fixed
+    Returns:
+        List of (file, issues, error) tuples in input order
+    """
+    tasks = [(str(path), check_only) for path in items_files]
+    if jobs == 1 or len(tasks) < MIN_FILES_FOR_POOL:
+        return [_process_worker(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        chunksize = max(1, len(tasks) // ((jobs or os.cpu_count() or 1) * 4))
+        results = list(pool.map(_process_worker, tasks, chunksize=chunksize))
+    # The workers' repositories count into their own processes
+    count('bytes_read', sum(os.path.getsize(path) for path, _ in tasks))
+    if not check_only:
+        count('bytes_written', sum(os.path.getsize(path) for path, issues, _ in results if issues))
+    return results
+
+
+def _option_value(name):
+    """Return the value following a command-line option, or None."""
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return None
 
 
 def main():
     """Main function to process all items.json files in the project."""
     check_only = '--check-only' in sys.argv
+    jobs = int(_option_value('--jobs')) if _option_value('--jobs') else None
+    report_file = _option_value('--report')
+    quiet = report_file == '-'
+    # With the report on stdout, errors go to stderr to keep the JSON valid
+    diagnostics = sys.stderr if quiet else sys.stdout
+
+    def say(*args):
+        if not quiet:
+            print(*args)
 
     if check_only:
-        print("Running in CHECK-ONLY mode (no files will be modified)")
-        print("=" * 70)
+        say("Running in CHECK-ONLY mode (no files will be modified)")
+        say("=" * 70)
     else:
-        print("Normalizing all Unicode paths to NFC (composed) form")
-        print("=" * 70)
+        say("Normalizing all Unicode strings to NFC (composed) form")
+        say("=" * 70)
 
     # Find all items.json files recursively
     config_root = Path('content/configs')
 
     if not config_root.exists():
-        print(f"Error: {config_root} directory not found!")
-        print("Please run this script from the project root directory.")
+        print(f"Error: {config_root} directory not found!", file=diagnostics)
+        print("Please run this script from the project root directory.", file=diagnostics)
         sys.exit(1)
 
-    total_files = 0
+    start = time.perf_counter()
+    with phase('scan'):
+        items_files = sorted(config_root.rglob('items.json'))
+    # Parsing, checking and writing happen per file (in the worker processes)
+    with phase('transform'):
+        results = process_all(items_files, check_only, jobs)
+    elapsed = time.perf_counter() - start
+    count('files', len(items_files))
+
     total_fixed = 0
     files_with_issues = []
-
-    for items_file in config_root.rglob('items.json'):
-        total_files += 1
-        items_fixed = process_items_file(items_file, check_only)
-
-        if items_fixed > 0:
-            rel_path = items_file.relative_to(config_root)
+    errors = []
+
+    for filepath, issues, error in results:
+        rel_path = str(Path(filepath).relative_to(config_root))
+        if error:
+            print(f"✗ {rel_path}: {error}", file=diagnostics)
+            errors.append({'file': rel_path, 'error': error})
+        elif issues:
             action = "Found" if check_only else "Fixed"
-            print(f"✓ {rel_path}: {action} {items_fixed} paths")
-            total_fixed += items_fixed
-            files_with_issues.append(str(rel_path))
+            say(f"✓ {rel_path}: {action} {len(issues)} strings")
+            total_fixed += len(issues)
+            files_with_issues.append({'file': rel_path, 'issues': issues})
+    count('strings_fixed' if not check_only else 'strings_found', total_fixed)
+
+    if report_file:
+        report = {
+            'checkOnly': check_only,
+            'files': len(items_files),
+            'filesWithIssues': len(files_with_issues),
+            'strings': total_fixed,
+            'seconds': round(elapsed, 4),
+            'errors': errors,
+            'issues': files_with_issues
+        }
+        if report_file == '-':
+            json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+            print()
+        else:
+            with open(report_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
 
-    print("\n" + "=" * 70)
-    print(f"Processed {total_files} items.json files")
+    say("\n" + "=" * 70)
+    say(f"Processed {len(items_files)} items.json files in {elapsed:.3f} s")
 
     if check_only:
-        if total_fixed > 0:
-            print(f"Found {total_fixed} paths that need normalization")
-            print("\nFiles with issues:")
-            for file in files_with_issues:
-                print(f"  - {file}")
-            print("\nRun without --check-only to fix these paths")
+        if total_fixed > 0 or errors:
+            say(f"Found {total_fixed} strings that need normalization")
+            say("\nFiles with issues:")
+            for entry in files_with_issues:
+                say(f"  - {entry['file']}")
+            say("\nRun without --check-only to fix these strings")
             sys.exit(1)
         else:
-            print("All paths are already normalized to NFC ✓")
+            say("All strings are already normalized to NFC ✓")
     else:
         if total_fixed > 0:
-            print(f"Fixed {total_fixed} paths total")
-            print("All paths now normalized to NFC for Linux/Ubuntu compatibility ✓")
+            say(f"Fixed {total_fixed} strings total")
+            say("All strings now normalized to NFC for Linux/Ubuntu compatibility ✓")
         else:
-            print("All paths were already normalized to NFC ✓")
+            say("All strings were already normalized to NFC ✓")
+        if errors:
+            sys.exit(1)
 
 
 if __name__ == '__main__':
-    main()
+    with instrumented('normalize_unicode_paths'):
+        main()
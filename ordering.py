@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Natural, Czech-aware ordering of item paths and titles
+
+Items used to be sorted by their raw path string, so "Strana 10" came before
+"Strana 2" and "Č" after "Z", and chronicle pages had to be reordered by
+hand. This module provides one ordering for all tools:
+
+    - numbers compare by value ("Strana 2" < "Strana 10", "_0010" == "_10"
+      up to the final tie-break)
+    - letters follow Czech collation like localeCompare('cs') in the browser
+      and server: "ch" is a letter after "h", č/ř/š/ž are letters of their
+      own, other accents (á, é, ě, ů, ...) and case only decide ties
+    - NFC and NFD spellings of a name sort together (the raw spelling only
+      breaks the tie)
+    - paths compare component by component, so a directory listing sorted
+      with sort_key() walks the tree in path_key() order
+
+Keys of names are cached, so re-sorting many files that share directory
+names costs one key computation per distinct name.
+
+Usage:
+    from ordering import path_key, sort_items
+    items.sort(key=lambda item: path_key(item['path']))
+    moved = sort_items(items)      # in place, cheap for mostly sorted lists
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from heapq import merge
+
+from slugify import transliterate
+
+# Czech alphabet; "ch" is a single letter between "h" and "i"
+CZECH_ALPHABET = ['a', 'b', 'c', 'č', 'd', 'e', 'f', 'g', 'h', 'ch', 'i', 'j', 'k', 'l',
+                  'm', 'n', 'o', 'p', 'q', 'r', 'ř', 's', 'š', 't', 'u', 'v', 'w', 'x',
+                  'y', 'z', 'ž']
+_LETTER_RANK = {letter: rank for rank, letter in enumerate(CZECH_ALPHABET)}
+
+# Primary classes, in ICU order: spaces < punctuation/symbols < digits < letters
+_SPACE, _PUNCTUATION, _DIGIT, _LETTER, _OTHER_LETTER = range(5)
+
+# ASCII punctuation and symbols in ICU root order; others follow by code point
+_PUNCTUATION_ORDER = '_-,;:!?.\'"()[]{}@*/\\&#%`^+<=>|~$'
+_PUNCTUATION_RANK = {char: rank for rank, char in enumerate(_PUNCTUATION_ORDER)}
+
+_UNIT_RE = re.compile(r'\d+|[cC][hH]|.', re.DOTALL)
+
+
+@lru_cache(maxsize=65536)
+def sort_key(text):
+    """
+    Collation key of a single name or title.
+
+    Returns:
+        Tuple (primary, secondary, tertiary, nfc, text): letters and numbers,
+        then accents, then case, then the NFC and the raw text as tie-breaks
+    """
+    raw = text
+    text = unicodedata.normalize('NFC', text)
+    primary = []
+    secondary = []
+    tertiary = []
+
+    for unit in _UNIT_RE.findall(text):
+        lower = unit.lower()
+        if unit.isdecimal():
+            primary.append((_DIGIT, int(unit)))
+            secondary.append(0)
+        elif lower in _LETTER_RANK:
+            primary.append((_LETTER, _LETTER_RANK[lower]))
+            secondary.append(0)
+        elif unit.isalpha():
+            base = transliterate(lower)
+            if base != lower and all(char in _LETTER_RANK for char in base):
+                primary.extend((_LETTER, _LETTER_RANK[char]) for char in base)
+                secondary.append(ord(lower))
+            else:
+                primary.append((_OTHER_LETTER, ord(lower)))
+                secondary.append(0)
+        elif unit.isspace():
+            primary.append((_SPACE, 0))
+            secondary.append(0)
+        else:
+            rank = _PUNCTUATION_RANK.get(unit, len(_PUNCTUATION_ORDER) + ord(unit))
+            primary.append((_PUNCTUATION, rank))
+            secondary.append(0)
+        # Lowercase before uppercase, like ICU
+        tertiary.append(0 if unit == lower else 1)
+
+    return tuple(primary), tuple(secondary), tuple(tertiary), text, raw
+
+
+def path_key(path):
+    """Key of a "/"-separated path: the sort_key() of every component."""
+    return tuple(sort_key(part) for part in path.split('/'))
+
+
+def item_path_key(item):
+    """Sort key of an item by its path (items without a path come first)."""
+    return path_key(item.get('path', ''))
+
+
+def item_title_key(item):
+    """Sort key of an item by its title, then by its path."""
+    return sort_key(item.get('title', '')), item_path_key(item)
+
+
+def sort_items(items, key=item_path_key):
+    """
+    Sort a list of items in place, optimized for mostly sorted lists.
+
+    Items that are already in order relative to the previous kept item stay
+    where they are; only the out-of-place items are sorted and merged back.
+    Each key is computed once. An already sorted list is not modified.
+
+    Args:
+        items: List of items, modified in place
+        key: Key function (default: by path)
+
+    Returns:
+        Number of items that had to be moved (0 if the list was sorted)
+    """
+    keyed = [(key(item), index, item) for index, item in enumerate(items)]
+    kept = []
+    misplaced = []
+    for entry in keyed:
+        if kept and entry[0] < kept[-1][0]:
+            misplaced.append(entry)
+        else:
+            kept.append(entry)
+
+    if not misplaced:
+        return 0
+
+    misplaced.sort(key=lambda entry: entry[:2])
+    items[:] = [entry[2] for entry in merge(kept, misplaced, key=lambda entry: entry[:2])]
+    return len(misplaced)
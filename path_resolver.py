@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Filename -> path resolution for config paths that do not match the disk exactly
+
+Paths in items.json and on disk can differ in Unicode form (NFC vs NFD from
+macOS), in non-breaking spaces (U+00A0) copied from Word, or in letter case.
+find_actual_file() used to try the exact path, then the NFC/NBSP-normalized
+path, and then list the parent directory and re-normalize every sibling name
+- once per missing file.
+
+PathResolver lists each directory once, keeps a map of normalized names to
+real names, and answers all lookups of a run from those maps. Directory
+components are resolved the same way, so an NFD-named folder is found too.
+On network mounts, prefetch() lists the directories of many paths
+concurrently before they are resolved.
+
+Usage:
+    from path_resolver import PathResolver
+    resolver = PathResolver(CONTENT_DIR)
+    actual = resolver.resolve("files/Tabule/1-PRAVĚKÁ.pdf")   # Path or None
+
+Benchmark (synthetic tree, default 50,000 files):
+    python3 path_resolver.py --benchmark [N]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Concurrent listings for prefetch()
+PREFETCH_JOBS = 16
+
+
+def normalize_path_for_matching(path_str):
+    """Normalize path for fuzzy matching - handle NBSP and special chars"""
+    # Replace NBSP (U+00A0) with regular space
+    normalized = path_str.replace('\u00a0', ' ')
+    # Normalize unicode
+    normalized = unicodedata.normalize('NFC', normalized)
+    return normalized
+
+
+class _DirectoryMap:
+    """Names of one directory, indexed by exact, normalized and casefolded name."""
+
+    __slots__ = ('exact', 'normalized', 'casefolded')
+
+    def __init__(self, path):
+        self.exact = {}
+        self.normalized = {}
+        self.casefolded = {}
+        try:
+            with os.scandir(path) as entries:
+                names = sorted((entry.name, entry.is_dir()) for entry in entries)
+        except OSError:
+            names = []
+        for name, is_dir in names:
+            self.add(name, is_dir)
+
+    def add(self, name, is_dir):
+        self.exact[name] = is_dir
+        normalized = normalize_path_for_matching(name)
+        # First (sorted) name wins when several names normalize the same way
+        self.normalized.setdefault(normalized, name)
+        self.casefolded.setdefault(normalized.casefold(), name)
+
+    def remove(self, name):
+        self.exact.pop(name, None)
+        normalized = normalize_path_for_matching(name)
+        if self.normalized.get(normalized) == name:
+            del self.normalized[normalized]
+        if self.casefolded.get(normalized.casefold()) == name:
+            del self.casefolded[normalized.casefold()]
+
+    def find(self, name, want_dir):
+        """Return the real name matching name, or None."""
+        if name in self.exact:
+            return name if self.exact[name] == want_dir else None
+        normalized = normalize_path_for_matching(name)
+        for candidate in (self.normalized.get(normalized),
+                          self.casefolded.get(normalized.casefold())):
+            if candidate is not None and self.exact[candidate] == want_dir:
+                return candidate
+        return None
+
+
+class PathResolver:
+    """
+    Resolve config paths to real files using one directory listing per folder.
+
+    The maps are a snapshot: after moving files call record_move() (or
+    invalidate() for a directory changed by someone else) so later lookups
+    see the new names.
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = str(base_dir)
+        self._dirs = {}
+
+    def _map(self, directory):
+        dir_map = self._dirs.get(directory)
+        if dir_map is None:
+            dir_map = self._dirs[directory] = _DirectoryMap(directory)
+        return dir_map
+
+    def resolve(self, config_path, want_dir=False):
+        """
+        Find the real path of a file (or directory) referenced in a config.
+
+        Every component is matched exactly first, then after NBSP folding
+        and NFC normalization, then case-insensitively.
+
+        Args:
+            config_path: Path relative to the base directory ("/"-separated)
+            want_dir: Resolve a directory instead of a file
+
+        Returns:
+            Path (base directory + real names) or None if nothing matches
+        """
+        parts = [part for part in config_path.split('/') if part]
+        if not parts:
+            return None
+        current = self.base_dir
+        for index, part in enumerate(parts):
+            is_last = index == len(parts) - 1
+            name = self._map(current).find(part, want_dir if is_last else True)
+            if name is None:
+                return None
+            current = os.path.join(current, name)
+        return Path(current)
+
+    def prefetch(self, config_paths, jobs=PREFETCH_JOBS):
+        """
+        List the directories that resolving config_paths needs, concurrently.
+
+        Paths are followed one level at a time; all directories of a level
+        that are not cached yet are listed in a thread pool. Later resolve()
+        calls for these paths are answered from the cache.
+
+        Returns:
+            Number of directories listed
+        """
+        frontier = {tuple(part for part in path.split('/') if part) for path in config_paths}
+        frontier = {(self.base_dir, parts) for parts in frontier if parts}
+        listed = 0
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            while frontier:
+                missing = sorted({directory for directory, _ in frontier
+                                  if directory not in self._dirs})
+                for directory, dir_map in zip(missing, pool.map(_DirectoryMap, missing)):
+                    self._dirs[directory] = dir_map
+                listed += len(missing)
+                next_level = set()
+                for directory, parts in frontier:
+                    if len(parts) > 1:
+                        name = self._dirs[directory].find(parts[0], True)
+                        if name is not None:
+                            next_level.add((os.path.join(directory, name), parts[1:]))
+                frontier = next_level
+        return listed
+
+    def record_move(self, old_path, new_path):
+        """Update the maps after old_path was renamed/moved to new_path."""
+        old_path, new_path = str(old_path), str(new_path)
+        is_dir = os.path.isdir(new_path)
+        old_dir, old_name = os.path.split(old_path)
+        new_dir, new_name = os.path.split(new_path)
+        if old_dir in self._dirs:
+            self._dirs[old_dir].remove(old_name)
+        if new_dir in self._dirs:
+            self._dirs[new_dir].add(new_name, is_dir)
+        if is_dir:
+            # Cached maps below the old directory path are now invalid
+            prefix = old_path + os.sep
+            for directory in [d for d in self._dirs if d == old_path or d.startswith(prefix)]:
+                del self._dirs[directory]
+
+    def invalidate(self, directory=None):
+        """Forget the listing of one directory (or of all directories)."""
+        if directory is None:
+            self._dirs.clear()
+        else:
+            self._dirs.pop(str(directory), None)
+
+
+def _legacy_find_actual_file(content_dir, config_path):
+    """The previous per-file lookup, kept for the benchmark only."""
+    file_path = content_dir / config_path
+    if file_path.exists():
+        return file_path
+    file_path = content_dir / normalize_path_for_matching(config_path)
+    if file_path.exists():
+        return file_path
+    parent_dir = (content_dir / config_path).parent
+    if parent_dir.exists():
+        filename = os.path.basename(config_path)
+        normalized_filename = normalize_path_for_matching(filename)
+        for actual_file in parent_dir.iterdir():
+            if actual_file.is_file():
+                if normalized_filename == normalize_path_for_matching(actual_file.name):
+                    return actual_file
+    return None
+
+
+def benchmark(total_files=50000, dirs=50, lookups=2000):
+    """Compare the legacy lookup with PathResolver on a synthetic tree."""
+    words = ['Pravěká', 'Kolonizační', 'Středověká', 'Pobělohorská', 'Přelomová',
+             'Prvorepubliková', 'Socialistická', 'Kulturní']
+    per_dir = total_files // dirs
+
+    with tempfile.TemporaryDirectory() as root:
+        root = Path(root)
+        print(f"Creating {per_dir * dirs} files in {dirs} directories...")
+        queries = []
+        for d in range(dirs):
+            folder = root / "files" / "Tabule" / f"{d:02d}-{words[d % len(words)]}"
+            folder.mkdir(parents=True)
+            for i in range(per_dir):
+                name = f"{words[i % len(words)]} obrázek {i:05d}.jpg"
+                # Disk has NFD names (macOS copy), configs use NFC + NBSP
+                (folder / unicodedata.normalize('NFD', name)).touch()
+                if i % (per_dir * dirs // lookups or 1) == 0:
+                    queries.append(f"{folder.relative_to(root).as_posix()}/{name.replace(' ', chr(0xa0), 1)}")
+        queries = queries[:lookups]
+        print(f"Resolving {len(queries)} config paths that need fuzzy matching")
+        print("=" * 70)
+
+        start = time.perf_counter()
+        legacy_found = sum(_legacy_find_actual_file(root, q) is not None for q in queries)
+        legacy_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        resolver = PathResolver(root)
+        found = sum(resolver.resolve(q) is not None for q in queries)
+        seconds = time.perf_counter() - start
+
+        print(f"find_actual_file (legacy): {legacy_seconds:8.3f} s  found {legacy_found}")
+        print(f"PathResolver:              {seconds:8.3f} s  found {found}")
+        print(f"Speedup:                   {legacy_seconds / seconds:8.1f}x")
+
+
+def main():
+    if '--benchmark' not in sys.argv:
+        print("Usage: python3 path_resolver.py --benchmark [N]")
+        sys.exit(1)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    benchmark(int(args[0]) if args else 50000)
+
+
+if __name__ == '__main__':
+    main()
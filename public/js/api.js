@@ -5,22 +5,22 @@
 import { state } from './state.js';
 import { setLoading } from './utils.js';
 
-// Load all categories and items from API
+// Load all categories, and all items unless the catalog has page shards
 export async function loadAllData() {
   setLoading(true);
   try {
-    const [catResponse, itemsResponse] = await Promise.all([
-      fetch('/api/categories'),
-      fetch('/api/items')
-    ]);
-
+    const catResponse = await fetch('/api/categories');
     const catData = await catResponse.json();
     state.allCategories = catData.categories;
     state.currentCategories = catData.categories;
     state.isLegacy = catData.isLegacy || false;
+    state.pages = catData.pages || null;
 
-    const itemsData = await itemsResponse.json();
-    state.allItems = itemsData.items;
+    if (!state.pages) {
+      const itemsResponse = await fetch('/api/items');
+      const itemsData = await itemsResponse.json();
+      state.allItems = itemsData.items;
+    }
 
     try {
       const configResponse = await fetch('/api/config');
@@ -87,3 +87,54 @@ export function getCategoryTitles(categoryPath) {
 
   return titles;
 }
+
+// Fetch one page of the items directly in a category (pages start at 1):
+// the static shard written by build_catalog.py, or the server's slice
+export async function loadCategoryPage(categoryPathString, page) {
+  let url;
+  if (state.pages) {
+    const segments = categoryPathString ? categoryPathString.split('/').map(encodeURIComponent) : [];
+    url = `/content/${state.pages.base}/${[...segments, `page-${page}.json`].join('/')}`;
+  } else {
+    url = `/api/items?category=${encodeURIComponent(categoryPathString)}&page=${page}`;
+  }
+
+  const response = await fetch(url);
+  if (!response.ok) {
+    throw new Error(`Page ${page} of "${categoryPathString}": HTTP ${response.status}`);
+  }
+  return response.json();
+}
+
+// Search items on the server (prebuilt search index)
+export async function searchItems(query) {
+  const response = await fetch(`/api/items?search=${encodeURIComponent(query)}`);
+  const data = await response.json();
+  return data.items;
+}
+
+// Find a category by its path of ids
+export function findCategory(categoryPath) {
+  let categories = state.allCategories;
+  let found = null;
+  for (const catId of categoryPath) {
+    found = categories.find(c => c.id === catId);
+    if (!found) return null;
+    categories = found.subcategories || [];
+  }
+  return found;
+}
+
+// Whether a category has items of its own (besides its subcategories)
+export function categoryHasItems(category, categoryPathString) {
+  if (category && category.directCount !== undefined) {
+    return category.directCount > 0;
+  }
+  return state.allItems.some(item => {
+    if (state.isLegacy) {
+      const lastCat = categoryPathString.split('/').pop();
+      return item.categories && item.categories.includes(lastCat);
+    }
+    return item.categoryId === categoryPathString;
+  });
+}
@@ -3,7 +3,7 @@
  */
 
 import { state, elements, FILE_ICONS } from './state.js';
-import { getCategoryTitles } from './api.js';
+import { getCategoryTitles, loadCategoryPage, searchItems, findCategory, categoryHasItems } from './api.js';
 import { escapeHtml, getThumbnailPath } from './utils.js';
 import { openFile } from './fileViewer.js';
 
@@ -178,14 +178,7 @@ function navigateToBreadcrumbLevel(level) {
     state.currentCategories = targetCategory.subcategories;
 
     // Check if there are also items at this level
-    const hasItems = state.allItems.some(item => {
-      if (state.isLegacy) {
-        const lastCat = state.currentCategoryPath[level];
-        return item.categories && item.categories.includes(lastCat);
-      } else {
-        return item.categoryId === state.categoryPathString;
-      }
-    });
+    const hasItems = categoryHasItems(targetCategory, state.categoryPathString);
 
     // Show subcategories and items if they exist
     showHome(hasItems);
@@ -251,14 +244,7 @@ export function navigateUpCategory() {
     state.currentView = 'category';
 
     // Check if current category has items to display
-    const hasItems = state.allItems.some(item => {
-      if (state.isLegacy) {
-        const lastCat = state.currentCategoryPath[state.currentCategoryPath.length - 1];
-        return item.categories && item.categories.includes(lastCat);
-      } else {
-        return item.categoryId === state.categoryPathString;
-      }
-    });
+    const hasItems = categoryHasItems(findCategory(state.currentCategoryPath), state.categoryPathString);
 
     showHome(hasItems);
   }
@@ -301,7 +287,9 @@ export function showHome(includeItems = false) {
   }).join('');
 
   // If includeItems is true, also show items in current category
-  if (includeItems) {
+  if (includeItems && state.pages) {
+    state.currentItems = [];
+  } else if (includeItems) {
     const filteredItems = state.allItems.filter(item => {
       if (state.isLegacy) {
         const lastCat = state.currentCategoryPath[state.currentCategoryPath.length - 1];
@@ -358,6 +346,81 @@ export function showHome(includeItems = false) {
   });
 
   updateBreadcrumbs();
+
+  // Items after the subcategories, page by page
+  if (includeItems && state.pages) {
+    appendItemPage(state.categoryPathString, 1);
+  }
+}
+
+// Paged item loading: each request belongs to the view it was started in,
+// so pages arriving after navigating away are dropped
+let pageRequest = 0;
+
+function itemHtml(item, index) {
+  const iconHtml = item.type === 'image'
+    ? `<img src="/content/${getThumbnailPath(item.path)}" alt="${escapeHtml(item.title || item.path)}" class="file-thumbnail" loading="lazy">`
+    : `<div class="file-icon">${FILE_ICONS[item.type] || FILE_ICONS.unknown}</div>`;
+
+  return `
+    <div class="file-item file-item-actual"
+         data-index="${index}"
+         data-type="${item.type}">
+      ${iconHtml}
+      <div class="file-name">${escapeHtml(item.title || item.path)}</div>
+    </div>
+  `;
+}
+
+// Fetch a page of the category's items and append it to the file list;
+// the next page is fetched when the end of the list scrolls into view
+async function appendItemPage(categoryPathString, page, request = ++pageRequest) {
+  let data;
+  try {
+    data = await loadCategoryPage(categoryPathString, page);
+  } catch (error) {
+    console.error('Error loading items:', error);
+    return;
+  }
+  if (request !== pageRequest || state.categoryPathString !== categoryPathString) {
+    return;
+  }
+
+  if (data.total === 0 && elements.fileList.children.length === 0) {
+    elements.fileList.innerHTML = `
+      <div class="empty-state">
+        <div class="empty-state-icon">📭</div>
+        <div>V této kategorii nejsou žádné položky</div>
+      </div>
+    `;
+    return;
+  }
+
+  const start = state.currentItems.length;
+  state.currentItems.push(...data.items);
+  elements.fileList.insertAdjacentHTML('beforeend',
+    data.items.map((item, offset) => itemHtml(item, start + offset)).join(''));
+
+  elements.fileList.querySelectorAll('.file-item-actual').forEach(item => {
+    const index = parseInt(item.dataset.index);
+    if (index >= start) {
+      item.addEventListener('click', () => openFile(state.currentItems[index], index));
+    }
+  });
+
+  if (page < data.pageCount) {
+    const sentinel = document.createElement('div');
+    sentinel.className = 'page-sentinel';
+    elements.fileList.appendChild(sentinel);
+    const observer = new IntersectionObserver(entries => {
+      if (entries.some(entry => entry.isIntersecting)) {
+        observer.disconnect();
+        sentinel.remove();
+        appendItemPage(categoryPathString, page + 1, request);
+      }
+    }, { rootMargin: '400px' });
+    observer.observe(sentinel);
+  }
 }
 
 export function enterCategory(categoryId) {
@@ -373,13 +436,7 @@ export function enterCategory(categoryId) {
   state.categoryPathString = state.currentCategoryPath.join('/');
 
   // Check if category has items in current path
-  const hasItems = state.allItems.some(item => {
-    if (state.isLegacy) {
-      return item.categories && item.categories.includes(categoryId);
-    } else {
-      return item.categoryId === state.categoryPathString;
-    }
-  });
+  const hasItems = categoryHasItems(category, state.categoryPathString);
 
   // Check if category has subcategories
   if (category.subcategories && category.subcategories.length > 0) {
@@ -396,6 +453,14 @@ export function enterCategory(categoryId) {
 export function showCategoryItems() {
   state.currentView = 'category';
 
+  if (state.pages) {
+    elements.fileList.innerHTML = '';
+    state.currentItems = [];
+    appendItemPage(state.categoryPathString, 1);
+    updateBreadcrumbs();
+    return;
+  }
+
   // Filter items by current category path
   const filteredItems = state.allItems.filter(item => {
     if (state.isLegacy) {
@@ -412,18 +477,34 @@ export function showCategoryItems() {
   updateBreadcrumbs();
 }
 
-export function performSearch() {
+export async function performSearch() {
   if (!state.searchQuery) {
     goHome();
     return;
   }
 
-  const searchLower = state.searchQuery.toLowerCase();
-  const results = state.allItems.filter(item => {
-    const titleMatch = item.title?.toLowerCase().includes(searchLower);
-    const keywordMatch = item.keywords?.some(k => k.toLowerCase().includes(searchLower));
-    return titleMatch || keywordMatch;
-  });
+  let results;
+  if (state.pages) {
+    // Items are not all loaded: search on the server
+    const query = state.searchQuery;
+    const request = ++pageRequest;
+    try {
+      results = await searchItems(query);
+    } catch (error) {
+      console.error('Error searching:', error);
+      results = [];
+    }
+    if (request !== pageRequest || query !== state.searchQuery) {
+      return;
+    }
+  } else {
+    const searchLower = state.searchQuery.toLowerCase();
+    results = state.allItems.filter(item => {
+      const titleMatch = item.title?.toLowerCase().includes(searchLower);
+      const keywordMatch = item.keywords?.some(k => k.toLowerCase().includes(searchLower));
+      return titleMatch || keywordMatch;
+    });
+  }
 
   renderItemList(results);
   updateBreadcrumbs();
@@ -17,6 +17,7 @@ export const state = {
   textSize: 'medium',
   textSizes: ['small', 'medium', 'large'],
   isLegacy: false, // Whether using legacy flat category structure
+  pages: null, // Page shards of the catalog ({ base, size }), items are then fetched per page
   editMode: false  // Whether server was started with --edit flag
 };
 
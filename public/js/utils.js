@@ -33,3 +33,35 @@ export function getThumbnailPath(imagePath) {
 
   return thumbnailPath;
 }
+
+// Responsive variants ("derivatives" in items.json, written by derivatives.py)
+// in order of preference; AVIF only when the browser can decode it
+const VARIANT_FORMATS = ['avif', 'webp', 'jpg'];
+const supportedVariantFormats = new Set(['webp', 'jpg']);
+
+const AVIF_PROBE = 'data:image/avif;base64,AAAAIGZ0eXBhdmlmAAAAAGF2aWZtaWYxbWlhZk1BMUIAAADrbWV0YQAAAAAAAAAhaGRscgAAAAAAAAAAcGljdAAAAAAAAAAAAAAAAAAAAAAOcGl0bQAAAAAAAQAAAB5pbG9jAAAAAEQAAAEAAQAAAAEAAAETAAAAIQAAAChpaW5mAAAAAAABAAAAGmluZmUCAAAAAAEAAGF2MDFDb2xvcgAAAABqaXBycAAAAEtpcGNvAAAAFGlzcGUAAAAAAAAAAQAAAAEAAAAQcGl4aQAAAAADCAgIAAAADGF2MUOBAAwAAAAAE2NvbHJuY2x4AAEADQAGgAAAABdpcG1hAAAAAAAAAAEAAQQBAoMEAAAAKW1kYXQSAAoIGAAGiAhoNCAyExxHh4Xd0000wsAAAJA1jjx9F1A=';
+
+const avifProbe = new Image();
+avifProbe.onload = () => {
+  if (avifProbe.width > 0) supportedVariantFormats.add('avif');
+};
+avifProbe.src = AVIF_PROBE;
+
+// Get the smallest responsive variant of an image item that is at least
+// minWidth pixels wide (or its widest variant), in the best supported format.
+// Returns null if the item has no variants, then the original should be used
+export function getVariant(item, minWidth) {
+  const ladder = item && item.derivatives;
+  if (!Array.isArray(ladder)) return null;
+
+  for (const format of VARIANT_FORMATS) {
+    if (!supportedVariantFormats.has(format)) continue;
+    const rungs = ladder
+      .filter(rung => rung.format === format)
+      .sort((a, b) => a.width - b.width);
+    if (rungs.length > 0) {
+      return rungs.find(rung => rung.width >= minWidth) || rungs[rungs.length - 1];
+    }
+  }
+  return null;
+}
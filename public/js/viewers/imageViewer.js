@@ -3,7 +3,7 @@
  */
 
 import { state, elements } from '../state.js';
-import { escapeHtml } from '../utils.js';
+import { escapeHtml, getVariant } from '../utils.js';
 
 let currentViewer = null;
 let isTagMode = false;
@@ -365,7 +365,11 @@ export function renderImageViewer(item, openFileFn) {
   currentItem = item;
   if (!item.people) item.people = [];
 
-  const imagePath = `/content/${item.path}`;
+  // Smallest responsive variant covering the screen, the original otherwise
+  const screenWidth = window.innerWidth * (window.devicePixelRatio || 1);
+  const variant = getVariant(item, screenWidth);
+  const originalPath = `/content/${item.path}`;
+  const imagePath = variant ? `/content/${variant.path}` : originalPath;
   const images = (state.currentItems || []).filter(f => f.type === 'image');
   const currentImageIndex = images.findIndex(img => img.path === item.path);
   const hasPrev = currentImageIndex > 0;
@@ -472,5 +476,22 @@ export function renderImageViewer(item, openFileFn) {
     }
   });
 
+  // Switch to the original once zoomed in past the variant's resolution
+  if (variant && variant.width < (item.width || Infinity)) {
+    const viewer = currentViewer;
+    let upgraded = false;
+    viewer.addHandler('zoom', (event) => {
+      if (upgraded || !event.zoom) return;
+      const needed = viewer.viewport.getContainerSize().x * event.zoom * (window.devicePixelRatio || 1);
+      if (needed <= variant.width) return;
+      upgraded = true;
+      viewer.addTiledImage({
+        tileSource: { type: 'image', url: originalPath },
+        index: 0,
+        replace: true
+      });
+    });
+  }
+
   setupNavigation(currentImageIndex, images, openFileFn);
 }
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Prebuilt full-text search index for the content catalog
+
+Builds an inverted index over the title, description and keywords of every
+catalog item, so the server can answer /api/items?search= without scanning
+all items on each keystroke.
+
+Text is folded before indexing: NFC, lowercase and Latin letters mapped to
+ASCII with the transliteration table of slugify.py, so "kronika" matches
+"Kronika" and "zahradkari" matches "zahradkáři". The fold table is stored in
+the index, so the server folds queries exactly the same way.
+
+Index format (content/search-index.json):
+    {
+      "version": 1,
+      "buildId": "...",          # same as in catalog.json
+      "itemCount": 2650,
+      "fold": {"á": "a", ...},
+      "tokens": ["1922", "bela", "kronika", ...],   # sorted
+      "postings": [[0, 1], [0, 4, 9], ...]          # catalog item indexes
+    }
+
+Tokens are sorted in UTF-16 code unit order (JavaScript string order), so
+the server finds all tokens starting with a query prefix with a binary search.
+
+The index is written by build_catalog.py; this module can also be run on its
+own to rebuild the index for an existing catalog:
+    python3 search_index.py
+"""
+
+import json
+import os
+import re
+import sys
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+
+from content_config import CONTENT_DIR
+from slugify import FOLD_MAP
+
+DEFAULT_INDEX = CONTENT_DIR / "search-index.json"
+INDEX_VERSION = 1
+
+# Item fields that are searched
+SEARCH_FIELDS = ('title', 'description')
+
+_FOLD_TABLE = str.maketrans(FOLD_MAP)
+
+# Letters and digits (underscores split tokens, like in file names)
+_TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def fold(text):
+    """Fold text for searching: NFC, lowercase, Latin letters to ASCII."""
+    return unicodedata.normalize('NFC', text).lower().translate(_FOLD_TABLE)
+
+
+def tokenize(text):
+    """Split folded text into index tokens."""
+    return _TOKEN_RE.findall(fold(text))
+
+
+def item_texts(item):
+    """Yield all searchable strings of an item."""
+    for field in SEARCH_FIELDS:
+        value = item.get(field)
+        if isinstance(value, str):
+            yield value
+    keywords = item.get('keywords')
+    if isinstance(keywords, list):
+        for keyword in keywords:
+            if isinstance(keyword, str):
+                yield keyword
+
+
+def build_search_index(items, build_id=None):
+    """
+    Build the inverted index for a list of catalog items.
+
+    Args:
+        items: Catalog items (their positions are used as ids)
+        build_id: Catalog build id, used by the server to pair both files
+
+    Returns:
+        Index dictionary (see module docstring)
+    """
+    postings = defaultdict(set)
+    for item_id, item in enumerate(items):
+        for text in item_texts(item):
+            for token in tokenize(text):
+                postings[token].add(item_id)
+
+    tokens = sorted(postings, key=lambda token: token.encode('utf-16-be'))
+    return {
+        'version': INDEX_VERSION,
+        'buildId': build_id,
+        'itemCount': len(items),
+        'fold': FOLD_MAP,
+        'tokens': tokens,
+        'postings': [sorted(postings[token]) for token in tokens]
+    }
+
+
+def write_search_index(index, output_file=DEFAULT_INDEX):
+    """Write the index atomically (compact JSON)."""
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output_file.with_name(f".{output_file.name}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, output_file)
+
+
+def main():
+    from build_catalog import DEFAULT_CATALOG
+
+    if not DEFAULT_CATALOG.exists():
+        print(f"Error: {DEFAULT_CATALOG} not found, run build_catalog.py first")
+        sys.exit(1)
+
+    with open(DEFAULT_CATALOG, 'r', encoding='utf-8') as f:
+        catalog = json.load(f)
+
+    index = build_search_index(catalog['items'], catalog.get('buildId'))
+    write_search_index(index)
+    print(f"✓ Indexed {index['itemCount']} items, {len(index['tokens'])} tokens")
+    print(f"✓ Search index written to {DEFAULT_INDEX}")
+
+
+if __name__ == '__main__':
+    main()
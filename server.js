@@ -159,8 +159,106 @@ async function scanConfigsDirectory(dirPath, categoryPath = []) {
   }
 }
 
+// Compiled catalog (build_catalog.py), loaded once and served from memory
+const catalogPath = path.join(__dirname, config.CATALOG_FILE);
+let catalog = null;
+
+function loadCatalog() {
+  try {
+    const parsed = JSON.parse(fsSync.readFileSync(catalogPath, 'utf-8'));
+    catalog = {
+      buildId: parsed.buildId,
+      categories: parsed.categories || [],
+      items: parsed.items || [],
+      pages: parsed.pages || null,
+      isLegacy: false
+    };
+    console.log(`Catalog loaded: ${catalog.items.length} items`);
+  } catch (err) {
+    if (err.code !== 'ENOENT') {
+      console.error('Error loading catalog:', err);
+    }
+    // Fall back to scanning configs on each request
+    catalog = null;
+  }
+}
+
+loadCatalog();
+// Reload when build_catalog.py writes a new catalog
+fsSync.watchFile(catalogPath, { interval: 2000 }, loadCatalog);
+
+// Prebuilt search index (search_index.py), paired with the catalog by buildId
+const searchIndexPath = path.join(__dirname, config.SEARCH_INDEX_FILE);
+let searchIndex = null;
+
+function loadSearchIndex() {
+  try {
+    searchIndex = JSON.parse(fsSync.readFileSync(searchIndexPath, 'utf-8'));
+    console.log(`Search index loaded: ${searchIndex.tokens.length} tokens`);
+  } catch (err) {
+    if (err.code !== 'ENOENT') {
+      console.error('Error loading search index:', err);
+    }
+    searchIndex = null;
+  }
+}
+
+loadSearchIndex();
+fsSync.watchFile(searchIndexPath, { interval: 2000 }, loadSearchIndex);
+
+// Fold text the same way search_index.py does (NFC, lowercase, Czech -> ASCII)
+function foldSearchText(text) {
+  let folded = '';
+  for (const ch of text.normalize('NFC').toLowerCase()) {
+    folded += searchIndex.fold[ch] ?? ch;
+  }
+  return folded;
+}
+
+// Catalog item indexes matching every query word as a token prefix,
+// or null if the index cannot answer the query
+function searchCatalog(metadata, query) {
+  if (!searchIndex || metadata !== catalog || searchIndex.buildId !== catalog.buildId) {
+    return null;
+  }
+
+  const queryTokens = foldSearchText(query).match(/[\p{L}\p{N}]+/gu);
+  if (!queryTokens) {
+    return null;
+  }
+
+  const { tokens, postings } = searchIndex;
+  let result = null;
+
+  for (const prefix of queryTokens) {
+    // Binary search for the first token >= prefix
+    let lo = 0;
+    let hi = tokens.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >> 1;
+      if (tokens[mid] < prefix) {
+        lo = mid + 1;
+      } else {
+        hi = mid;
+      }
+    }
+
+    const matches = new Set();
+    for (let i = lo; i < tokens.length && tokens[i].startsWith(prefix); i++) {
+      postings[i].forEach(id => matches.add(id));
+    }
+    result = result === null ? matches : new Set([...result].filter(id => matches.has(id)));
+  }
+
+  return [...result].sort((a, b) => a - b);
+}
+
 // Load all metadata and build complete structure
 async function loadMetadata() {
+  if (catalog) {
+    return catalog;
+  }
+
   try {
     const configsPath = path.join(__dirname, config.CONTENT_DIR, 'configs');
 
@@ -196,14 +294,59 @@ async function loadMetadata() {
   }
 }
 
+// One page of the items directly in a category (page numbers start at 1):
+// the prebuilt shard of the catalog, or a slice of the scanned items
+async function sendItemsPage(res, metadata, category, pageNumber) {
+  if (metadata.pages) {
+    const shard = path.join(__dirname, config.CONTENT_DIR, metadata.pages.base,
+      ...(category ? category.split('/') : []), `page-${pageNumber}.json`);
+    const pagesRoot = path.join(__dirname, config.CONTENT_DIR, metadata.pages.base);
+    if (!shard.startsWith(pagesRoot + path.sep) || !fsSync.existsSync(shard)) {
+      return res.status(404).json({ error: 'Stránka nenalezena' });
+    }
+    return res.sendFile(shard);
+  }
+
+  const pageSize = config.ITEMS_PAGE_SIZE;
+  const items = metadata.items.filter(item =>
+    item.display !== false && (item.categoryId || '') === category
+  );
+  const pageCount = Math.ceil(items.length / pageSize);
+  if (pageNumber > Math.max(pageCount, 1)) {
+    return res.status(404).json({ error: 'Stránka nenalezena' });
+  }
+  res.json({
+    category,
+    page: pageNumber,
+    pageCount,
+    pageSize,
+    total: items.length,
+    items: items.slice((pageNumber - 1) * pageSize, pageNumber * pageSize)
+  });
+}
+
 // API endpoint to get all items from metadata
 app.get('/api/items', async (req, res) => {
   try {
     const metadata = await loadMetadata();
-    const { category, search } = req.query;
+    const { category, search, page } = req.query;
+
+    if (page !== undefined && !search && !metadata.isLegacy) {
+      const pageNumber = Number(page);
+      if (!Number.isInteger(pageNumber) || pageNumber < 1) {
+        return res.status(400).json({ error: 'Neplatné číslo stránky' });
+      }
+      return sendItemsPage(res, metadata, category || '', pageNumber);
+    }
 
     let items = metadata.items;
 
+    // Search through the prebuilt index when it matches the loaded catalog
+    const indexHits = search ? searchCatalog(metadata, search) : null;
+    if (indexHits) {
+      items = indexHits.map(id => items[id]);
+    }
+
     // Filter out items with display: false
     items = items.filter(item => item.display !== false);
 
@@ -220,8 +363,8 @@ app.get('/api/items', async (req, res) => {
       });
     }
 
-    // Filter by search keywords
-    if (search) {
+    // Filter by search keywords (no search index available)
+    if (search && !indexHits) {
       const searchLower = search.toLowerCase();
       items = items.filter(item => {
         const titleMatch = item.title?.toLowerCase().includes(searchLower);
@@ -272,10 +415,10 @@ app.get('/api/categories', async (req, res) => {
           }
         }
 
-        res.json({ categories: currentLevel, isLegacy: false });
+        res.json({ categories: currentLevel, isLegacy: false, pages: metadata.pages || null });
       } else {
         // Return top-level categories
-        res.json({ categories: metadata.categories, isLegacy: false });
+        res.json({ categories: metadata.categories, isLegacy: false, pages: metadata.pages || null });
       }
     }
   } catch (error) {
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Table-driven transliteration and slugs for file names and search folding
+
+All Latin letters with diacritics (Latin-1 Supplement, Latin Extended-A/B
+and Latin Extended Additional, not only the Czech ones) are mapped to ASCII
+with one str.translate() table, built once at import time from the Unicode
+(compatibility) decompositions. Combining marks are dropped as well, so NFD
+text from macOS gives the same result as NFC text without normalizing it.
+
+    transliterate("Žluťoučký kůň")      -> "Zlutoucky kun"
+    slugify("Mamutí kel (1922)")         -> "mamuti-kel-1922"
+    slugify("PRVOREPUBLIKOVÁ 2", "")     -> "prvorepublikova2"
+
+Benchmark (all paths referenced in content/configs, repeated to N strings):
+    python3 slugify.py --benchmark [N]
+"""
+
+import re
+import sys
+import time
+import unicodedata
+
+# Letters without a Unicode decomposition
+_SPECIAL = {
+    'ß': 'ss', 'ẞ': 'SS', 'æ': 'ae', 'Æ': 'AE', 'œ': 'oe', 'Œ': 'OE',
+    'ø': 'o', 'Ø': 'O', 'đ': 'd', 'Đ': 'D', 'ð': 'd', 'Ð': 'D',
+    'ł': 'l', 'Ł': 'L', 'ŀ': 'l', 'Ŀ': 'L', 'ħ': 'h', 'Ħ': 'H',
+    'ı': 'i', 'ŋ': 'n', 'Ŋ': 'N', 'ŧ': 't', 'Ŧ': 'T', 'þ': 'th', 'Þ': 'TH',
+    'ſ': 's', 'ƒ': 'f', 'ĸ': 'k', 'ŉ': 'n'
+}
+
+# Latin-1 Supplement, Latin Extended-A/B, Latin Extended Additional
+_LATIN_RANGES = ((0x00C0, 0x0250), (0x1E00, 0x1F00))
+
+
+def _build_table():
+    table = {}
+    for start, end in _LATIN_RANGES:
+        for code in range(start, end):
+            char = chr(code)
+            if char in _SPECIAL:
+                table[code] = _SPECIAL[char]
+                continue
+            base = ''.join(c for c in unicodedata.normalize('NFKD', char)
+                           if not unicodedata.combining(c))
+            if base != char and base.isascii() and base.isalpha():
+                table[code] = base
+    # Combining diacritical marks (NFD input)
+    for code in range(0x0300, 0x0370):
+        table[code] = None
+    return table
+
+
+TRANSLIT_TABLE = _build_table()
+
+# The same table as a list indexed by code point: str.translate() looks up
+# list items much faster than dict keys; code points past the end raise
+# IndexError and are kept unchanged
+_TRANSLIT_LIST = [chr(code) for code in range(max(TRANSLIT_TABLE) + 1)]
+for _code, _value in TRANSLIT_TABLE.items():
+    _TRANSLIT_LIST[_code] = _value
+
+# Lowercase part of the table, used to fold search text (which is lowercased
+# first); stored in the search index so the server folds queries the same way
+FOLD_MAP = {chr(code): value or '' for code, value in TRANSLIT_TABLE.items()
+            if not chr(code).isupper()}
+
+# Everything that is not a lowercase ASCII letter or digit, in runs
+_SEPARATOR_RE = re.compile(r'[^a-z0-9]+')
+
+
+def transliterate(text):
+    """Map Latin letters with diacritics to ASCII, keeping case."""
+    return text if text.isascii() else text.translate(_TRANSLIT_LIST)
+
+
+def slugify(text, separator='-'):
+    """
+    Build a lowercase ASCII slug.
+
+    Args:
+        text: Any text (NFC or NFD)
+        separator: Replaces every run of other characters ('' removes them)
+
+    Returns:
+        Slug of [a-z0-9] and separators, without leading/trailing separators
+    """
+    slug = _SEPARATOR_RE.sub(separator, transliterate(text.lower()))
+    return slug.strip(separator) if separator else slug
+
+
+# The slug code of rename_tabule_helper.py before this module, copied
+# verbatim (normalize_czech() and the standard branch of
+# generate_short_name()), kept for the benchmark only
+_LEGACY_CZECH_CHARS = {
+    'á': 'a', 'č': 'c', 'ď': 'd', 'é': 'e', 'ě': 'e', 'í': 'i',
+    'ň': 'n', 'ó': 'o', 'ř': 'r', 'š': 's', 'ť': 't', 'ú': 'u',
+    'ů': 'u', 'ý': 'y', 'ž': 'z',
+    'Á': 'A', 'Č': 'C', 'Ď': 'D', 'É': 'E', 'Ě': 'E', 'Í': 'I',
+    'Ň': 'N', 'Ó': 'O', 'Ř': 'R', 'Š': 'S', 'Ť': 'T', 'Ú': 'U',
+    'Ů': 'U', 'Ý': 'Y', 'Ž': 'Z'
+}
+
+
+def _legacy_normalize_czech(text):
+    result = []
+    for char in text:
+        result.append(_LEGACY_CZECH_CHARS.get(char, char))
+    return ''.join(result)
+
+
+def _legacy_slugify(base_name):
+    base_name = _legacy_normalize_czech(base_name)
+    base_name = re.sub(r'[^a-z0-9-]', '', base_name.lower())
+    base_name = re.sub(r'-+', '-', base_name)
+    base_name = base_name.strip('-')
+    return base_name
+
+
+def benchmark(total=200000):
+    """Compare the previous slug code with slugify()."""
+    from config_repository import get_repository
+
+    repo = get_repository()
+    paths = set()
+    for items_file in repo.find('*.json'):
+        data = repo.load(items_file)
+        if isinstance(data, dict):
+            paths.update(item['path'] for item in data.get('items', [])
+                         if isinstance(item.get('path'), str))
+    names = sorted(paths) or ['files/Tabule/Mamutí kel nalezen v řečišti Odry (1922).jpg']
+    texts = (names * (total // len(names) + 1))[:total]
+    print(f"Slugifying {len(texts)} paths ({len(names)} distinct from the configs)")
+    print("=" * 70)
+
+    start = time.perf_counter()
+    for text in texts:
+        _legacy_slugify(text)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for text in texts:
+        slugify(text)
+    single_seconds = time.perf_counter() - start
+
+    print(f"Dict loop + re.sub (legacy): {legacy_seconds:8.3f} s")
+    print(f"slugify():                   {single_seconds:8.3f} s  ({legacy_seconds / single_seconds:.1f}x)")
+
+
+def main():
+    if '--benchmark' not in sys.argv:
+        print("Usage: python3 slugify.py --benchmark [N]")
+        sys.exit(1)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    benchmark(int(args[0]) if args else 200000)
+
+
+if __name__ == '__main__':
+    main()
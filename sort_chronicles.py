@@ -1,34 +1,73 @@
 #!/usr/bin/env python3
-import json
-import os
+"""
+Sort chronicle items.json files
+
+Pages are ordered naturally ("Strana 2" before "Strana 10") with Czech
+collation, see ordering.py. Files that are already mostly sorted are fixed
+by moving only the misplaced items.
+
+Usage:
+    python3 sort_chronicles.py [--by-title]
+
+Options:
+    --by-title    Sort by title (then path) instead of by path
+
+Timing and profiling: --stats[=FILE], --profile[=FILE], --trace-memory (see
+instrumentation.py).
+"""
+
+import sys
 from pathlib import Path
 
-# Find all chronicle items.json files
-chronicles_dir = Path("content/configs/chronicles")
-items_files = list(chronicles_dir.glob("*/items.json"))
+from config_repository import get_repository
+from instrumentation import count, instrumented, phase
+from ordering import item_path_key, item_title_key, sort_items
+
+
+def main():
+    repo = get_repository()
+    key = item_title_key if '--by-title' in sys.argv else item_path_key
+
+    # Find all chronicle items.json files
+    chronicles_dir = Path("content/configs/chronicles")
+    with phase('scan'):
+        items_files = list(chronicles_dir.glob("*/items.json"))
+    count('files', len(items_files))
+
+    print(f"Found {len(items_files)} chronicle items.json files to sort:\n")
+
+    for items_file in sorted(items_files):
+        print(f"Processing: {items_file}")
 
-print(f"Found {len(items_files)} chronicle items.json files to sort:\n")
+        # Read the JSON file
+        with phase('parse'):
+            data = repo.load(items_file)
 
-for items_file in sorted(items_files):
-    print(f"Processing: {items_file}")
+        # Sort items in place (only misplaced items are moved)
+        if 'items' in data and isinstance(data['items'], list):
+            original_count = len(data['items'])
+            with phase('transform'):
+                moved = sort_items(data['items'], key)
+            count('items', original_count)
 
-    # Read the JSON file
-    with open(items_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+            # Only write back files whose order changed
+            if moved:
+                repo.mark_dirty(items_file)
+                print(f"  ✓ Sorted {original_count} items ({moved} moved)")
+            else:
+                print(f"  ✓ {original_count} items already sorted")
+        else:
+            print(f"  ⚠ No items array found")
 
-    # Sort items by path (ascending)
-    if 'items' in data and isinstance(data['items'], list):
-        original_count = len(data['items'])
-        data['items'].sort(key=lambda x: x.get('path', ''))
+        print()
 
-        # Write back to file
-        with open(items_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+    # Write back to files
+    with phase('write'):
+        repo.flush()
 
-        print(f"  ✓ Sorted {original_count} items")
-    else:
-        print(f"  ⚠ No items array found")
+    print("✓ All chronicle files sorted successfully!")
 
-    print()
 
-print("✓ All chronicle files sorted successfully!")
+if __name__ == '__main__':
+    with instrumented('sort_chronicles'):
+        main()
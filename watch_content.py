@@ -0,0 +1,678 @@
+#!/usr/bin/env python3
+"""
+Watch content/files and content/configs and update only what changed
+
+Curators upload scans over FTP/SSH into content/files. Afterwards someone had
+to run generate_items_json.py, generate_thumbnails.sh, normalize_unicode_paths.py
+and build_catalog.py in order, each rescanning everything. This watcher
+reacts to the changes themselves:
+
+    file added, changed, removed    items.json of every target folder that
+                                    contains it, merged incrementally like
+                                    generate_items_json.py --manifest
+                                    thumbnail created or removed (images)
+    items.json written or uploaded  NFC normalization of that file
+    any of the above                catalog, search index and page shards
+                                    rebuilt (build_catalog.py)
+
+Changes are collected until nothing happened for --debounce seconds (an
+upload of 200 scans becomes one batch), but at most --max-wait seconds. The
+jobs of a batch run through a queue of at most --jobs concurrent jobs;
+changes arriving meanwhile form the next batch.
+
+Events come from inotify on Linux (through ctypes, no extra package). Files
+count as changed when they are closed after writing or moved in, so uploads
+in progress are not picked up half-written. Without inotify, or with
+--poll, directories are polled every --interval seconds by mtime; only
+directories that changed are listed, and a file is taken once its size and
+mtime are the same in two polls.
+
+Which items.json is generated from which folder is read from --targets, a
+file in the format of generate_items_json.py --batch. Folders without a
+target still get thumbnails, their configs are left alone. A target without
+a scan manifest gets one when the watcher starts (without changing its
+items), so items a curator deleted by hand are not added back.
+
+Status: content/.watch-status.json holds the state (idle, pending,
+working), the backend, the pending changes and the last batch, e.g. for a
+dashboard or a health check:
+
+    python3 watch_content.py --status
+
+Usage:
+    python3 watch_content.py [--targets FILE] [options]
+
+Options:
+    --targets FILE      Source folder -> items.json mapping (TOML or JSON)
+    --jobs N            Maximum number of concurrent jobs (default: 2)
+    --debounce S        Quiet period closing a batch (default: 2)
+    --max-wait S        Longest time a change waits for its batch (default: 30)
+    --poll              Poll instead of using inotify
+    --interval S        Polling interval (default: 5)
+    --enrich            Add image metadata to items (generate_items_json.py --enrich)
+    --no-catalog        Do not rebuild the catalog after a batch
+    --status            Print the status file and exit
+
+Timing and profiling: --stats[=FILE], --profile[=FILE], --trace-memory (see
+instrumentation.py); the summary is printed when the watcher is stopped.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import shutil
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from content_config import (
+    CONFIGS_DIR, CONTENT_DIR, FILES_DIR, IMAGE_EXTENSIONS, RESPONSIVE_DIR_NAME,
+    THUMBNAIL_DIR_NAME
+)
+from instrumentation import count, instrumented, phase
+
+STATUS_FILE = CONTENT_DIR / ".watch-status.json"
+
+DEFAULT_JOBS = 2
+DEFAULT_DEBOUNCE = 2.0
+DEFAULT_MAX_WAIT = 30.0
+DEFAULT_INTERVAL = 5.0
+
+# Folders holding generated files; changes inside never trigger work
+DERIVATIVE_DIRS = {THUMBNAIL_DIR_NAME, 'thumbnail', RESPONSIVE_DIR_NAME}
+DZI_SUFFIX = '.dzi'
+DZI_TILES_SUFFIX = '_files'
+
+_IMAGE_SUFFIXES = {f".{ext}" for ext in IMAGE_EXTENSIONS}
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT = struct.Struct('iIII')
+
+
+def is_ignored_dir(path, name):
+    """Hidden folders, derivative folders and DZI tile folders are not watched."""
+    if name.startswith('.') or name in DERIVATIVE_DIRS:
+        return True
+    return (name.endswith(DZI_TILES_SUFFIX)
+            and os.path.exists(os.path.join(os.path.dirname(path),
+                                            name[:-len(DZI_TILES_SUFFIX)] + DZI_SUFFIX)))
+
+
+def is_ignored(path):
+    """Whether a changed path is a hidden, temporary or generated file."""
+    parts = Path(path).parts
+    if any(part.startswith('.') or part in DERIVATIVE_DIRS for part in parts):
+        return True
+    return any(part.endswith(DZI_TILES_SUFFIX) for part in parts[:-1])
+
+
+def walk_dirs(root):
+    """Yield root and every watched folder below it."""
+    pending = [str(root)]
+    while pending:
+        path = pending.pop()
+        yield path
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if (entry.is_dir(follow_symlinks=False)
+                            and not is_ignored_dir(entry.path, entry.name)):
+                        pending.append(entry.path)
+        except OSError:
+            continue
+
+
+def _list_files(path):
+    try:
+        with os.scandir(path) as it:
+            return {entry.name: entry.stat() for entry in it
+                    if entry.is_file() and not entry.name.startswith('.')}
+    except OSError:
+        return None
+
+
+class InotifyWatcher:
+    """Recursive watcher on top of the inotify system calls."""
+
+    backend = 'inotify'
+
+    def __init__(self, roots):
+        name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(name, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._paths = {}
+        for root in roots:
+            self._add_tree(root, list_files=False)
+
+    def _add_tree(self, root, list_files=True):
+        """Watch a folder tree; returns the files already in it."""
+        found = []
+        for path in walk_dirs(root):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error == 28:  # ENOSPC: fs.inotify.max_user_watches reached
+                    raise OSError(error, "inotify watch limit reached "
+                                         "(raise fs.inotify.max_user_watches or use --poll)")
+                continue
+            self._paths[wd] = path
+            if list_files:
+                found.extend(os.path.join(path, name) for name in _list_files(path) or {})
+        return found
+
+    def read(self, timeout):
+        """
+        Wait up to timeout seconds for changes.
+
+        Returns:
+            Set of changed paths (files, or folders that appeared or went
+            away); None after a queue overflow, when everything may have
+            changed
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            directory = self._paths.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                self._paths.pop(wd, None)
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                changed.add(directory)
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if is_ignored_dir(path, os.fsdecode(name)):
+                    continue
+                changed.add(path)
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files copied in before the watch existed raise no events
+                    changed.update(self._add_tree(path))
+            elif not mask & IN_CREATE:
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Watcher comparing folder mtimes and listings at a fixed interval."""
+
+    backend = 'polling'
+
+    def __init__(self, roots, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        # folder -> (mtime_ns, {name: (size, mtime_ns)})
+        self._dirs = {}
+        # folder -> files seen changing at the last poll, not reported yet
+        self._candidates = {}
+        for root in roots:
+            for path in walk_dirs(root):
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+                files = _list_files(path) or {}
+                self._dirs[path] = (mtime, {name: (st.st_size, st.st_mtime_ns)
+                                            for name, st in files.items()})
+
+    def read(self, timeout):
+        """Poll once after the interval; see InotifyWatcher.read()."""
+        time.sleep(self.interval if timeout is None else min(self.interval, timeout))
+        changed = set()
+        for path in list(self._dirs):
+            if path not in self._dirs:
+                continue
+            old_mtime, old_files = self._dirs[path]
+            try:
+                mtime = os.stat(path).st_mtime_ns
+                files = _list_files(path) if (mtime != old_mtime
+                                              or path in self._candidates) else None
+            except OSError:
+                mtime = files = None
+            if mtime is None:
+                for gone in [p for p in self._dirs if p == path or p.startswith(path + os.sep)]:
+                    del self._dirs[gone]
+                    self._candidates.pop(gone, None)
+                changed.add(path)
+                continue
+            if files is None:
+                continue
+
+            stats = {name: (st.st_size, st.st_mtime_ns) for name, st in files.items()}
+            changed.update(os.path.join(path, name) for name in old_files if name not in stats)
+            # A file is reported once it looks the same in two polls
+            changed.update(os.path.join(path, name)
+                           for name, stat in self._candidates.get(path, {}).items()
+                           if stats.get(name) == stat)
+            candidates = {name: stat for name, stat in stats.items() if old_files.get(name) != stat}
+            if candidates:
+                self._candidates[path] = candidates
+            else:
+                self._candidates.pop(path, None)
+            self._dirs[path] = (mtime, stats)
+
+            # New folders are listed at the next poll; their files are then
+            # new candidates like any other
+            for subdir in walk_dirs(path):
+                if subdir not in self._dirs:
+                    self._dirs[subdir] = (None, {})
+        return changed
+
+    def close(self):
+        pass
+
+
+def open_watcher(roots, poll=False, interval=DEFAULT_INTERVAL):
+    """Return an inotify watcher, or a polling one if inotify is unavailable."""
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError) as e:
+            print(f"⊘ inotify not available ({e}), polling every {interval:g} s")
+    return PollingWatcher(roots, interval)
+
+
+def load_targets(targets_file):
+    """Load the source folder -> items.json mapping (generate_items_json.py --batch format)."""
+    from generate_items_json import load_batch_targets
+    return load_batch_targets(targets_file)
+
+
+def adopt_targets(targets):
+    """
+    Give every target without a scan manifest one (items are not changed).
+
+    Returns:
+        Number of manifests written
+    """
+    from generate_items_json import MANIFEST_SUFFIX, save_manifest, scan_incremental
+
+    adopted = 0
+    for source, output in targets.items():
+        manifest_file = output + MANIFEST_SUFFIX
+        if os.path.exists(manifest_file) or not os.path.isdir(source):
+            continue
+        _, dirs, _ = scan_incremental(source, {})
+        save_manifest(manifest_file, source, dirs)
+        adopted += 1
+    return adopted
+
+
+def affected_targets(paths, targets):
+    """Return the targets whose source folder contains (or is inside) a changed path."""
+    affected = set()
+    for path in paths:
+        for source in targets:
+            if (path == source or path.startswith(source + os.sep)
+                    or source.startswith(path + os.sep)):
+                affected.add(source)
+    return affected
+
+
+def update_target(source, output, use_enrich=False):
+    """
+    Job: merge added and removed files of one target into its items.json.
+
+    Returns:
+        Tuple (written, message)
+    """
+    from generate_items_json import (
+        MANIFEST_SUFFIX, enrich, generate_items_incremental, get_base_path,
+        save_manifest, write_items_stream
+    )
+
+    if not os.path.isdir(source):
+        return False, f"⊘ {output}: source {source} not found"
+    base_path = get_base_path(source)
+    stats = {}
+    items, changed, dirs = generate_items_incremental(source, base_path, output,
+                                                      quiet=True, stats=stats)
+    if use_enrich:
+        enriched, enrich_stats = enrich(items, source, base_path)
+        items = list(enriched)
+        changed = changed or enrich_stats['changed'] > 0 or enrich_stats['ladders'] > 0
+    if changed:
+        write_items_stream(output, items)
+    save_manifest(output + MANIFEST_SUFFIX, source, dirs)
+    if not changed:
+        return False, f"⊘ {output}: up to date"
+    return True, f"✓ {output}: +{stats['added']} -{stats['removed']} items"
+
+
+def update_thumbnails(created, removed, jobs=DEFAULT_JOBS):
+    """
+    Job: create thumbnails of new or changed images, delete those of removed ones.
+
+    Returns:
+        Tuple (changed, message)
+    """
+    from derivative_cache import DerivativeCache
+    from generate_thumbnails import CACHE_KIND, STATUS_CREATED, STATUS_ERROR, run, thumbnail_path
+
+    deleted = 0
+    with DerivativeCache() as cache:
+        for image in removed:
+            thumbnail = thumbnail_path(image)
+            if thumbnail.exists():
+                thumbnail.unlink()
+                deleted += 1
+            cache.forget(CACHE_KIND, image)
+        stats = run(created, jobs=jobs, journal_file=None, quiet=True, cache=cache) if created \
+            else {STATUS_CREATED: 0, STATUS_ERROR: 0}
+    message = f"✓ Thumbnails: {stats[STATUS_CREATED]} created, {deleted} removed"
+    if stats[STATUS_ERROR]:
+        message += f", ✗ {stats[STATUS_ERROR]} failed"
+    return bool(stats[STATUS_CREATED] or deleted), message
+
+
+def normalize_config(path):
+    """
+    Job: normalize the strings of one items.json to NFC.
+
+    Returns:
+        Tuple (written, message)
+    """
+    from normalize_unicode_paths import process_items_file
+
+    issues = process_items_file(path)
+    if not issues:
+        return False, None
+    return True, f"✓ {path}: {len(issues)} strings normalized to NFC"
+
+
+def rebuild_catalog():
+    """Job: rebuild catalog, search index and page shards."""
+    from build_catalog import rebuild
+
+    catalog, pages, _ = rebuild()
+    return True, f"✓ Catalog: {len(catalog['items'])} items, {pages} pages"
+
+
+class Watch:
+    """Debounced batches of changes, worked off by a bounded job queue."""
+
+    def __init__(self, watcher, targets, jobs=DEFAULT_JOBS, use_enrich=False,
+                 with_catalog=True, status_file=STATUS_FILE):
+        self.watcher = watcher
+        self.targets = targets
+        self.jobs = jobs
+        self.use_enrich = use_enrich
+        self.with_catalog = with_catalog
+        self.status_file = status_file
+        self.pool = ThreadPoolExecutor(max_workers=jobs)
+        self.started = _now()
+        self.batches = 0
+        self.last_batch = None
+        # Config files written by the watcher itself -> mtime, so their
+        # events do not start another batch
+        self._own_writes = {}
+
+    def _note_written(self, path):
+        try:
+            self._own_writes[os.path.normpath(path)] = os.stat(path).st_mtime_ns
+        except OSError:
+            pass
+
+    def _is_own_write(self, path):
+        try:
+            return self._own_writes.get(os.path.normpath(path)) == os.stat(path).st_mtime_ns
+        except OSError:
+            return False
+
+    def relevant(self, paths):
+        """Keep the changed paths that need work (content files and uploaded configs)."""
+        files_root = os.path.normpath(str(FILES_DIR)) + os.sep
+        configs_root = os.path.normpath(str(CONFIGS_DIR)) + os.sep
+        kept = set()
+        for path in paths:
+            path = os.path.normpath(path)
+            if is_ignored(path):
+                continue
+            if path.startswith(files_root) or (path.startswith(configs_root)
+                                               and path.endswith('.json')
+                                               and not self._is_own_write(path)):
+                kept.add(path)
+        return kept
+
+    def write_status(self, state, pending=0):
+        """Write the status file atomically."""
+        status = {
+            'state': state,
+            'backend': self.watcher.backend,
+            'pid': os.getpid(),
+            'started': self.started,
+            'updated': _now(),
+            'pending': pending,
+            'batches': self.batches,
+            'lastBatch': self.last_batch
+        }
+        tmp = f"{self.status_file}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(status, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.status_file)
+
+    def _run_stage(self, jobs):
+        """
+        Run (function, *args) jobs through the pool.
+
+        Returns:
+            Tuple (list of jobs that changed something, messages, errors)
+        """
+        futures = [self.pool.submit(*job) for job in jobs]
+        changed_jobs, messages, errors = [], [], []
+        for job, future in zip(jobs, futures):
+            try:
+                changed, message = future.result()
+            except Exception as e:
+                errors.append(f"{job[0].__name__}{job[1:2]}: {e}")
+                continue
+            if changed:
+                changed_jobs.append(job)
+            if message:
+                messages.append(message)
+        return changed_jobs, messages, errors
+
+    def process(self, paths):
+        """
+        Work off one batch of changed paths.
+
+        Args:
+            paths: Changed paths, or None when everything has to be checked
+        """
+        started = time.perf_counter()
+        files_root = os.path.normpath(str(FILES_DIR)) + os.sep
+
+        if paths is None:
+            # Event queue overflowed: let the target manifests find the changes
+            file_paths, configs = set(self.targets), set()
+        else:
+            file_paths = {path for path in paths if path.startswith(files_root)}
+            configs = {path for path in paths - file_paths if os.path.isfile(path)}
+            count('changes', len(paths))
+
+        images = [path for path in file_paths if Path(path).suffix.lower() in _IMAGE_SUFFIXES]
+        created = sorted(path for path in images if os.path.isfile(path))
+        removed = sorted(path for path in images if not os.path.exists(path))
+
+        # Stage 1: items.json of the affected targets and thumbnails, in parallel
+        stage = [(update_target, source, self.targets[source], self.use_enrich)
+                 for source in sorted(affected_targets(file_paths, self.targets))]
+        if created or removed:
+            stage.append((update_thumbnails, created, removed, self.jobs))
+        with phase('items'):
+            changed_jobs, messages, errors = self._run_stage(stage)
+        configs.update(os.path.normpath(job[2]) for job in changed_jobs if job[0] is update_target)
+        # A full check may have missed uploaded configs as well
+        written = bool(changed_jobs) or paths is None
+
+        # Stage 2: NFC normalization, one file at a time (shared config repository)
+        with phase('normalize'):
+            for path in sorted(configs):
+                try:
+                    _, message = normalize_config(path)
+                except (OSError, ValueError) as e:
+                    errors.append(f"{path}: {e}")
+                    continue
+                if message:
+                    messages.append(message)
+                self._note_written(path)
+        written = written or bool(configs)
+
+        # Stage 3: catalog
+        if written and self.with_catalog:
+            with phase('catalog'):
+                _, catalog_messages, catalog_errors = self._run_stage([(rebuild_catalog,)])
+            messages += catalog_messages
+            errors += catalog_errors
+
+        self.batches += 1
+        self.last_batch = {
+            'finished': _now(),
+            'seconds': round(time.perf_counter() - started, 3),
+            'changes': len(paths) if paths is not None else None,
+            'log': messages,
+            'errors': errors
+        }
+        for message in messages:
+            print(message)
+        for error in errors:
+            print(f"✗ {error}")
+
+    def run(self, debounce=DEFAULT_DEBOUNCE, max_wait=DEFAULT_MAX_WAIT):
+        """Collect changes into batches and process them until interrupted."""
+        self.write_status('idle')
+        pending = set()
+        first_change = last_change = None
+        while True:
+            timeout = None
+            if pending is None or pending:
+                timeout = max(0.0, min(last_change + debounce, first_change + max_wait)
+                              - time.monotonic())
+            changes = self.watcher.read(timeout)
+            if changes:
+                changes = self.relevant(changes)
+
+            now = time.monotonic()
+            if changes is None or changes:
+                if first_change is None:
+                    first_change = now
+                last_change = now
+                pending = None if changes is None or pending is None else pending | changes
+                self.write_status('pending', -1 if pending is None else len(pending))
+                continue
+
+            if first_change is not None and (now >= last_change + debounce
+                                             or now >= first_change + max_wait):
+                batch = pending
+                pending = set()
+                first_change = last_change = None
+                print(f"=== {_now()}: {'full check' if batch is None else f'{len(batch)} changes'} ===")
+                self.write_status('working', -1 if batch is None else len(batch))
+                self.process(batch)
+                self.write_status('idle')
+
+    def close(self):
+        self.pool.shutdown()
+        self.watcher.close()
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+def _option_value(name):
+    """Return the value following a command-line option, or None."""
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return None
+
+
+def main():
+    if '--status' in sys.argv:
+        try:
+            with open(STATUS_FILE, encoding='utf-8') as f:
+                print(f.read().rstrip())
+        except FileNotFoundError:
+            print(f"No watcher status ({STATUS_FILE} not found)")
+            sys.exit(1)
+        return
+
+    targets_file = _option_value('--targets')
+    jobs = int(_option_value('--jobs') or DEFAULT_JOBS)
+    debounce = float(_option_value('--debounce') or DEFAULT_DEBOUNCE)
+    max_wait = float(_option_value('--max-wait') or DEFAULT_MAX_WAIT)
+    interval = float(_option_value('--interval') or DEFAULT_INTERVAL)
+
+    if not FILES_DIR.exists() or not CONFIGS_DIR.exists():
+        print(f"Error: {FILES_DIR} or {CONFIGS_DIR} directory not found!")
+        print("Please run this script from the project root directory.")
+        sys.exit(1)
+
+    targets = load_targets(targets_file) if targets_file else {}
+    print("=" * 70)
+    print("Watching content")
+    print("=" * 70)
+    print(f"Targets: {len(targets)}" + ("" if targets_file else " (no --targets, configs are not generated)"))
+    with phase('scan'):
+        adopted = adopt_targets(targets)
+        watcher = open_watcher([FILES_DIR, CONFIGS_DIR], '--poll' in sys.argv, interval)
+    if adopted:
+        print(f"✓ Scan manifests created for {adopted} targets")
+    print(f"Backend: {watcher.backend}, debounce {debounce:g} s, up to {jobs} jobs")
+
+    from generate_thumbnails import Image as _pillow
+    if _pillow is None and not shutil.which('convert'):
+        print("⊘ Neither Pillow nor ImageMagick found, thumbnails will fail")
+
+    watch = Watch(watcher, targets, jobs=jobs, use_enrich='--enrich' in sys.argv,
+                  with_catalog='--no-catalog' not in sys.argv)
+    try:
+        watch.run(debounce, max_wait)
+    except KeyboardInterrupt:
+        print("\nStopped")
+    finally:
+        watch.write_status('stopped')
+        watch.close()
+
+
+if __name__ == '__main__':
+    with instrumented('watch_content'):
+        main()